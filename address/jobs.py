@@ -0,0 +1,17 @@
+from core.jobs import task
+from .models import Address
+from .pincode_cache import fetch_pincode, resolve_pincode
+
+
+@task(dedup_key='address-location:{0}')
+def resolve_address_location(address_id):
+    """
+    Fills the city and state of an address saved before its pincode was known.
+    A postal API failure raises, so the job is retried with backoff.
+    """
+    pincode = Address.objects.filter(id=address_id).values_list('pincode', flat=True).first()
+    if pincode is None:
+        return
+    location = resolve_pincode(pincode, network=False) or fetch_pincode(pincode)
+    # A queryset update, so saving does not look the pincode up again.
+    Address.objects.filter(id=address_id, pincode=pincode).update(city=location['city'], state=location['state'])
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from address.pincode_directory import (
+    DEFAULT_DIRECTORY_PATH,
+    read_pincode_csv,
+    reset_pincode_directory,
+    write_index,
+)
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the offline pincode index from an India Post directory CSV.
+
+    Pincode centroids are stored too when the CSV has latitude and
+    longitude columns; nearby-hotel search needs them.
+
+    Usage:
+        python manage.py refresh_pincode_directory all_india_pincode.csv
+        python manage.py refresh_pincode_directory all_india_pincode.csv --output /srv/pincodes.idx
+    """
+
+    help = "Build the offline pincode index from a CSV with pincode, district, state and optional latitude/longitude columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help="India Post pincode directory CSV.")
+        parser.add_argument('--output', help="Index file to write (defaults to PINCODE_DIRECTORY_PATH).")
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'PINCODE_DIRECTORY_PATH', DEFAULT_DIRECTORY_PATH)
+
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+                locations, coordinates = read_pincode_csv(csv_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {options['csv_path']}: {e}")
+
+        if not locations:
+            raise CommandError("No valid pincode rows found, index left unchanged.")
+
+        count = write_index(locations, output, coordinates)
+        reset_pincode_directory()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} pincode(s) to {output}, {len(coordinates)} with coordinates"
+        ))
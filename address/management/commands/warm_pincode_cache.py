@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from address.models import Address, PincodeLocation
+from address.pincode_cache import resolve_pincode
+
+
+class Command(BaseCommand):
+    """
+    Pre-fills the pincode cache so address creation does not wait on the postal API.
+
+    Usage:
+        python manage.py warm_pincode_cache               # pincodes used by existing addresses
+        python manage.py warm_pincode_cache 600020 560001
+        python manage.py warm_pincode_cache --file pincodes.txt
+    """
+
+    help = "Resolve pincodes through the postal API and store them in the pincode cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('pincodes', nargs='*', type=int, help="Pincodes to resolve.")
+        parser.add_argument('--file', help="Text file with one pincode per line.")
+
+    def handle(self, *args, **options):
+        pincodes = set(options['pincodes'])
+
+        if options['file']:
+            with open(options['file']) as pincode_file:
+                pincodes.update(int(line) for line in pincode_file if line.strip())
+
+        if not pincodes:
+            pincodes = set(Address.objects.values_list('pincode', flat=True).distinct())
+
+        stored = set(PincodeLocation.objects.filter(pincode__in=pincodes).values_list('pincode', flat=True))
+        missing = sorted(pincodes - stored)
+        self.stdout.write(f"{len(stored)} pincode(s) already cached, resolving {len(missing)}.")
+
+        invalid = 0
+        for pincode in missing:
+            location = resolve_pincode(pincode)
+            if not location['city'] or not location['state']:
+                invalid += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Resolved {len(missing) - invalid} pincode(s), {invalid} invalid or unavailable."
+        ))
@@ -1,12 +1,13 @@
 from django.db import models
+from django.db.models import Q
 from utils.models import BaseModel
-from utils.postal_api import get_city_state_from_pincode
+from .pincode_cache import resolve_pincode
 
 
 class Address(BaseModel):
     """
     Represents a physical address for a hotel or user.
-    Automatically fetches city and state from the given pincode.
+    City and state are filled from the pincode.
     """
 
     area = models.CharField(max_length=100, null=False)  # Local area name
@@ -15,19 +16,57 @@ class Address(BaseModel):
     state = models.CharField(max_length=100, blank=True, null=False)  # Auto-filled from pincode
     pincode = models.PositiveBigIntegerField(null=False)  # 6-digit postal code
 
+    class Meta:
+        indexes = [
+            # Partial index serving the active-address listing
+            models.Index(fields=['id'], condition=Q(status=BaseModel.ACTIVE), name='address_active_id_idx'),
+            # Serves the hotel listing's area filter
+            models.Index(fields=['area'], name='address_area_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         """
-        Overrides default save to fetch city and state from pincode
-        before saving the model instance.
+        Overrides default save to fill city and state from the pincode.
+
+        Only lookups that need no network call run here; serializers
+        already resolved the pincode while validating it. Otherwise city
+        and state are left blank and filled by a background job
+        (address.jobs.resolve_address_location).
+        Saves limited to other fields keep the stored city and state.
         """
-        if self.pincode:
-            data = get_city_state_from_pincode(self.pincode)
+        needs_lookup = False
+        update_fields = kwargs.get('update_fields')
+        if self.pincode and (update_fields is None or 'pincode' in update_fields):
+            data = resolve_pincode(self.pincode, network=False)
+            if data is None:
+                data, needs_lookup = {'city': '', 'state': ''}, True
             self.city = data['city']
             self.state = data['state']
         super().save(*args, **kwargs)
+        if needs_lookup:
+            from .jobs import resolve_address_location
+            resolve_address_location.defer(self.id)
 
     def __str__(self):
         """
         String representation of the address instance.
         """
         return f"{self.street} {self.area} {self.city} {self.state} {self.pincode}"
+
+
+class PincodeLocation(BaseModel):
+    """
+    Shared cache of pincode lookups from the postal API.
+    Rows with is_valid=False record pincodes the API rejected.
+    """
+
+    pincode = models.PositiveBigIntegerField(unique=True)  # 6-digit postal code
+    city = models.CharField(max_length=100, blank=True, null=False)  # District returned by the API
+    state = models.CharField(max_length=100, blank=True, null=False)  # State returned by the API
+    is_valid = models.BooleanField(default=True)  # False when the API rejected the pincode
+
+    def __str__(self):
+        """
+        String representation of the cached pincode.
+        """
+        return f"{self.pincode} {self.city} {self.state}"
@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .pincode_directory import get_pincode_directory
+from utils.postal_api import fetch_city_state_from_pincode, PostalAPIError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_CACHE_TTL = 3600
+DEFAULT_NEGATIVE_TTL = 86400
+
+EMPTY_LOCATION = {'city': '', 'state': ''}
+
+
+class PincodeCache:
+    """
+    In-process LRU cache of pincode lookups with a time-to-live.
+
+    Settings:
+        - PINCODE_CACHE_SIZE: Maximum pincodes held in memory.
+        - PINCODE_CACHE_TTL: Seconds an entry stays fresh in memory.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'PINCODE_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'PINCODE_CACHE_TTL', DEFAULT_CACHE_TTL)
+
+    def get(self, pincode):
+        """
+        Returns the cached location or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(pincode)
+            if entry is None:
+                return None
+            location, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[pincode]
+                return None
+            self._entries.move_to_end(pincode)
+            return location
+
+    def set(self, pincode, location):
+        with self._lock:
+            self._entries[pincode] = (location, time.monotonic() + self.ttl)
+            self._entries.move_to_end(pincode)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+pincode_cache = PincodeCache()
+
+
+def _load_stored_location(pincode):
+    """
+    Returns the location stored in the PincodeLocation table, or None.
+    Rejected pincodes older than PINCODE_NEGATIVE_TTL seconds are ignored
+    so they get looked up again.
+    """
+    from .models import PincodeLocation
+
+    stored = PincodeLocation.objects.filter(pincode=pincode).first()
+    if stored is None:
+        return None
+    if stored.is_valid:
+        return {'city': stored.city, 'state': stored.state}
+
+    negative_ttl = getattr(settings, 'PINCODE_NEGATIVE_TTL', DEFAULT_NEGATIVE_TTL)
+    if stored.updated_at < timezone.now() - timedelta(seconds=negative_ttl):
+        return None
+    return dict(EMPTY_LOCATION)
+
+
+def _store_location(pincode, location):
+    from .models import PincodeLocation
+
+    try:
+        PincodeLocation.objects.update_or_create(
+            pincode=pincode,
+            defaults={
+                'city': location['city'],
+                'state': location['state'],
+                'is_valid': bool(location['city'] and location['state']),
+            },
+        )
+    except IntegrityError:
+        # Another worker stored the same pincode first.
+        logger.debug("Pincode %s already stored", pincode)
+
+
+def fetch_pincode(pincode):
+    """
+    Looks the pincode up with the postal API and stores the answer in the
+    PincodeLocation table and the in-process cache.
+
+    Raises:
+        PostalAPIError: If the API could not be reached; nothing is stored.
+    """
+    location = fetch_city_state_from_pincode(pincode)
+    logger.debug("Pincode %s fetched from postal API: %s", pincode, location)
+    _store_location(pincode, location)
+    pincode_cache.set(pincode, location)
+    return dict(location)
+
+
+def resolve_pincode(pincode, network=True):
+    """
+    Returns city and state of a pincode.
+
+    Looks in the offline pincode directory first, then the in-process cache,
+    then the PincodeLocation table, and only then calls the postal API.
+    With PINCODE_OFFLINE_ONLY set, pincodes missing from the directory are
+    treated as invalid and no network call is made. Both valid and rejected
+    pincodes are cached; network errors are not, so the next call retries.
+
+    Args:
+        network: When False, returns None instead of calling the postal API.
+
+    Returns:
+        dict: {'city', 'state'}, both empty for an invalid pincode or a failed lookup.
+    """
+    pincode = int(pincode)
+
+    directory = get_pincode_directory()
+    location = directory.lookup(pincode) if directory is not None else None
+    if location is not None:
+        return location
+    if getattr(settings, 'PINCODE_OFFLINE_ONLY', False):
+        return dict(EMPTY_LOCATION)
+
+    location = pincode_cache.get(pincode)
+    if location is not None:
+        return dict(location)
+
+    location = _load_stored_location(pincode)
+    if location is not None:
+        pincode_cache.set(pincode, location)
+        return dict(location)
+    if not network:
+        return None
+
+    try:
+        return fetch_pincode(pincode)
+    except PostalAPIError as e:
+        logger.warning("Pincode lookup failed for %s: %s", pincode, str(e))
+        return dict(EMPTY_LOCATION)
@@ -0,0 +1,290 @@
+"""
+Offline pincode directory backed by a compact memory-mapped index.
+
+Index layout (little-endian):
+    header      magic b'PINIDX02', record count (uint32), name count (uint32)
+    pincodes    uint32 x count, sorted ascending
+    districts   uint16 x count, index into the name table
+    states      uint16 x count, index into the name table
+    latitudes   int32 x count, microdegrees of the pincode centroid
+    longitudes  int32 x count, microdegrees (both NO_COORDINATE if unknown)
+    names       name count entries of uint16 length + UTF-8 bytes
+
+Files in the previous layout (b'PINIDX01', without the coordinate
+columns) are still read; their pincodes have no coordinates.
+
+Lookups binary-search the pincode column directly in the mapped file,
+so opening the index costs only the name table in memory.
+"""
+import array
+import bisect
+import csv
+import logging
+import mmap
+import os
+import statistics
+import struct
+import sys
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PINIDX02'
+MAGIC_WITHOUT_COORDINATES = b'PINIDX01'
+NO_COORDINATE = -2 ** 31
+MICRODEGREES = 1_000_000
+HEADER = struct.Struct('<8sII')
+NAME_LENGTH = struct.Struct('<H')
+
+DEFAULT_DIRECTORY_PATH = os.path.join(os.path.dirname(__file__), 'data', 'pincodes.idx')
+
+PINCODE_COLUMNS = ('pincode',)
+DISTRICT_COLUMNS = ('district', 'districtname')
+STATE_COLUMNS = ('statename', 'state')
+LATITUDE_COLUMNS = ('latitude', 'lat')
+LONGITUDE_COLUMNS = ('longitude', 'long', 'lon')
+
+# India Post rows outside these bounds are data-entry errors
+LATITUDE_RANGE = (6.0, 37.5)
+LONGITUDE_RANGE = (68.0, 97.5)
+
+
+class PincodeDirectory:
+    """
+    Read-only pincode to (district, state) lookup over an index file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as index_file:
+            self._mmap = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count, name_count = HEADER.unpack_from(self._mmap, 0)
+        if magic not in (MAGIC, MAGIC_WITHOUT_COORDINATES):
+            self._mmap.close()
+            raise ValueError(f"{path} is not a pincode index")
+
+        offset = HEADER.size
+        self._pincodes = self._column(offset, 'I')
+        offset += 4 * self._count
+        self._districts = self._column(offset, 'H')
+        offset += 2 * self._count
+        self._states = self._column(offset, 'H')
+        offset += 2 * self._count
+        self._latitudes = self._longitudes = None
+        if magic == MAGIC:
+            self._latitudes = self._column(offset, 'i')
+            offset += 4 * self._count
+            self._longitudes = self._column(offset, 'i')
+            offset += 4 * self._count
+
+        self._names = []
+        for _ in range(name_count):
+            (length,) = NAME_LENGTH.unpack_from(self._mmap, offset)
+            offset += NAME_LENGTH.size
+            self._names.append(self._mmap[offset:offset + length].decode('utf-8'))
+            offset += length
+
+    def _column(self, offset, typecode):
+        size = array.array(typecode).itemsize * self._count
+        if sys.byteorder == 'little':
+            return memoryview(self._mmap)[offset:offset + size].cast(typecode)
+        column = array.array(typecode, self._mmap[offset:offset + size])
+        column.byteswap()
+        return column
+
+    def __len__(self):
+        return self._count
+
+    def _position(self, pincode):
+        pincode = int(pincode)
+        position = bisect.bisect_left(self._pincodes, pincode)
+        if position == self._count or self._pincodes[position] != pincode:
+            return None
+        return position
+
+    @property
+    def has_coordinates(self):
+        return self._latitudes is not None
+
+    def lookup(self, pincode):
+        """
+        Returns {'city', 'state'} for the pincode, or None if it is not listed.
+        """
+        position = self._position(pincode)
+        if position is None:
+            return None
+        return {
+            'city': self._names[self._districts[position]],
+            'state': self._names[self._states[position]],
+        }
+
+    def coordinates(self, pincode):
+        """
+        Returns the (latitude, longitude) of the pincode centroid in degrees,
+        or None if the pincode is not listed or has no coordinates.
+        """
+        position = self._position(pincode)
+        if position is None or self._latitudes is None or self._latitudes[position] == NO_COORDINATE:
+            return None
+        return self._latitudes[position] / MICRODEGREES, self._longitudes[position] / MICRODEGREES
+
+    def close(self):
+        if isinstance(self._pincodes, memoryview):
+            for column in (self._pincodes, self._districts, self._states, self._latitudes, self._longitudes):
+                if column is not None:
+                    column.release()
+        self._mmap.close()
+
+
+def write_index(locations, path, coordinates=None):
+    """
+    Writes an index file from a mapping of pincode to (district, state),
+    and optionally one of pincode to (latitude, longitude) in degrees.
+    The file is written next to `path` and moved into place atomically.
+    """
+    coordinates = coordinates or {}
+    names = {}
+
+    def name_index(name):
+        return names.setdefault(name, len(names))
+
+    pincodes = array.array('I')
+    districts = array.array('H')
+    states = array.array('H')
+    latitudes = array.array('i')
+    longitudes = array.array('i')
+    for pincode in sorted(locations):
+        district, state = locations[pincode]
+        pincodes.append(pincode)
+        districts.append(name_index(district))
+        states.append(name_index(state))
+        latitude, longitude = coordinates.get(pincode, (None, None))
+        if latitude is None:
+            latitudes.append(NO_COORDINATE)
+            longitudes.append(NO_COORDINATE)
+        else:
+            latitudes.append(round(latitude * MICRODEGREES))
+            longitudes.append(round(longitude * MICRODEGREES))
+
+    columns = (pincodes, districts, states, latitudes, longitudes)
+    if sys.byteorder != 'little':
+        for column in columns:
+            column.byteswap()
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as index_file:
+        index_file.write(HEADER.pack(MAGIC, len(pincodes), len(names)))
+        for column in columns:
+            column.tofile(index_file)
+        for name in names:
+            encoded = name.encode('utf-8')
+            index_file.write(NAME_LENGTH.pack(len(encoded)))
+            index_file.write(encoded)
+    os.replace(temp_path, path)
+    return len(pincodes)
+
+
+def _pick_column(fieldnames, candidates):
+    lowered = {name.strip().lower(): name for name in fieldnames}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    raise ValueError(f"CSV has none of the columns: {', '.join(candidates)}")
+
+
+def _parse_coordinate(value, bounds):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if bounds[0] <= value <= bounds[1] else None
+
+
+def read_pincode_csv(csv_file):
+    """
+    Reads pincode, district, state and, when the CSV has latitude and
+    longitude columns, coordinates from an India Post directory CSV.
+
+    The first row seen for a pincode wins its district and state; rows
+    with a missing or non 6-digit pincode are skipped. The coordinates of
+    a pincode are the median of its offices' coordinates, so one
+    misplaced office does not move it; rows with missing or out of range
+    coordinates are left out.
+
+    Returns:
+        tuple: (mapping of pincode to (district, state),
+                mapping of pincode to (latitude, longitude))
+    """
+    reader = csv.DictReader(csv_file)
+    pincode_column = _pick_column(reader.fieldnames, PINCODE_COLUMNS)
+    district_column = _pick_column(reader.fieldnames, DISTRICT_COLUMNS)
+    state_column = _pick_column(reader.fieldnames, STATE_COLUMNS)
+    try:
+        latitude_column = _pick_column(reader.fieldnames, LATITUDE_COLUMNS)
+        longitude_column = _pick_column(reader.fieldnames, LONGITUDE_COLUMNS)
+    except ValueError:
+        latitude_column = longitude_column = None
+
+    locations = {}
+    points = {}
+    for row in reader:
+        pincode = (row[pincode_column] or '').strip()
+        if not pincode.isdigit() or len(pincode) != 6:
+            continue
+        pincode = int(pincode)
+        district = (row[district_column] or '').strip().title()
+        state = (row[state_column] or '').strip().title()
+        if district and state:
+            locations.setdefault(pincode, (district, state))
+        if latitude_column:
+            latitude = _parse_coordinate(row[latitude_column], LATITUDE_RANGE)
+            longitude = _parse_coordinate(row[longitude_column], LONGITUDE_RANGE)
+            if latitude is not None and longitude is not None:
+                points.setdefault(pincode, ([], []))
+                points[pincode][0].append(latitude)
+                points[pincode][1].append(longitude)
+
+    coordinates = {
+        pincode: (statistics.median(latitudes), statistics.median(longitudes))
+        for pincode, (latitudes, longitudes) in points.items()
+        if pincode in locations
+    }
+    return locations, coordinates
+
+
+_directory = None
+_directory_loaded = False
+_directory_lock = threading.Lock()
+
+
+def get_pincode_directory():
+    """
+    Returns the directory at PINCODE_DIRECTORY_PATH, or None if there is no index file.
+    The index is opened once per process.
+    """
+    global _directory, _directory_loaded
+    if not _directory_loaded:
+        with _directory_lock:
+            if not _directory_loaded:
+                path = getattr(settings, 'PINCODE_DIRECTORY_PATH', DEFAULT_DIRECTORY_PATH)
+                if path and os.path.exists(path):
+                    _directory = PincodeDirectory(path)
+                    logger.info("Pincode directory loaded: %d pincodes from %s", len(_directory), path)
+                _directory_loaded = True
+    return _directory
+
+
+def reset_pincode_directory():
+    """
+    Closes the open directory so the next lookup reloads the index file.
+    """
+    global _directory, _directory_loaded
+    with _directory_lock:
+        if _directory is not None:
+            _directory.close()
+        _directory = None
+        _directory_loaded = False
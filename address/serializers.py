@@ -3,7 +3,7 @@ import logging
 from rest_framework import serializers
 
 from .models import Address
-from utils.postal_api import get_city_state_from_pincode
+from .pincode_cache import resolve_pincode
 from utils.exceptions import BadRequestException
 from utils.constants import error_code_dict
 
@@ -46,14 +46,14 @@ class AddressCreateSerializer(serializers.ModelSerializer):
     def validate_pincode(self, value):
         """
         Validates the 'pincode' field: must be a 6-digit number
-        and must return valid city/state from postal API.
+        and must resolve to a city/state (cached postal API lookup).
         """
         if not str(value).isdigit() or len(str(value)) != 6:
             logger.debug(f"Pincode validation failed: not a 6-digit number -> {value}")
             raise BadRequestException(key='IMPROPER_PINCODE')
 
         logger.debug(f"Fetching city/state for pincode: {value}")
-        location = get_city_state_from_pincode(value)
+        location = resolve_pincode(value)
         logger.debug(f"Location fetched from pincode {value}: {location}")
 
         if not location.get('city') or not location.get('state'):
@@ -6,10 +6,15 @@ from django.core.exceptions import ObjectDoesNotExist
 
 from .serializers import AddressCreateSerializer, AddressViewItemSerializer
 from .models import Address
+from core.db_router import replica_reads
+from core.pagination import KeysetPaginator
+from core.telemetry import serializer_timer
 from utils.exceptions import BadRequestException
 
 logger = logging.getLogger(__name__)  # Logger for debugging
 
+paginator = KeysetPaginator(ordering=('id',))
+
 def insert_address_items(request):
     """
     Inserts a new address item into the database.
@@ -37,27 +42,47 @@ def insert_address_items(request):
     raise BadRequestException(str(serializer.errors))
 
 
+def build_address_query(request):
+    address_id = request.query_params.get('address_id')
+    logger.debug("Fetching address with ID: %s", address_id)
+
+    if address_id:
+        return Address.active.filter(id=address_id)
+    return Address.active.all()
+
+
+def serialize_addresses(address_items):
+    with serializer_timer():
+        data = AddressViewItemSerializer(address_items, many=True).data
+    logger.info("Fetched %d address item(s)", len(data))
+    return data
+
+
 def get_address_items(request):
     """
     Retrieves one or more active address items.
 
     Query params (optional):
         - address_id: ID of the address to retrieve
+        - cursor, page_size: Pagination (see core.pagination)
+
+    Reads go to a read replica when one is configured (see core.db_router).
 
     Returns:
-        list: Serialized address data.
+        tuple: Serialized address data of the page, and the next page cursor.
     """
-    address_id = request.query_params.get('address_id')
-    logger.debug("Fetching address with ID: %s", address_id)
+    with replica_reads(request):
+        address_items, next_cursor = paginator.paginate(build_address_query(request), request)
+        return serialize_addresses(address_items), next_cursor
 
-    if address_id:
-        address_items = Address.objects.filter(id=address_id, status='Active')
-    else:
-        address_items = Address.objects.filter(status='Active')
 
-    serializer = AddressViewItemSerializer(address_items, many=True)
-    logger.info("Fetched %d address item(s)", len(serializer.data))
-    return serializer.data
+async def aget_address_items(request):
+    """
+    Async version of get_address_items, querying with the async ORM.
+    """
+    async with replica_reads(request):
+        address_items, next_cursor = await paginator.apaginate(build_address_query(request), request)
+        return serialize_addresses(address_items), next_cursor
 
 
 def update_address_items(request):
@@ -100,8 +125,11 @@ def update_address_items(request):
         update_data['street'] = street
 
     try:
-        Address.objects.filter(id=address_id).update(**update_data)
-        address_item = Address.objects.get(id=address_id, status="Active")
+        address_item = Address.active.get(id=address_id)
+        for field, value in update_data.items():
+            setattr(address_item, field, value)
+        # A save rather than a queryset update, so post_save keeps the hotel indexes current.
+        address_item.save(update_fields=list(update_data))
         logger.info("Address with ID %s updated successfully", address_id)
     except ObjectDoesNotExist:
         logger.error("Address with ID %s not found", address_id)
@@ -1,3 +1,162 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Address, PincodeLocation
+from .pincode_cache import pincode_cache, resolve_pincode
+from .pincode_directory import PincodeDirectory, read_pincode_csv, reset_pincode_directory, write_index
+from .serializers import AddressCreateSerializer
+from core.jobs import run_pending_jobs
+from core.models import Job
+from utils.postal_stub import PostalStubServer
+
+
+class PincodeCacheTest(TestCase):
+    """
+    Pincode lookups go to the postal API at most once per pincode.
+    Runs against the local postal stub, so no network is needed.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = PostalStubServer({'600020': ('Chennai', 'Tamil Nadu')}).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.stub.hits = 0
+        pincode_cache.clear()
+        settings_override = override_settings(POSTAL_API_BASE_URL=self.stub.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_address_creation_calls_api_once(self):
+        serializer = AddressCreateSerializer(data={'area': 'Adyar', 'street': 'Main Street', 'pincode': 600020})
+        self.assertTrue(serializer.is_valid())
+        address = serializer.save()
+
+        self.assertEqual((address.city, address.state), ('Chennai', 'Tamil Nadu'))
+        self.assertEqual(self.stub.hits, 1)
+
+    def test_stored_pincode_survives_process_cache_loss(self):
+        resolve_pincode(600020)
+        pincode_cache.clear()
+
+        self.assertEqual(resolve_pincode(600020), {'city': 'Chennai', 'state': 'Tamil Nadu'})
+        self.assertEqual(self.stub.hits, 1)
+
+    def test_invalid_pincode_is_cached(self):
+        self.assertEqual(resolve_pincode(999999), {'city': '', 'state': ''})
+        pincode_cache.clear()
+        self.assertEqual(resolve_pincode(999999), {'city': '', 'state': ''})
+
+        self.assertEqual(self.stub.hits, 1)
+        self.assertFalse(PincodeLocation.objects.get(pincode=999999).is_valid)
+
+    def test_network_errors_are_not_cached(self):
+        with override_settings(POSTAL_API_BASE_URL='http://127.0.0.1:1'):
+            self.assertEqual(resolve_pincode(600020), {'city': '', 'state': ''})
+        self.assertFalse(PincodeLocation.objects.filter(pincode=600020).exists())
+
+        self.assertEqual(resolve_pincode(600020)['city'], 'Chennai')
+
+    def test_address_saved_with_unknown_pincode_is_filled_by_job(self):
+        with override_settings(POSTAL_API_BASE_URL='http://127.0.0.1:1'):
+            address = Address.objects.create(area='Adyar', street='Main Street', pincode=600020)
+            self.assertEqual((address.city, address.state), ('', ''))
+            self.assertEqual(self.stub.hits, 0)
+
+            # The postal API is down: the job is retried later.
+            self.assertEqual(run_pending_jobs(), 1)
+            job = Job.objects.get()
+            self.assertEqual((job.state, job.attempts), (Job.QUEUED, 1))
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending_jobs(), 1)
+        address.refresh_from_db()
+        self.assertEqual((address.city, address.state), ('Chennai', 'Tamil Nadu'))
+        self.assertFalse(Job.objects.exists())
+
+    def test_warm_command_stores_pincodes(self):
+        call_command('warm_pincode_cache', '600020', '999999', stdout=StringIO())
+        pincode_cache.clear()
+        resolve_pincode(600020)
+
+        self.assertEqual(PincodeLocation.objects.count(), 2)
+        self.assertEqual(self.stub.hits, 2)
+
+
+class PincodeDirectoryTest(TestCase):
+    """
+    The offline index answers lookups without touching the postal API.
+    """
+
+    CSV = (
+        "officename,pincode,officetype,Districtname,statename\n"
+        "Adyar S.O,600020,S.O,CHENNAI,TAMIL NADU\n"
+        "Gandhinagar S.O,600020,S.O,CHENNAI,TAMIL NADU\n"
+        "Bangalore G.P.O.,560001,H.O,BANGALORE,KARNATAKA\n"
+        "Broken row,12AB,S.O,NOWHERE,NOWHERE\n"
+    )
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.index_path = os.path.join(temp_dir.name, 'pincodes.idx')
+        csv_path = os.path.join(temp_dir.name, 'pincodes.csv')
+        with open(csv_path, 'w') as csv_file:
+            csv_file.write(self.CSV)
+
+        settings_override = override_settings(
+            PINCODE_DIRECTORY_PATH=self.index_path,
+            PINCODE_OFFLINE_ONLY=True,
+            POSTAL_API_BASE_URL='http://127.0.0.1:1',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(reset_pincode_directory)
+        pincode_cache.clear()
+
+        call_command('refresh_pincode_directory', csv_path, stdout=StringIO())
+
+    def test_index_lookup(self):
+        directory = PincodeDirectory(self.index_path)
+        self.addCleanup(directory.close)
+
+        self.assertEqual(len(directory), 2)
+        self.assertEqual(directory.lookup(560001), {'city': 'Bangalore', 'state': 'Karnataka'})
+        self.assertIsNone(directory.lookup(560002))
+        self.assertIsNone(directory.lookup(999999))
+
+    def test_address_resolves_offline(self):
+        address = Address.objects.create(area='Adyar', street='Main Street', pincode=600020)
+
+        self.assertEqual((address.city, address.state), ('Chennai', 'Tamil Nadu'))
+        self.assertEqual(resolve_pincode(110001), {'city': '', 'state': ''})
+        self.assertFalse(PincodeLocation.objects.exists())
+
+    def test_coordinates_are_office_medians(self):
+        locations, coordinates = read_pincode_csv(StringIO(
+            "officename,pincode,Districtname,statename,Latitude,Longitude\n"
+            "Adyar S.O,600020,CHENNAI,TAMIL NADU,13.0067,80.2573\n"
+            "Gandhinagar S.O,600020,CHENNAI,TAMIL NADU,13.0100,80.2500\n"
+            "Misplaced B.O,600020,CHENNAI,TAMIL NADU,28.6000,77.2000\n"
+            "Kasturba Nagar B.O,600020,CHENNAI,TAMIL NADU,13.0080,80.2550\n"
+            "Bangalore G.P.O.,560001,BANGALORE,KARNATAKA,NA,NA\n"
+        ))
+        self.assertEqual(coordinates, {600020: (13.009, 80.2525)})
+
+        write_index(locations, self.index_path, coordinates)
+        directory = PincodeDirectory(self.index_path)
+        self.addCleanup(directory.close)
+        self.assertEqual(directory.coordinates(600020), (13.009, 80.2525))
+        self.assertIsNone(directory.coordinates(560001))
+        self.assertEqual(directory.lookup(560001), {'city': 'Bangalore', 'state': 'Karnataka'})
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import AddressItemView
+from .views import AddressItemAsyncView, AddressItemView
 
 urlpatterns = [
     path('address/', AddressItemView.as_view(), name='address-filter'),
+    path('async/address/', AddressItemAsyncView.as_view(), name='address-filter-async'),
 ]
\ No newline at end of file
@@ -5,12 +5,15 @@ from rest_framework.views import APIView
 from rest_framework import status
 
 from authenticate.permissions import IsManagerOrAdmin, IsAccessToAll
-from .service import insert_address_items, get_address_items, update_address_items
+from .service import insert_address_items, get_address_items, aget_address_items, update_address_items
 from utils.exceptions import AuthorizationException
+from core.async_views import AsyncAPIView
+from core.query_budget import query_budget
 
 logger = logging.getLogger(__name__)
 
 
+@query_budget(get=1, post=1, patch=2)
 class AddressItemView(APIView):
     """
     API for creating, retrieving, and updating address items.
@@ -28,13 +31,14 @@ class AddressItemView(APIView):
     def get(self, request):
         """
         Fetch address item(s). Accessible by all roles.
+        Paginated with `cursor` and `page_size`.
         """
         if not request.user or not request.user.is_authenticated:
             raise AuthorizationException()
 
         logger.debug("GET request received for address items by user: %s", request.user)
-        address_items = get_address_items(request)
-        return Response({'address_items': address_items}, status=status.HTTP_200_OK)
+        address_items, next_cursor = get_address_items(request)
+        return Response({'address_items': address_items, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
 
     def post(self, request):
         """
@@ -56,4 +60,24 @@ class AddressItemView(APIView):
 
         logger.debug("PATCH request to update address by user: %s", request.user)
         address_item = update_address_items(request)
-        return Response({'address_item': address_item}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({'address_item': address_item}, status=status.HTTP_200_OK)
+
+
+@query_budget(get=1)
+class AddressItemAsyncView(AsyncAPIView):
+    """
+    GET of AddressItemView served on the event loop (see core.async_views).
+
+    Permissions:
+        - GET: All roles
+    """
+
+    async def get(self, request):
+        """
+        Fetch address item(s); same filters and pagination as AddressItemView.
+        """
+        if not request.user or not request.user.is_authenticated:
+            raise AuthorizationException()
+
+        address_items, next_cursor = await aget_address_items(request)
+        return Response({'address_items': address_items, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
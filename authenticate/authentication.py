@@ -0,0 +1,192 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import CustomUser
+from .tokens import CLAIM_FIELDS
+from core.cache import is_shared_cache
+from utils.exceptions import AuthorizationException, UserInactiveException
+from utils.models import BaseModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_CACHE_TIMEOUT = 60
+
+
+class ClaimsUser:
+    """
+    Lightweight request user built from token claims instead of a database row.
+
+    Carries the id, role, status and name; views and permissions only read those.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+    is_staff = False
+    is_superuser = False
+
+    def __init__(self, id, role, status, name):
+        self.id = id
+        self.pk = id
+        self.role = role
+        self.status = status
+        self.name = name
+
+    @property
+    def is_active(self):
+        return self.status == BaseModel.ACTIVE
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return f"{self.name} ({self.id})"
+
+
+def _changed_key(user_id):
+    return f"auth:claims-changed:{user_id}"
+
+
+def _state_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_user_cache_timeout():
+    # A per-process cache would keep serving a user invalidated elsewhere.
+    if not is_shared_cache():
+        return 0
+    return getattr(settings, 'JWT_USER_CACHE_TIMEOUT', DEFAULT_USER_CACHE_TIMEOUT)
+
+
+def invalidate_user_claims(user_id):
+    """
+    Marks the claims of tokens already issued to the user as stale.
+
+    Called when a user's role, status or name changes; such tokens are
+    then checked against the database (or the user cache) until they expire.
+    Only reaches every worker through a shared cache, which is why the
+    claims are not trusted at all without one (see core.cache).
+    """
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    cache.set(_changed_key(user_id), int(time.time()), int(lifetime.total_seconds()))
+    cache.delete(_state_key(user_id))
+    logger.debug("Token claims invalidated for user %s", user_id)
+
+
+def load_user_state(user_id):
+    """
+    Returns the claim fields of the user from the database (or the user
+    cache when JWT_USER_CACHE_TIMEOUT is set), or None for a missing user.
+    """
+    timeout = get_user_cache_timeout()
+    if timeout:
+        state = cache.get(_state_key(user_id))
+        if state is not None:
+            return state
+
+    state = CustomUser.objects.filter(id=user_id).values(*CLAIM_FIELDS, 'is_active').first()
+    if state is not None and timeout:
+        cache.set(_state_key(user_id), state, timeout)
+    return state
+
+
+async def aload_user_state(user_id):
+    """
+    Async version of load_user_state.
+    """
+    timeout = get_user_cache_timeout()
+    if timeout:
+        state = await cache.aget(_state_key(user_id))
+        if state is not None:
+            return state
+
+    state = await CustomUser.objects.filter(id=user_id).values(*CLAIM_FIELDS, 'is_active').afirst()
+    if state is not None and timeout:
+        await cache.aset(_state_key(user_id), state, timeout)
+    return state
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that takes the user from the token claims.
+
+    Tokens issued by login carry role, status and name (see
+    UserClaimsRefreshToken), so no query is needed. Tokens without the
+    claims, or issued before the user's claims changed, fall back to
+    the database, cached for JWT_USER_CACHE_TIMEOUT seconds if set.
+    Without a shared cache a change made by another process could not be
+    seen, so every request is checked against the database instead.
+
+    Settings:
+        - JWT_USER_CACHE_TIMEOUT: Seconds a user loaded from the database is cached (0 disables).
+    """
+
+    def get_user(self, validated_token):
+        user_id, claims = self.get_claims(validated_token)
+        if self.needs_state(validated_token, claims, cache.get(_changed_key(user_id))):
+            claims = self.claims_from_state(load_user_state(user_id))
+        return self.build_user(user_id, claims)
+
+    async def aget_user(self, validated_token):
+        """
+        Async version of get_user.
+        """
+        user_id, claims = self.get_claims(validated_token)
+        if self.needs_state(validated_token, claims, await cache.aget(_changed_key(user_id))):
+            claims = self.claims_from_state(await aload_user_state(user_id))
+        return self.build_user(user_id, claims)
+
+    async def aauthenticate(self, request):
+        """
+        Async version of authenticate, for views running on the event loop.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    @staticmethod
+    def get_claims(validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return user_id, {field: validated_token.get(field) for field in CLAIM_FIELDS}
+
+    @staticmethod
+    def needs_state(validated_token, claims, changed_at):
+        """
+        Returns whether the claims are missing, older than the user's last
+        change, or cannot be trusted because the cache is per-process.
+        """
+        if not is_shared_cache():
+            return True
+        stale = changed_at is not None and validated_token.get('iat', 0) <= changed_at
+        return None in claims.values() or stale
+
+    @staticmethod
+    def claims_from_state(state):
+        if state is None:
+            raise AuthorizationException()
+        if not state['is_active']:
+            raise UserInactiveException()
+        return {field: state[field] for field in CLAIM_FIELDS}
+
+    @staticmethod
+    def build_user(user_id, claims):
+        user = ClaimsUser(user_id, **claims)
+        if not user.is_active:
+            raise UserInactiveException()
+        return user
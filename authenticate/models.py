@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from utils.exceptions import BadRequestException
 from django.db import models
 from utils.models import BaseModel
+from .tokens import CLAIM_STATE_FIELDS
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -31,5 +32,16 @@ class CustomUser(AbstractBaseUser, PermissionsMixin, BaseModel):
 
     USERNAME_FIELD = 'email'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the loaded role, status, name and is_active so a change
+        to them can invalidate the claims of tokens already issued.
+        """
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._loaded_claims = tuple(loaded.get(field) for field in CLAIM_STATE_FIELDS)
+        return instance
+
     def __str__(self):
         return self.email
@@ -3,9 +3,9 @@ from django.contrib.auth import authenticate
 from django.db import IntegrityError
 
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from .models import CustomUser
+from .tokens import UserClaimsRefreshToken
 from utils.exceptions import (
     InvalidLoginException,
     UserInactiveException,
@@ -48,7 +48,7 @@ class LoginSerializers(serializers.Serializer):
 
         logger.info(f"Login successful for user ID: {user.id}")
 
-        refresh = RefreshToken.for_user(user)
+        refresh = UserClaimsRefreshToken.for_user(user)
         return {
             'user': user,
             'email': user.email,
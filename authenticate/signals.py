@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user_claims
+from .models import CustomUser
+from .tokens import CLAIM_STATE_FIELDS
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_changed_claims(sender, instance, created, **kwargs):
+    """
+    Invalidates issued token claims when the user's role, status, name or is_active changed.
+    """
+    current = tuple(getattr(instance, field) for field in CLAIM_STATE_FIELDS)
+    if not created and getattr(instance, '_loaded_claims', None) != current:
+        invalidate_user_claims(instance.id)
+    instance._loaded_claims = current
+
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    invalidate_user_claims(instance.id)
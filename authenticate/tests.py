@@ -1,3 +1,95 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from .models import CustomUser
+
+
+@override_settings(CACHE_ASSUME_SHARED=True)
+class ClaimsAuthenticationTest(TestCase):
+    """
+    Requests are authenticated from the token claims, without loading the user.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(
+            email='admin@example.com', password='secret', name='Admin', role='admin'
+        )
+
+    def login(self):
+        response = self.client.post('/login/', {'email': 'admin@example.com', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['access']
+
+    def get_stats(self, token):
+        return self.client.get('/foods/cache-stats/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_token_carries_claims(self):
+        token = RefreshToken(self.client.post(
+            '/login/', {'email': 'admin@example.com', 'password': 'secret'}, format='json'
+        ).data['refresh'])
+        self.assertEqual((token['role'], token['status'], token['name']), ('admin', 'active', 'Admin'))
+
+    def test_request_runs_no_user_query(self):
+        token = self.login()
+        with self.assertNumQueries(0):
+            response = self.get_stats(token)
+        self.assertEqual(response.status_code, 200)
+
+    def test_role_change_invalidates_claims(self):
+        token = self.login()
+        self.user.refresh_from_db()
+        self.user.role = 'manager'
+        self.user.save()
+        self.assertEqual(self.get_stats(token).status_code, 403)
+
+    def test_deactivated_user_is_rejected(self):
+        token = self.login()
+        self.user.refresh_from_db()
+        self.user.status = CustomUser.INACTIVE
+        self.user.save()
+        response = self.get_stats(token)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['code'], 'AUTH_002')
+
+    def test_is_active_change_invalidates_claims(self):
+        token = self.login()
+        self.user.refresh_from_db()
+        self.user.is_active = False
+        self.user.save()
+        response = self.get_stats(token)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['code'], 'AUTH_002')
+
+    def test_unrelated_save_keeps_claims(self):
+        token = self.login()
+        self.user.refresh_from_db()
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_stats(token).status_code, 200)
+
+    @override_settings(JWT_USER_CACHE_TIMEOUT=60)
+    def test_token_without_claims_uses_user_cache(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get_stats(token).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_stats(token).status_code, 200)
+
+    @override_settings(JWT_USER_CACHE_TIMEOUT=0)
+    def test_token_without_claims_without_user_cache(self):
+        token = str(RefreshToken.for_user(self.user).access_token)
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.get_stats(token).status_code, 200)
+
+    @override_settings(CACHE_ASSUME_SHARED=False, JWT_USER_CACHE_TIMEOUT=60)
+    def test_claims_are_checked_without_shared_cache(self):
+        # Invalidations made by other processes would not be seen.
+        token = self.login()
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.get_stats(token).status_code, 200)
@@ -0,0 +1,22 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# User fields copied into the tokens, enough for the permission classes
+CLAIM_FIELDS = ('role', 'status', 'name')
+# User fields whose change invalidates the claims of issued tokens
+CLAIM_STATE_FIELDS = CLAIM_FIELDS + ('is_active',)
+
+
+class UserClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's role, status and name.
+
+    Access tokens made from it copy the claims, so requests can be
+    authenticated without loading the user (see ClaimsJWTAuthentication).
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for field in CLAIM_FIELDS:
+            token[field] = getattr(user, field)
+        return token
@@ -10,11 +10,13 @@ from rest_framework.response import Response
 from .serializers import LoginSerializers, RegisterSerializers, UserSerializer
 from utils.exceptions import AuthorizationException, BadRequestException
 from core.logger_config import setup_logging
+from core.query_budget import query_budget
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
+@query_budget(post=2)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_view(request):
@@ -41,6 +43,7 @@ def login_view(request):
     raise AuthorizationException()
 
 
+@query_budget(post=2)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_view(request):
@@ -0,0 +1,174 @@
+"""
+Benchmark of the async listing views against the sync ones, under WSGI and ASGI.
+
+Usage:
+    pip install uvicorn
+    python benchmarks/async_views.py
+    python benchmarks/async_views.py --concurrency 64 --requests 5000 --modes asgi-sync asgi-async
+
+Seeds a test database like benchmarks/load_api.py and runs the read
+endpoints (foods, foods_by_hotel, hotels, address) in three modes:
+
+    wsgi-sync   Django's threaded WSGI server, sync views.
+    asgi-sync   uvicorn, sync views (Django runs each in a worker thread).
+    asgi-async  uvicorn, the views under /async/ (see core.async_views).
+
+Per mode and endpoint it reports req/s, p50/p95/p99 latency, errors and
+queries per request. Results are written as JSON named after the commit.
+
+The async views pay off when requests wait on the database, so run it
+against PostgreSQL with a --concurrency well above the WSGI thread count
+you would deploy; on SQLite every query runs in the same process.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+
+import load_api
+
+from django.core.asgi import get_asgi_application
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+
+from hotel.view_counts import view_counter
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+MODES = ('wsgi-sync', 'asgi-sync', 'asgi-async')
+READ_ENDPOINTS = ('foods', 'foods_by_hotel', 'hotels', 'address')
+
+
+class AsgiServer:
+    """
+    uvicorn serving the project's ASGI application from a background thread.
+    """
+
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.bind(('127.0.0.1', 0))
+        self.server_address = self.socket.getsockname()
+        config = uvicorn.Config(get_asgi_application(), log_level='warning', lifespan='off', access_log=False)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, kwargs={'sockets': [self.socket]}, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise SystemExit("uvicorn failed to start.")
+            time.sleep(0.01)
+        return self
+
+    def shutdown(self):
+        self.server.should_exit = True
+        self.thread.join()
+
+    def server_close(self):
+        self.socket.close()
+
+
+def start_server(mode):
+    if mode == 'wsgi-sync':
+        return load_api.start_server()
+    return AsgiServer().start()
+
+
+def build_endpoints(dataset, mode):
+    """
+    Returns the read endpoints of load_api, moved under /async/ for the async mode.
+    """
+    endpoints = {name: build for name, build in load_api.build_endpoints(dataset).items() if name in READ_ENDPOINTS}
+    if mode != 'asgi-async':
+        return endpoints
+
+    def under_async(build):
+        def build_async(rng):
+            method, path, body = build(rng)
+            return method, f'/async{path}', body
+        return build_async
+
+    return {name: under_async(build) for name, build in endpoints.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hotels', type=int, default=200)
+    parser.add_argument('--foods-per-hotel', type=int, default=20)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=32, help="Client threads.")
+    parser.add_argument('--requests', type=int, default=1000, help="Measured requests per endpoint.")
+    parser.add_argument('--warmup', type=int, default=50, help="Uncounted requests per endpoint.")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--endpoints', nargs='+', choices=READ_ENDPOINTS, help="Endpoints to run (default: all).")
+    parser.add_argument('--output', help="Result file (default: benchmarks/results/async-<commit>-<time>.json).")
+    args = parser.parse_args()
+
+    if uvicorn is None and any(mode.startswith('asgi') for mode in args.modes):
+        raise SystemExit("The ASGI modes need uvicorn: pip install uvicorn (or pass --modes wsgi-sync).")
+
+    dataset = load_api.Dataset(args.hotels, args.foods_per_hotel, args.categories, args.users, 0, args.seed)
+    selected = args.endpoints or list(READ_ENDPOINTS)
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    commit, dirty = load_api.git_commit()
+    results = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'load': {'concurrency': args.concurrency, 'requests': args.requests, 'warmup': args.warmup},
+        'modes': {},
+    }
+    try:
+        start = time.perf_counter()
+        dataset.load()
+        print(f"Seeded {dataset.describe()} in {time.perf_counter() - start:.1f}s on {connection.vendor}")
+        results['database'] = connection.vendor
+        results['dataset'] = dataset.describe()
+
+        for mode in args.modes:
+            server = start_server(mode)
+            try:
+                port = server.server_address[1]
+                tokens = load_api.login_tokens(port, dataset.emails[:args.concurrency])
+                endpoints = build_endpoints(dataset, mode)
+                results['modes'][mode] = {'endpoints': {
+                    name: load_api.run_endpoint(
+                        port, tokens, endpoints[name], args.requests, args.warmup, args.concurrency, args.seed
+                    )
+                    for name in selected
+                }}
+            finally:
+                server.shutdown()
+                server.server_close()
+    finally:
+        view_counter.flush()
+        teardown_databases(old_config, verbosity=0)
+
+    output = args.output or os.path.join(
+        load_api.RESULTS_DIR, f"async-{commit}{'-dirty' if dirty else ''}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    for mode, mode_results in results['modes'].items():
+        print(f"\n{mode}" + (f" (change against {args.modes[0]})" if baseline else ''))
+        load_api.print_results(mode_results, baseline)
+        baseline = baseline or mode_results
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Compares the model serializers with the `.values()` row serializers for food listings.
+
+Usage:
+    python benchmarks/food_serializers.py
+    python benchmarks/food_serializers.py --rows 10000 --repeat 5
+
+Both paths serialize --rows foods and render them to JSON with DRF's
+JSONRenderer. Rows are built in memory, so no database is needed; the
+time saved by `.values()` over building model instances is not included.
+"""
+import argparse
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_food_delivery.settings')
+
+import django
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer
+
+from food.models import Category, Food
+from food.serializer import (
+    FoodDetailsSerializer,
+    FoodOnlyViewSerializer,
+    serialize_food_details_rows,
+    serialize_food_only_rows,
+)
+from hotel.models import Hotel
+
+
+def build_data(rows):
+    hotels = [Hotel(id=index, name=f'Hotel {index}') for index in range(1, 51)]
+    categories = [Category(id=index, name=f'Category {index}') for index in range(1, 21)]
+    instances = []
+    values = []
+    for index in range(1, rows + 1):
+        hotel = hotels[index % len(hotels)]
+        category = categories[index % len(categories)]
+        price = Decimal(index % 5000) + Decimal('0.25')
+        instances.append(Food(id=index, name=f'Food {index}', price=price, hotel=hotel, category=category))
+        values.append({
+            'id': index, 'name': f'Food {index}', 'price': price,
+            'hotel_id': hotel.id, 'hotel__name': hotel.name,
+            'category_id': category.id, 'category__name': category.name,
+        })
+    return instances, values
+
+
+def measure(render, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return rows / best, best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help="Foods per response.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per path; the best run is reported.")
+    args = parser.parse_args()
+
+    instances, values = build_data(args.rows)
+    renderer = JSONRenderer()
+
+    cases = [
+        ('details', lambda: renderer.render(FoodDetailsSerializer(instances, many=True).data),
+         lambda: renderer.render(serialize_food_details_rows(values))),
+        ('food-only', lambda: renderer.render(FoodOnlyViewSerializer(instances, many=True).data),
+         lambda: renderer.render(serialize_food_only_rows(values))),
+    ]
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for name, model_path, fast_path in cases:
+        model_rate, model_time, model_body = measure(model_path, args.rows, args.repeat)
+        fast_rate, fast_time, fast_body = measure(fast_path, args.rows, args.repeat)
+        identical = 'identical' if model_body == fast_body else 'DIFFERENT'
+        print(f"{name:<10} model {model_rate:>10.0f} rows/s ({model_time * 1000:7.1f} ms)   "
+              f"fast {fast_rate:>10.0f} rows/s ({fast_time * 1000:7.1f} ms)   "
+              f"{fast_rate / model_rate:4.1f}x   JSON {identical}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Latency of the in-process hotel search index (hotel.search.SearchIndex).
+
+Usage:
+    python benchmarks/hotel_search.py
+    python benchmarks/hotel_search.py --hotels 100000 --queries 5000 --limit 10
+
+Builds an index of --hotels synthetic hotels (names and areas drawn like
+core.seeding, plus a made-up word so names are not all alike) and runs
+autocomplete-style queries against it: short prefixes, whole words, two
+words, and misspelled words. Reports build time, memory held by the
+index, and p50/p95/p99 latency per query kind.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_food_delivery.settings')
+
+import django
+
+django.setup()
+
+from core.seeding import HOTEL_WORDS, LOCATIONS
+from hotel.search import SearchIndex
+
+SYLLABLES = ('ka', 'ra', 'ma', 'ni', 'shi', 'van', 'thi', 'lu', 'po', 'dha', 'ya', 'ru', 'mu', 'sel', 'ga')
+
+
+def made_up_word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+
+
+def synthetic_hotels(size, seed):
+    rng = random.Random(seed)
+    for hotel_id in range(1, size + 1):
+        name = f'{rng.choice(HOTEL_WORDS)} {made_up_word(rng)} {rng.choice(HOTEL_WORDS)}'
+        yield hotel_id, name, hotel_id, rng.choice(LOCATIONS)[0]
+
+
+def misspell(word, rng):
+    position = rng.randrange(1, len(word))
+    edit = rng.choice(('drop', 'swap', 'replace'))
+    if edit == 'drop':
+        return word[:position] + word[position + 1:]
+    if edit == 'swap' and position < len(word) - 1:
+        return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+
+
+def build_queries(hotels, count, seed):
+    """
+    Returns {kind: [query]} drawn from the indexed names.
+    """
+    rng = random.Random(seed)
+    sample = [rng.choice(hotels) for _ in range(count)]
+    queries = {'prefix-2': [], 'prefix-4': [], 'word': [], 'two-words': [], 'misspelled': []}
+    for _, name, _, area in sample:
+        words = name.lower().split()
+        word = rng.choice(words)
+        queries['prefix-2'].append(word[:2])
+        queries['prefix-4'].append(word[:4])
+        queries['word'].append(word)
+        queries['two-words'].append(f'{words[1][:3]} {area.lower()[:3]}')
+        queries['misspelled'].append(misspell(words[1], rng))
+    return queries
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hotels', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000, help="Queries per kind.")
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    hotels = list(synthetic_hotels(args.hotels, args.seed))
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = SearchIndex()
+    for hotel in hotels:
+        index.add(*hotel)
+    build_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"Indexed {len(index)} hotels in {build_time:.2f}s, {memory / 1024 / 1024:.1f} MiB")
+
+    print(f"{'query':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'results':>9}")
+    for kind, queries in build_queries(hotels, args.queries, args.seed).items():
+        timings, results = [], 0
+        for query in queries:
+            start = time.perf_counter()
+            results += len(index.search(query, args.limit))
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"{kind:<12}{percentile(timings, 0.50) * 1000:>10.3f}{percentile(timings, 0.95) * 1000:>10.3f}"
+              f"{percentile(timings, 0.99) * 1000:>10.3f}{timings[-1] * 1000:>10.3f}{results / len(queries):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,335 @@
+"""
+Load benchmark for the REST API.
+
+Usage:
+    python benchmarks/load_api.py
+    python benchmarks/load_api.py --hotels 500 --foods-per-hotel 40 --concurrency 16 --requests 2000
+    python benchmarks/load_api.py --endpoints foods hotels --compare benchmarks/results/<earlier run>.json
+
+A test database is created from the default database settings (as
+`manage.py test` does) and seeded with a deterministic dataset. The
+project is then served by Django's threaded WSGI server on a local port,
+and --concurrency clients send --requests requests per endpoint over
+keep-alive connections, after --warmup requests that are not counted.
+
+Per endpoint it reports req/s, p50/p95/p99 latency, errors and database
+queries per request (read from the core.telemetry histograms of the
+server). Results are written as JSON, named after the commit, so runs can
+be compared with --compare.
+
+Run it against PostgreSQL like production; SQLite locks whole tables on
+writes, so the cart and login endpoints report errors under concurrency.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_food_delivery.settings')
+os.environ.setdefault('LOG_CONSOLE', 'False')
+os.environ.setdefault('LOG_LEVEL', 'INFO')
+
+import django
+
+django.setup()
+
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+
+from authenticate.models import CustomUser
+from core.seeding import DataSeeder
+from core.telemetry import DB_QUERIES, REQUEST_DURATION, reset_metrics
+from food.models import Food
+from hotel.models import Hotel
+from hotel.view_counts import view_counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+PASSWORD = 'benchmark-password'
+
+
+class Dataset:
+    """
+    Seeds hotels, foods, categories, users and carts with core.seeding.DataSeeder.
+    The same arguments always produce the same rows.
+    """
+
+    def __init__(self, hotels, foods_per_hotel, categories, users, cart_items, seed):
+        self.options = {
+            'hotels': hotels, 'foods_per_hotel': foods_per_hotel, 'categories': categories,
+            'users': users, 'cart_items': cart_items, 'seed': seed,
+        }
+        self.seeder = DataSeeder(
+            hotels=hotels, foods_per_hotel=foods_per_hotel, categories=categories,
+            customers=users, cart_items=cart_items, seed=seed, password=PASSWORD,
+        )
+
+    def describe(self):
+        return dict(self.options)
+
+    def load(self):
+        self.seeder.run()
+        self.hotel_ids = list(Hotel.objects.values_list('id', flat=True))
+        self.food_ids = list(Food.objects.values_list('id', flat=True))
+        self.emails = list(CustomUser.objects.filter(role='customer').order_by('id').values_list('email', flat=True))
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class Client:
+    """
+    Keep-alive HTTP client for one benchmark thread.
+    """
+
+    def __init__(self, port, token=None):
+        self.port = port
+        self.token = token
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, body=None):
+        headers = {'Host': 'localhost'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            # The server closed the keep-alive connection; retry on a new one.
+            self.connection.close()
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            self.connection.request(method, path, payload, headers)
+            response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def close(self):
+        self.connection.close()
+
+
+def build_endpoints(dataset):
+    """
+    Returns {name: build(rng) -> (method, path, body)}.
+    """
+    return {
+        'foods': lambda rng: ('GET', '/foods/', None),
+        'foods_by_hotel': lambda rng: ('GET', f'/foods/?hotel_id={rng.choice(dataset.hotel_ids)}', None),
+        'hotels': lambda rng: ('GET', '/hotels/', None),
+        'address': lambda rng: ('GET', '/address/', None),
+        'cart_add': lambda rng: ('POST', '/cart/', {'food': rng.choice(dataset.food_ids), 'quantity': 1}),
+        'cart_bulk': lambda rng: ('POST', '/cart/bulk/', {
+            'items': [{'food': food_id, 'quantity': 1} for food_id in rng.sample(dataset.food_ids, 5)]
+        }),
+        'login': lambda rng: ('POST', '/login/', {'email': rng.choice(dataset.emails), 'password': PASSWORD}),
+    }
+
+
+def login_tokens(port, emails):
+    client = Client(port)
+    tokens = []
+    for email in emails:
+        status, body = client.request('POST', '/login/', {'email': email, 'password': PASSWORD})
+        if status != 200:
+            raise SystemExit(f"Login failed for {email}: {status} {body[:200]!r}")
+        tokens.append(json.loads(body)['access'])
+    client.close()
+    return tokens
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def run_endpoint(port, tokens, build, requests, warmup, concurrency, seed):
+    """
+    Sends `requests` requests from `concurrency` threads and returns their stats.
+    """
+    lock = threading.Lock()
+    remaining = {'warmup': warmup, 'measured': requests}
+    timings = []
+    errors = []
+
+    def take():
+        with lock:
+            for phase in ('warmup', 'measured'):
+                if remaining[phase]:
+                    remaining[phase] -= 1
+                    return phase
+        return None
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = Client(port, tokens[index % len(tokens)])
+        local_timings = []
+        local_errors = 0
+        while True:
+            phase = take()
+            if phase is None:
+                break
+            if phase == 'measured' and not local_timings and not local_errors:
+                barrier.wait()
+            method, path, body = build(rng)
+            start = time.perf_counter()
+            status, _ = client.request(method, path, body)
+            elapsed = time.perf_counter() - start
+            if phase == 'measured':
+                local_timings.append(elapsed)
+                local_errors += status >= 400
+        client.close()
+        with lock:
+            timings.extend(local_timings)
+            errors.append(local_errors)
+
+    def start_measuring():
+        reset_metrics()
+        marks['start'] = time.perf_counter()
+
+    # Measured requests start together once the warmup has finished.
+    marks = {}
+    barrier = threading.Barrier(min(concurrency, requests), action=start_measuring)
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - marks['start']
+
+    timings.sort()
+    queries = sum(series['sum'] for series in DB_QUERIES.series().values())
+    count = sum(series['count'] for series in DB_QUERIES.series().values())
+    server_time = sum(series['sum'] for series in REQUEST_DURATION.series().values())
+    return {
+        'requests': len(timings),
+        'errors': sum(errors),
+        'rps': round(len(timings) / elapsed, 1),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+        'server_mean_ms': round(server_time / count * 1000, 2) if count else None,
+        'queries_per_request': round(queries / count, 2) if count else None,
+    }
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def print_results(results, baseline=None):
+    print(f"{'endpoint':<16}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}{'errors':>8}")
+    for name, stats in results['endpoints'].items():
+        line = (f"{name:<16}{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['queries_per_request'] or 0:>9.2f}{stats['errors']:>8}")
+        old = (baseline or {}).get('endpoints', {}).get(name)
+        if old:
+            line += (f"   req/s {(stats['rps'] - old['rps']) / old['rps'] * 100:+.1f}%"
+                     f"   p99 {(stats['p99_ms'] - old['p99_ms']) / old['p99_ms'] * 100:+.1f}%")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hotels', type=int, default=200)
+    parser.add_argument('--foods-per-hotel', type=int, default=20)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--users', type=int, default=50, help="Customers, each with a cart.")
+    parser.add_argument('--cart-items', type=int, default=0, help="Items already in each customer's cart.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=8, help="Client threads.")
+    parser.add_argument('--requests', type=int, default=1000, help="Measured requests per endpoint.")
+    parser.add_argument('--warmup', type=int, default=50, help="Uncounted requests per endpoint.")
+    parser.add_argument('--endpoints', nargs='+', help="Endpoints to run (default: all).")
+    parser.add_argument('--output', help="Result file (default: benchmarks/results/load-<commit>-<time>.json).")
+    parser.add_argument('--compare', help="Earlier result file to compare with.")
+    args = parser.parse_args()
+
+    dataset = Dataset(args.hotels, args.foods_per_hotel, args.categories, args.users, args.cart_items, args.seed)
+    endpoints = build_endpoints(dataset)
+    selected = args.endpoints or list(endpoints)
+    unknown = set(selected) - set(endpoints)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}. Choose from {', '.join(endpoints)}.")
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    server = None
+    try:
+        start = time.perf_counter()
+        dataset.load()
+        print(f"Seeded {dataset.describe()} in {time.perf_counter() - start:.1f}s on {connection.vendor}")
+
+        server = start_server()
+        port = server.server_address[1]
+        tokens = login_tokens(port, dataset.emails[:args.concurrency])
+
+        commit, dirty = git_commit()
+        results = {
+            'commit': commit,
+            'dirty': dirty,
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'python': sys.version.split()[0],
+            'dataset': dataset.describe(),
+            'load': {'concurrency': args.concurrency, 'requests': args.requests, 'warmup': args.warmup},
+            'endpoints': {},
+        }
+        for name in selected:
+            results['endpoints'][name] = run_endpoint(
+                port, tokens, endpoints[name], args.requests, args.warmup, args.concurrency, args.seed
+            )
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        view_counter.flush()
+        teardown_databases(old_config, verbosity=0)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load-{commit}{'-dirty' if dirty else ''}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {baseline.get('commit')} ({args.compare})")
+    print_results(results, baseline)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Measures the latency logging adds to a request.
+
+Usage:
+    python benchmarks/logging_overhead.py
+    python benchmarks/logging_overhead.py --requests 20000 --sample-rate 0.1
+
+Each simulated request makes the log calls of a food create and a hotel
+listing (request body at DEBUG, results at INFO). Modes compared:
+    off    app loggers disabled
+    sync   the previous setup: FileHandler + StreamHandler on the request thread
+    queue  core.logger_config.setup_logging (queue + background listener)
+Console output goes to /dev/null and log files to a temp directory.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_food_delivery.settings')
+
+import django
+
+django.setup()
+
+from django.test.utils import override_settings
+
+from core import logger_config
+from core.filter import TraceIDFilter
+
+REQUEST_DATA = {'name': 'Paneer Butter Masala', 'price': '240.00', 'category': 3, 'hotel': 12, 'notes': 'x' * 200}
+
+
+def simulated_request(food_logger, hotel_logger):
+    food_logger.debug("Fetching food items with filters: %s", REQUEST_DATA)
+    food_logger.debug("Creating new food item with data: %s", REQUEST_DATA)
+    food_logger.info("New food item created: %s (ID: %s)", REQUEST_DATA['name'], 42)
+    hotel_logger.debug("Insert hotel request data: %s", REQUEST_DATA)
+    hotel_logger.info("Hotels retrieved: %s", 50)
+
+
+def run(requests):
+    food_logger = logging.getLogger('food.bench')
+    hotel_logger = logging.getLogger('hotel.bench')
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        simulated_request(food_logger, hotel_logger)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'mean_us': sum(timings) / len(timings) * 1e6,
+        'p50_us': timings[len(timings) // 2] * 1e6,
+        'p99_us': timings[int(len(timings) * 0.99)] * 1e6,
+    }
+
+
+def reset_loggers():
+    logger_config.stop_logging()
+    for name in logger_config.APP_LOGGERS:
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        logger.disabled = False
+
+
+def setup_sync(log_dir, console_stream):
+    formatter = logging.Formatter(logger_config.LOG_FORMAT)
+    for name in ('food', 'hotel'):
+        logger = logging.getLogger(name)
+        for handler in (logging.FileHandler(os.path.join(log_dir, f'{name}-sync.log')),
+                        logging.StreamHandler(console_stream)):
+            handler.setFormatter(formatter)
+            handler.addFilter(TraceIDFilter())
+            logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--sample-rate', type=float, default=1.0, help="LOG_DEBUG_SAMPLE_RATE for the queue mode.")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, 'w') as devnull:
+        logger_config.LOG_DIR = log_dir
+        stderr = sys.stderr
+
+        reset_loggers()
+        for name in logger_config.APP_LOGGERS:
+            logging.getLogger(name).disabled = True
+        results['off'] = run(args.requests)
+
+        reset_loggers()
+        setup_sync(log_dir, devnull)
+        results['sync'] = run(args.requests)
+
+        reset_loggers()
+        sys.stderr = devnull
+        try:
+            with override_settings(LOG_DEBUG_SAMPLE_RATE=args.sample_rate, LOG_LEVELS={}, LOG_LEVEL='DEBUG'):
+                logger_config.setup_logging()
+                results['queue'] = run(args.requests)
+                logger_config.stop_logging()
+        finally:
+            sys.stderr = stderr
+        reset_loggers()
+
+    print(f"{args.requests} simulated requests, 5 log calls each")
+    for mode, stats in results.items():
+        print(f"{mode:<6} mean {stats['mean_us']:>8.2f} us   p50 {stats['p50_us']:>8.2f} us   p99 {stats['p99_us']:>8.2f} us")
+
+
+if __name__ == '__main__':
+    main()
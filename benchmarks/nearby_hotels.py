@@ -0,0 +1,90 @@
+"""
+Latency of the nearby-hotel grid (hotel.nearby.GeoGrid).
+
+Usage:
+    python benchmarks/nearby_hotels.py
+    python benchmarks/nearby_hotels.py --hotels 50000 --pincodes 19000 --queries 5000
+
+Places --pincodes synthetic pincode centroids over India, denser around
+a few metro areas as real ones are, and spreads --hotels hotels over
+them. Runs queries around random pincodes for several radii and reports
+build time, memory held by the grid, and p50/p95/p99 latency per radius.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_food_delivery.settings')
+
+import django
+
+django.setup()
+
+from address.pincode_directory import LATITUDE_RANGE, LONGITUDE_RANGE
+from hotel.nearby import DEFAULT_GRID_DEGREES, GeoGrid
+
+# (latitude, longitude) of metro areas that hold most of the hotels
+METROS = ((13.08, 80.27), (12.97, 77.59), (19.07, 72.88), (28.61, 77.21), (22.57, 88.36), (17.39, 78.49))
+RADII_KM = (2, 5, 10, 25, 50)
+
+
+def synthetic_pincodes(count, rng):
+    points = {}
+    for pincode in range(110001, 110001 + count):
+        if rng.random() < 0.5:
+            latitude, longitude = rng.choice(METROS)
+            points[pincode] = (rng.gauss(latitude, 0.15), rng.gauss(longitude, 0.15))
+        else:
+            points[pincode] = (rng.uniform(*LATITUDE_RANGE), rng.uniform(*LONGITUDE_RANGE))
+    return points
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hotels', type=int, default=50000)
+    parser.add_argument('--pincodes', type=int, default=19000)
+    parser.add_argument('--queries', type=int, default=2000, help="Queries per radius.")
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--cell-degrees', type=float, default=DEFAULT_GRID_DEGREES)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = synthetic_pincodes(args.pincodes, rng)
+    pincodes = list(points)
+    hotels = [(hotel_id, hotel_id, rng.choice(pincodes)) for hotel_id in range(1, args.hotels + 1)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    grid = GeoGrid(points.get, args.cell_degrees)
+    for hotel in hotels:
+        grid.add(*hotel)
+    build_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"Indexed {len(grid)} hotels at {len(grid.by_pincode)} pincodes in {build_time:.2f}s, "
+          f"{memory / 1024 / 1024:.1f} MiB")
+
+    centres = [points[rng.choice(pincodes)] for _ in range(args.queries)]
+    print(f"{'radius':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'results':>9}")
+    for radius in RADII_KM:
+        timings, results = [], 0
+        for latitude, longitude in centres:
+            start = time.perf_counter()
+            results += len(grid.nearest(latitude, longitude, radius, args.limit))
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"{f'{radius} km':<10}{percentile(timings, 0.50) * 1000:>10.3f}{percentile(timings, 0.95) * 1000:>10.3f}"
+              f"{percentile(timings, 0.99) * 1000:>10.3f}{timings[-1] * 1000:>10.3f}{results / len(centres):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Compares pincode lookups through the offline index with the HTTP postal client.
+
+Usage:
+    python benchmarks/pincode_lookup.py
+    python benchmarks/pincode_lookup.py --index address/data/pincodes.idx --live
+
+Without --index a synthetic index of --size pincodes is built in a temp
+directory. The HTTP path runs against the local postal stub unless --live
+is given, in which case POSTAL_API_BASE_URL is used.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_food_delivery.settings')
+
+import django
+
+django.setup()
+
+from django.test.utils import override_settings
+
+from address.pincode_directory import PincodeDirectory, write_index
+from utils.postal_api import fetch_city_state_from_pincode
+from utils.postal_stub import PostalStubServer
+
+
+def synthetic_locations(size, seed=42):
+    rng = random.Random(seed)
+    pincodes = rng.sample(range(110001, 855118), size)
+    return {pincode: (f"District {pincode % 700}", f"State {pincode % 36}") for pincode in pincodes}
+
+
+def time_lookups(lookup, pincodes):
+    timings = []
+    for pincode in pincodes:
+        start = time.perf_counter()
+        lookup(pincode)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'mean_us': sum(timings) / len(timings) * 1e6,
+        'p50_us': timings[len(timings) // 2] * 1e6,
+        'p99_us': timings[int(len(timings) * 0.99)] * 1e6,
+    }
+
+
+def print_row(name, stats, memory):
+    print(f"{name:<10} mean {stats['mean_us']:>10.2f} us   p50 {stats['p50_us']:>10.2f} us   "
+          f"p99 {stats['p99_us']:>10.2f} us   {memory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--index', help="Existing pincode index to benchmark.")
+    parser.add_argument('--size', type=int, default=20000, help="Pincodes in the synthetic index.")
+    parser.add_argument('--lookups', type=int, default=100000, help="Lookups against the index.")
+    parser.add_argument('--http-lookups', type=int, default=200, help="Lookups through the HTTP client.")
+    parser.add_argument('--live', action='store_true', help="Use the real postal API for the HTTP path.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index_path = args.index
+        locations = None
+        if not index_path:
+            locations = synthetic_locations(args.size)
+            index_path = os.path.join(temp_dir, 'pincodes.idx')
+            write_index(locations, index_path)
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.start()
+        directory = PincodeDirectory(index_path)
+        heap_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        sample = list(locations) if locations else [610001 + i for i in range(1000)]
+        rng = random.Random(7)
+        index_stats = time_lookups(directory.lookup, [rng.choice(sample) for _ in range(args.lookups)])
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"Index: {len(directory)} pincodes, file {os.path.getsize(index_path) / 1024:.1f} KiB")
+        print_row('index', index_stats,
+                  f"heap {heap_bytes / 1024:.1f} KiB, max RSS +{(rss_after - rss_before)} KiB")
+        directory.close()
+
+        http_pincodes = [rng.choice(sample) for _ in range(args.http_lookups)]
+        if args.live:
+            http_stats = time_lookups(fetch_city_state_from_pincode, http_pincodes)
+            print_row('http-live', http_stats, "")
+        else:
+            stub_locations = {pincode: locations[pincode] for pincode in http_pincodes} if locations else {}
+            with PostalStubServer(stub_locations) as stub, override_settings(POSTAL_API_BASE_URL=stub.url):
+                http_stats = time_lookups(fetch_city_state_from_pincode, http_pincodes)
+            print_row('http-stub', http_stats, "")
+
+        print(f"Index lookups are {http_stats['mean_us'] / index_stats['mean_us']:.0f}x faster on average.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Throughput of stock reservations (orders.stock) on a single hot food.
+
+Usage:
+    python benchmarks/stock_reservations.py
+    python benchmarks/stock_reservations.py --workers 1 8 32 128 --seconds 10 --quantity 1
+
+A test database is created from the default database settings (as
+`manage.py test` does) with one tracked food. For each --workers count,
+that many threads reserve --quantity units of the food in a loop for
+--seconds, one transaction per reservation, as a cart add or checkout
+does. It reports reservations/s, p50/p99 latency and errors.
+
+Each run then sells the food out: --sellout units of stock against the
+same workers. It checks that exactly the stock was reserved and that it
+did not go below zero.
+
+All workers contend for the same row lock, so the throughput is bounded
+by the time from the UPDATE to the COMMIT. Run it against PostgreSQL
+like production; on SQLite writers take turns on the whole database.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_food_delivery.settings')
+os.environ.setdefault('LOG_CONSOLE', 'False')
+os.environ.setdefault('LOG_LEVEL', 'INFO')
+
+import django
+
+django.setup()
+
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import setup_databases, teardown_databases
+
+from core.seeding import DataSeeder
+from food.models import Food
+from orders.stock import reserve_stock
+
+UNLIMITED_STOCK = 10 ** 9
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))] if timings else 0.0
+
+
+def run_workers(food_id, workers, quantity, seconds=None):
+    """
+    Reserves from `workers` threads until `seconds` pass, or until the
+    stock runs out when `seconds` is None.
+
+    Returns:
+        dict: reserved, short, errors, timings (sorted seconds) and elapsed.
+    """
+    results = {'reserved': 0, 'short': 0, 'errors': 0, 'timings': []}
+    lock = threading.Lock()
+    barrier = threading.Barrier(workers + 1)
+    sold_out = threading.Event()
+    deadline = []
+
+    def worker():
+        reserved = short = errors = 0
+        timings = []
+        try:
+            barrier.wait()
+            while not sold_out.is_set() and (seconds is None or time.perf_counter() < deadline[0]):
+                start = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        missing = reserve_stock({food_id: quantity})
+                except DatabaseError:
+                    errors += 1
+                    continue
+                timings.append(time.perf_counter() - start)
+                if missing:
+                    short += 1
+                    if seconds is None:
+                        sold_out.set()
+                else:
+                    reserved += 1
+        finally:
+            connection.close()
+            with lock:
+                results['reserved'] += reserved
+                results['short'] += short
+                results['errors'] += errors
+                results['timings'].extend(timings)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    deadline.append(time.perf_counter() + (seconds or 0))
+    start = time.perf_counter()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    results['elapsed'] = time.perf_counter() - start
+    results['timings'].sort()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--seconds', type=float, default=5.0, help="Measured time per worker count.")
+    parser.add_argument('--quantity', type=int, default=1, help="Units per reservation.")
+    parser.add_argument('--sellout', type=int, default=1000, help="Stock of the sell-out check.")
+    args = parser.parse_args()
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        DataSeeder(hotels=1, foods_per_hotel=1, categories=1, customers=0, cart_items=0, seed=42).run()
+        food_id = Food.objects.values_list('id', flat=True).first()
+        print(f"Reserving {args.quantity} unit(s) of food {food_id} on {connection.vendor}")
+        print(f"{'workers':<9}{'res/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'sell-out':>12}")
+
+        for workers in args.workers:
+            Food.objects.filter(id=food_id).update(stock=UNLIMITED_STOCK)
+            run = run_workers(food_id, workers, args.quantity, args.seconds)
+
+            Food.objects.filter(id=food_id).update(stock=args.sellout)
+            sellout = run_workers(food_id, workers, args.quantity)
+            left = Food.objects.get(id=food_id).stock
+            sold = sellout['reserved'] * args.quantity
+            correct = left >= 0 and sold + left == args.sellout and left < args.quantity
+            print(
+                f"{workers:<9}{run['reserved'] / run['elapsed']:>10.0f}"
+                f"{percentile(run['timings'], 0.5) * 1000:>10.2f}{percentile(run['timings'], 0.99) * 1000:>10.2f}"
+                f"{run['errors'] + sellout['errors']:>8}{'ok' if correct else f'BAD {sold}+{left}':>12}"
+            )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .telemetry import install_query_tracking
+
+        connection_created.connect(install_query_tracking)
+
+        from .jobs import autodiscover_tasks
+
+        autodiscover_tasks()
@@ -0,0 +1,93 @@
+from django.contrib.auth.models import AnonymousUser
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from authenticate.authentication import ClaimsJWTAuthentication
+from authenticate.permissions import IsAccessToAll
+from .exception_handler import handle_exceptions
+from .renderers import TimedJSONRenderer
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Base for read-only views whose handlers are coroutines.
+
+    DRF's APIView runs handlers synchronously, so under ASGI every request
+    would hold a worker thread. This view keeps the request on the event
+    loop and mirrors what APIView does around the handler:
+
+        - Authenticates with ClaimsJWTAuthentication (async user lookup).
+        - Checks `permission_classes`; anonymous requests get 401, others 403.
+        - Turns exceptions into responses with core.exception_handler.
+        - Renders the DRF Response as JSON with TimedJSONRenderer.
+
+    Handlers receive a DRF Request, so services read `request.query_params`
+    and `request.user` as they do in the sync views. Only GET is served.
+    """
+
+    http_method_names = ['get']
+    authentication_class = ClaimsJWTAuthentication
+    permission_classes = [IsAccessToAll]
+    renderer_class = TimedJSONRenderer
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        self.authenticator = self.authentication_class()
+        request = Request(request, authenticators=[self.authenticator])
+        try:
+            await self.initial(request)
+            if request.method.lower() not in self.http_method_names:
+                raise exceptions.MethodNotAllowed(request.method)
+            handler = getattr(self, request.method.lower())
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(request, exc)
+        return self.finalize_response(request, response)
+
+    async def initial(self, request):
+        """
+        Authenticates the request and checks permissions.
+        """
+        if getattr(request._request, '_force_auth_user', None) is not None:
+            # Set by APIClient.force_authenticate in tests, as DRF's Request honours it.
+            result = (request._request._force_auth_user, getattr(request._request, '_force_auth_token', None))
+        else:
+            result = await self.authenticator.aauthenticate(request)
+        if result is not None:
+            request.user, request.auth = result
+        else:
+            request.user, request.auth = AnonymousUser(), None
+
+        for permission in [permission() for permission in self.permission_classes]:
+            if not permission.has_permission(request, self):
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+
+    def get_renderer_context(self, request):
+        return {'view': self, 'args': self.args, 'kwargs': self.kwargs, 'request': request}
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authenticator.authenticate_header(request)
+
+        response = handle_exceptions(exc, self.get_renderer_context(request))
+        if response is None:
+            raise exc
+        auth_header = getattr(exc, 'auth_header', None)
+        if auth_header:
+            response['WWW-Authenticate'] = auth_header
+        response.exception = True
+        return response
+
+    def finalize_response(self, request, response):
+        renderer = self.renderer_class()
+        response.accepted_renderer = renderer
+        response.accepted_media_type = renderer.media_type
+        response.renderer_context = self.get_renderer_context(request)
+        return response.render()
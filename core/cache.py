@@ -0,0 +1,25 @@
+"""
+Whether the default cache is shared by all processes.
+
+Features that keep state other processes must see in the cache, like
+the menu cache versions, cannot rely on a per-process backend (LocMem)
+or on the dummy one: a change made by a `run_workers` process or another
+web worker would never reach the process serving the request. They
+check `is_shared_cache()` and fall back to the database otherwise.
+
+Settings:
+    - CACHE_ASSUME_SHARED: Treat a per-process backend as shared, for
+      deployments running a single process (e.g. runserver).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache():
+    if getattr(settings, 'CACHE_ASSUME_SHARED', False):
+        return True
+    return not isinstance(caches['default'], LOCAL_CACHE_BACKENDS)
@@ -0,0 +1,278 @@
+"""
+Read replicas with read-your-writes stickiness.
+
+Reads inside a `replica_reads(request)` block go to a healthy replica;
+everything else stays on the primary (`default`):
+
+    - writes, and reads inside a transaction on the primary
+    - reads of a request that already wrote
+    - reads of a user who wrote in the last REPLICA_PIN_SECONDS
+      (PrimaryPinMiddleware pins them through the cache, which needs a
+      cache shared by all workers to reach all of them)
+
+Keep REPLICA_PIN_SECONDS above REPLICA_MAX_LAG_SECONDS, so a pin outlasts
+the lag of any replica still serving reads.
+
+Each replica is checked at most every REPLICA_CHECK_INTERVAL seconds;
+one that fails the check, is not streaming from the primary or lags
+more than REPLICA_MAX_LAG_SECONDS behind it is skipped until a later
+check passes. With no
+healthy replica, reads fall back to the primary.
+
+Settings:
+    - DATABASE_REPLICAS: Aliases of the replica databases.
+    - REPLICA_PIN_SECONDS, REPLICA_MAX_LAG_SECONDS, REPLICA_CHECK_INTERVAL
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .telemetry import register_collector, render_gauge
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PIN_SECONDS = 10
+DEFAULT_MAX_LAG_SECONDS = 5.0
+DEFAULT_CHECK_INTERVAL = 5.0
+
+# Whether the WAL receiver is streaming, and the lag: zero when the replica has
+# replayed all it received, else the age of the last replayed transaction. A
+# standby cut off from the primary has no receiver (its status is only visible
+# to pg_read_all_stats members), and its receive and replay positions stay equal.
+POSTGRES_LAG_SQL = """
+    SELECT
+        EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE pid IS NOT NULL AND COALESCE(status, 'streaming') = 'streaming'
+        ),
+        CASE
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+"""
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_request_writes = ContextVar('request_writes', default=None)
+
+
+def get_replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def replica_lag(alias):
+    """
+    Returns how many seconds the replica is behind the primary; 0 for
+    databases without replication, like SQLite, and None for a PostgreSQL
+    replica that is not streaming from the primary.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'postgresql':
+            cursor.execute('SELECT 0')
+            return float(cursor.fetchone()[0])
+        cursor.execute(POSTGRES_LAG_SQL)
+        streaming, lag = cursor.fetchone()
+        return float(lag or 0) if streaming else None
+
+
+class ReplicaPool:
+    """
+    Health and lag of the replicas, each checked at most every
+    REPLICA_CHECK_INTERVAL seconds by whichever request needs it first.
+    """
+
+    def __init__(self):
+        self._states = {}  # alias -> (healthy, lag, checked at)
+        self._checking = {}  # alias -> lock held while a thread checks it
+        self._lock = threading.Lock()
+
+    def check(self, alias):
+        """
+        Checks the replica now and returns whether it may serve reads.
+        """
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', DEFAULT_MAX_LAG_SECONDS)
+        try:
+            lag = replica_lag(alias)
+        except DatabaseError as e:
+            healthy, lag = False, None
+            reason = str(e)
+        else:
+            if lag is None:
+                healthy, reason = False, "not streaming from the primary"
+            else:
+                healthy = lag <= max_lag
+                reason = f"{lag:.1f}s behind"
+
+        previous = self._states.get(alias)
+        self._states[alias] = (healthy, lag, time.monotonic())
+        if previous is None or previous[0] != healthy:
+            log = logger.info if healthy else logger.warning
+            log("Replica %s %s (%s)", alias, 'serves reads' if healthy else 'skipped', reason)
+        return healthy
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'REPLICA_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+        state = self._states.get(alias)
+        if state is not None and time.monotonic() - state[2] < interval:
+            return state[0]
+
+        with self._lock:
+            checking = self._checking.setdefault(alias, threading.Lock())
+        # Other threads keep the last result (or skip an unchecked replica) meanwhile.
+        if not checking.acquire(blocking=False):
+            return state is not None and state[0]
+        try:
+            return self.check(alias)
+        finally:
+            checking.release()
+
+    def choose(self):
+        """
+        Returns a random healthy replica, or None.
+        """
+        healthy = [alias for alias in get_replica_aliases() if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+    def states(self):
+        return dict(self._states)
+
+    def reset(self):
+        self._states.clear()
+
+
+replicas = ReplicaPool()
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """
+    Keeps the user's reads on the primary for REPLICA_PIN_SECONDS.
+    """
+    cache.set(_pin_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS))
+
+
+async def apin_to_primary(user_id):
+    await cache.aset(_pin_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS))
+
+
+def _user_id(request):
+    user = getattr(request, 'user', None)
+    return user.id if user is not None and user.is_authenticated else None
+
+
+class ReplicaReads:
+    """
+    Context manager, sync or async, sending the reads in its block to a
+    replica unless the request's user is pinned to the primary.
+    """
+
+    def __init__(self, request):
+        self.user_id = _user_id(request) if get_replica_aliases() else None
+        self.token = None
+
+    def __enter__(self):
+        pinned = self.user_id is not None and cache.get(_pin_key(self.user_id))
+        self.token = _replica_reads.set(bool(get_replica_aliases()) and not pinned)
+        return self
+
+    def __exit__(self, *exc_info):
+        _replica_reads.reset(self.token)
+
+    async def __aenter__(self):
+        pinned = self.user_id is not None and await cache.aget(_pin_key(self.user_id))
+        self.token = _replica_reads.set(bool(get_replica_aliases()) and not pinned)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        _replica_reads.reset(self.token)
+
+
+def replica_reads(request):
+    return ReplicaReads(request)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Keeps the reads in the block on the primary, inside replica_reads too;
+    for results that outlive the request, like cached menus.
+    """
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class RequestWrites:
+    """
+    Whether the current request wrote to the primary.
+    """
+
+    def __init__(self):
+        self.wrote = False
+
+
+def start_request():
+    writes = RequestWrites()
+    return writes, _request_writes.set(writes)
+
+
+def end_request(token):
+    _request_writes.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads marked by replica_reads to a healthy replica and all
+    other queries to the primary (see the module docstring).
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        writes = _request_writes.get()
+        if writes is not None and writes.wrote:
+            return DEFAULT_DB_ALIAS
+        return replicas.choose() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        writes = _request_writes.get()
+        if writes is not None:
+            writes.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS, *get_replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def render_replica_metrics():
+    """
+    Returns replica health and lag gauges of this process, for /metrics.
+    """
+    states = replicas.states()
+    if not states:
+        return ''
+    healthy = {(alias,): int(state[0]) for alias, state in states.items()}
+    lag = {(alias,): state[1] for alias, state in states.items() if state[1] is not None}
+    return '\n'.join([
+        render_gauge('db_replica_healthy', 'Whether the replica served reads at its last check.', healthy, ('alias',)),
+        render_gauge('db_replica_lag_seconds', 'Replication lag at the last check.', lag, ('alias',)),
+    ])
+
+
+register_collector(render_replica_metrics)
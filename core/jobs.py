@@ -0,0 +1,376 @@
+"""
+Durable background jobs queued in the database, without an outside broker.
+
+Tasks are plain functions registered with the `task` decorator, in a
+`jobs` module of any installed app (imported when the workers start):
+
+    @task(dedup_key='hotel-deactivation:{0}')
+    def finish_hotel_deactivation(hotel_id):
+        ...
+
+    finish_hotel_deactivation.defer(hotel.id)
+
+`defer()` inserts a Job row in the caller's transaction, so the job only
+becomes visible to workers once the change that needed it commits.
+`manage.py run_workers` claims due jobs, runs them and deletes them;
+failures are retried with exponential backoff until the task's
+max_attempts, then kept as failed. A dedup key keeps at most one queued
+job per key: deferring again while one is queued returns that job.
+
+Arguments and keyword arguments must be JSON serializable. Tasks may run
+more than once (a worker can die after the work but before the delete),
+so they should be idempotent.
+
+Settings:
+    - JOBS_EAGER: Run tasks inline in defer() instead of queueing them.
+    - JOBS_LEASE_SECONDS: How long a claimed job may run before it is
+      considered abandoned and queued again.
+    - JOBS_RETRY_BACKOFF / JOBS_RETRY_BACKOFF_MAX: Seconds before the
+      first retry, doubled on each attempt up to the max.
+"""
+import logging
+import random
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .filter import set_trace_id
+from .models import Job
+from .telemetry import JOB_DURATION, JOB_WAIT, register_collector, render_gauge
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'default'
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_RETRY_BACKOFF = 5
+DEFAULT_RETRY_BACKOFF_MAX = 3600
+
+_tasks = {}
+
+
+class Task:
+    """
+    A function that can be run now or deferred to the job queue.
+    """
+
+    def __init__(self, func, name, queue, max_attempts, dedup_key):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.dedup_key = dedup_key
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def defer(self, *args, **kwargs):
+        """
+        Queues a call of the task; see `defer`.
+        """
+        dedup_key = self.dedup_key.format(*args, **kwargs) if self.dedup_key else None
+        return defer(self.name, *args, _queue=self.queue, _max_attempts=self.max_attempts, _dedup_key=dedup_key, **kwargs)
+
+
+def task(name=None, queue=DEFAULT_QUEUE, max_attempts=DEFAULT_MAX_ATTEMPTS, dedup_key=None):
+    """
+    Registers a function as a task.
+
+    Args:
+        name: Name jobs refer to it by; defaults to `module.function`.
+        queue: Queue its jobs go to (workers can serve a subset of queues).
+        max_attempts: Runs before a failing job is kept as failed.
+        dedup_key: Format string of the call's arguments, e.g. 'cart:{0}';
+            while a job with the same key is queued, defer() reuses it.
+    """
+    def register(func):
+        registered = Task(func, name or f'{func.__module__}.{func.__qualname__}', queue, max_attempts, dedup_key)
+        _tasks[registered.name] = registered
+        return registered
+    return register
+
+
+def get_task(name):
+    return _tasks.get(name)
+
+
+def autodiscover_tasks():
+    """
+    Imports the `jobs` module of every installed app, registering its tasks.
+    """
+    autodiscover_modules('jobs')
+
+
+def defer(task_name, *args, _queue=DEFAULT_QUEUE, _max_attempts=DEFAULT_MAX_ATTEMPTS, _dedup_key=None,
+          _delay=0, **kwargs):
+    """
+    Queues `task_name(*args, **kwargs)` to run in a worker.
+
+    Returns:
+        Job: The queued job, or the already queued one with the same dedup key.
+            None when JOBS_EAGER ran the task inline.
+    """
+    if getattr(settings, 'JOBS_EAGER', False):
+        _tasks[task_name](*args, **kwargs)
+        return None
+
+    if _dedup_key is not None:
+        queued = Job.objects.filter(dedup_key=_dedup_key, state=Job.QUEUED).first()
+        if queued is not None:
+            return queued
+
+    fields = {
+        'task': task_name,
+        'args': list(args),
+        'kwargs': kwargs,
+        'queue': _queue,
+        'max_attempts': _max_attempts,
+        'dedup_key': _dedup_key,
+        'run_at': timezone.now() + timedelta(seconds=_delay),
+    }
+    if _dedup_key is None:
+        job = Job.objects.create(**fields)
+    else:
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(**fields)
+        except IntegrityError:
+            # Another request queued the same key first.
+            return Job.objects.filter(dedup_key=_dedup_key, state=Job.QUEUED).first()
+    logger.debug("Job %s queued: %s", job.id, task_name)
+    return job
+
+
+def retry_delay(attempts):
+    """
+    Seconds to wait before retrying a job that failed `attempts` times,
+    doubling each time with up to 10% jitter so failed jobs spread out.
+    """
+    base = getattr(settings, 'JOBS_RETRY_BACKOFF', DEFAULT_RETRY_BACKOFF)
+    most = getattr(settings, 'JOBS_RETRY_BACKOFF_MAX', DEFAULT_RETRY_BACKOFF_MAX)
+    delay = min(base * 2 ** (attempts - 1), most)
+    return delay * random.uniform(1.0, 1.1)
+
+
+def claim_jobs(queues, worker_name, limit=1):
+    """
+    Moves up to `limit` due jobs of the queues to running and returns them.
+
+    Rows are picked with SKIP LOCKED where the database has it, and only
+    claimed if still queued, so concurrent workers never share a job.
+    """
+    now = timezone.now()
+    lease = getattr(settings, 'JOBS_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+    claim = f'{worker_name}:{uuid.uuid4().hex[:12]}'
+    with transaction.atomic():
+        job_ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(state=Job.QUEUED, queue__in=queues, run_at__lte=now)
+            .order_by('run_at', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not job_ids:
+            return []
+        Job.objects.filter(id__in=job_ids, state=Job.QUEUED).update(
+            state=Job.RUNNING,
+            locked_by=claim,
+            locked_until=now + timedelta(seconds=lease),
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(id__in=job_ids, locked_by=claim).order_by('run_at', 'id'))
+
+
+def run_job(job):
+    """
+    Runs a claimed job, then deletes it, retries it later or marks it failed.
+
+    Returns:
+        str: 'done', 'retry' or 'failed'.
+    """
+    JOB_WAIT.observe(max((job.started_at - job.run_at).total_seconds(), 0.0), task=job.task)
+    set_trace_id(f'job-{job.id}')
+    start = time.perf_counter()
+    claimed = Job.objects.filter(id=job.id, locked_by=job.locked_by)
+    try:
+        registered = get_task(job.task)
+        if registered is None:
+            raise LookupError(f"No task named {job.task!r} is registered")
+        registered.func(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            outcome = 'retry'
+            delay = retry_delay(job.attempts)
+            try:
+                with transaction.atomic():
+                    claimed.update(
+                        state=Job.QUEUED, locked_by='', locked_until=None, last_error=error,
+                        run_at=timezone.now() + timedelta(seconds=delay),
+                    )
+            except IntegrityError:
+                # A job with the same dedup key was queued while this one ran; it does the retry.
+                claimed.delete()
+            logger.warning("Job %s (%s) failed, attempt %d of %d, retrying in %.0fs",
+                           job.id, job.task, job.attempts, job.max_attempts, delay)
+        else:
+            outcome = 'failed'
+            claimed.update(state=Job.FAILED, locked_until=None, last_error=error)
+            logger.error("Job %s (%s) failed after %d attempt(s):\n%s", job.id, job.task, job.attempts, error)
+    else:
+        outcome = 'done'
+        claimed.delete()
+        logger.debug("Job %s (%s) done", job.id, job.task)
+    finally:
+        set_trace_id('-')
+    JOB_DURATION.observe(time.perf_counter() - start, task=job.task, outcome=outcome)
+    return outcome
+
+
+def recover_abandoned_jobs():
+    """
+    Queues again the running jobs whose lease expired (their worker died
+    or hung), or marks them failed if they have no attempts left.
+
+    Returns:
+        int: Number of jobs recovered.
+    """
+    expired = Job.objects.filter(state=Job.RUNNING, locked_until__lt=timezone.now())
+    error = "Lease expired before the job finished"
+    # Jobs whose dedup key was queued again meanwhile are covered by that job.
+    expired.filter(dedup_key__in=Job.objects.filter(state=Job.QUEUED).values('dedup_key')).delete()
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        state=Job.FAILED, locked_until=None, last_error=error
+    )
+    queued = expired.update(state=Job.QUEUED, locked_by='', locked_until=None, last_error=error)
+    if failed or queued:
+        logger.warning("Recovered abandoned jobs: %d queued again, %d failed", queued, failed)
+    return failed + queued
+
+
+def run_pending_jobs(queues=(DEFAULT_QUEUE,), worker_name='inline'):
+    """
+    Runs the due jobs of the queues in this thread until none are left.
+
+    Returns:
+        int: Number of jobs run.
+    """
+    count = 0
+    while True:
+        jobs = claim_jobs(queues, worker_name)
+        if not jobs:
+            return count
+        for job in jobs:
+            run_job(job)
+            count += 1
+
+
+class Worker:
+    """
+    Job worker threads of one process.
+
+    Each thread claims `batch_size` due jobs at a time from `queues` and
+    runs them, sleeping `poll_interval` seconds when there are none. One of
+    the threads also recovers abandoned jobs every `recover_interval`.
+    With `burst` the threads stop once the queues are empty.
+    """
+
+    def __init__(self, queues, threads=1, batch_size=1, poll_interval=1.0, recover_interval=60.0, burst=False,
+                 name=None):
+        self.queues = list(queues)
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.recover_interval = recover_interval
+        self.burst = burst
+        self.name = name or uuid.uuid4().hex[:8]
+        self.stop_event = threading.Event()
+        self._last_recovery = 0.0
+        self._recovery_lock = threading.Lock()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        """
+        Runs the threads until stopped (or, in burst mode, until the queues are empty).
+        """
+        workers = [
+            threading.Thread(target=self._work, args=(f'{self.name}-{index}',), name=f'job-worker-{index}')
+            for index in range(self.threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+    def _recover_if_due(self):
+        with self._recovery_lock:
+            if time.monotonic() - self._last_recovery < self.recover_interval:
+                return
+            self._last_recovery = time.monotonic()
+        recover_abandoned_jobs()
+
+    def _work(self, worker_name):
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                try:
+                    self._recover_if_due()
+                    jobs = claim_jobs(self.queues, worker_name, self.batch_size)
+                except DatabaseError as e:
+                    logger.error("Job worker %s could not claim jobs: %s", worker_name, str(e))
+                    jobs = []
+                if not jobs:
+                    if self.burst:
+                        return
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                for job in jobs:
+                    try:
+                        run_job(job)
+                    except DatabaseError as e:
+                        # The outcome was not recorded; the lease expiry retries the job.
+                        logger.error("Job worker %s lost job %s: %s", worker_name, job.id, str(e))
+        finally:
+            close_old_connections()
+
+
+def render_queue_metrics():
+    """
+    Returns queue depth and age gauges read from the Job table, for /metrics.
+    """
+    now = timezone.now()
+    try:
+        rows = list(
+            Job.objects.values('queue', 'state')
+            .annotate(count=Count('id'), oldest_due=Min('run_at', filter=Q(run_at__lte=now)))
+            .order_by()
+        )
+    except DatabaseError as e:
+        logger.error("Job queue metrics unavailable: %s", str(e))
+        return ''
+
+    depth = {(row['queue'], row['state']): row['count'] for row in rows}
+    age = {
+        (row['queue'],): (now - row['oldest_due']).total_seconds()
+        for row in rows
+        if row['state'] == Job.QUEUED and row['oldest_due'] is not None
+    }
+    return '\n'.join((
+        render_gauge('job_queue_depth', 'Jobs in the queue by state.', depth, ('queue', 'state')),
+        render_gauge('job_queue_oldest_due_seconds', 'Age of the oldest due job waiting in the queue.',
+                     age, ('queue',)),
+    ))
+
+
+register_collector(render_queue_metrics)
@@ -1,87 +1,209 @@
+import atexit
 import logging
-import logging.config
+import logging.handlers
 import os
+import queue
+import random
+import threading
+from collections import Counter
+
 from core.filter import TraceIDFilter  # make sure this path is correct
+from core.telemetry import register_collector, render_counter
 
 LOG_DIR = os.path.join(os.path.dirname(__file__), 'logs')
 os.makedirs(LOG_DIR, exist_ok=True)
 
-LOGGING_CONFIG = {
-    'version': 1,
-    'disable_existing_loggers': False,
-
-    'formatters': {
-        'verbose': {
-            'format': '[%(asctime)s] %(levelname)s [%(trace_id)s] %(name)s (%(filename)s:%(lineno)d): %(message)s',
-        },
-    },
-
-    'filters': {
-        'trace_id_filter': {
-            '()': TraceIDFilter,
-        },
-    },
-
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
-            'filters': ['trace_id_filter'],
-            'level': 'DEBUG',
-        },
-        'hotel_file': {
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(LOG_DIR, 'hotel.log'),
-            'formatter': 'verbose',
-            'filters': ['trace_id_filter'],
-            'level': 'DEBUG',
-        },
-        'food_file': {
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(LOG_DIR, 'food.log'),
-            'formatter': 'verbose',
-            'filters': ['trace_id_filter'],
-            'level': 'DEBUG',
-        },
-        'address_file': {
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(LOG_DIR, 'address.log'),
-            'formatter': 'verbose',
-            'filters': ['trace_id_filter'],
-            'level': 'DEBUG',
-        },
-        'authenticate_file': {
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(LOG_DIR, 'authenticate.log'),
-            'formatter': 'verbose',
-            'filters': ['trace_id_filter'],
-            'level': 'DEBUG',
-        },
-    },
-
-    'loggers': {
-        'hotel': {
-            'handlers': ['hotel_file', 'console'],
-            'level': 'DEBUG',
-            'propagate': True,
-        },
-        'food': {
-            'handlers': ['food_file', 'console'],
-            'level': 'DEBUG',
-            'propagate': True,
-        },
-        'address': {
-            'handlers': ['address_file', 'console'],
-            'level': 'DEBUG',
-            'propagate': True,
-        },
-        'authenticate': {
-            'handlers': ['authenticate_file', 'console'],
-            'level': 'DEBUG',
-            'propagate': True,
-        },
-    }
+LOG_FORMAT = '[%(asctime)s] %(levelname)s [%(trace_id)s] %(name)s (%(filename)s:%(lineno)d): %(message)s'
+
+# App loggers, each with its own log file
+APP_LOGGERS = ('hotel', 'food', 'address', 'authenticate', 'orders', 'core')
+
+DEFAULTS = {
+    'LOG_LEVEL': 'DEBUG',
+    'LOG_LEVELS': {},  # Per-logger overrides, e.g. {'hotel': 'INFO'}
+    'LOG_CONSOLE': True,
+    'LOG_CONSOLE_LEVEL': 'DEBUG',
+    'LOG_DEBUG_SAMPLE_RATE': 1.0,  # Share of DEBUG records kept, 0.0 - 1.0
+    'LOG_ROTATION': 'size',  # 'size' or 'time'
+    'LOG_MAX_BYTES': 10 * 1024 * 1024,
+    'LOG_ROTATE_WHEN': 'midnight',
+    'LOG_BACKUP_COUNT': 5,
+    'LOG_QUEUE_SIZE': 10000,
+    'LOG_QUEUE_BLOCK_TIMEOUT': 0.1,  # Seconds WARNING and above wait for room in a full queue
 }
 
+_listener = None
+_queue_handler = None
+
+# Records dropped on a full queue, by level name
+_dropped = Counter()
+_dropped_lock = threading.Lock()
+
+
+def get_logging_options():
+    """
+    Returns logging options from Django settings, or the defaults when
+    settings are not configured yet (manage.py sets up logging first).
+    """
+    from django.conf import settings
+
+    options = dict(DEFAULTS)
+    if settings.configured:
+        for name in DEFAULTS:
+            options[name] = getattr(settings, name, DEFAULTS[name])
+    return options
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keeps every record at INFO and above, and the given share of DEBUG records.
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops DEBUG and INFO records instead of blocking when
+    the queue is full. WARNING and above wait up to `block_timeout` seconds
+    for room first, and are only dropped if the listener is still behind.
+    Dropped records are counted in log_records_dropped_total.
+    """
+
+    def __init__(self, queue, block_timeout=0.0):
+        super().__init__(queue)
+        self.block_timeout = block_timeout
+
+    def prepare(self, record):
+        # The listener runs in this process, so the record is passed as is
+        # and formatted there; only the message is merged with its args here.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if record.levelno >= logging.WARNING and self.block_timeout > 0:
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with _dropped_lock:
+                _dropped[record.levelname] += 1
+
+
+def dropped_records():
+    """
+    Returns the number of records dropped so far, by level name.
+    """
+    with _dropped_lock:
+        return dict(_dropped)
+
+
+def render_log_metrics():
+    samples = {(level,): count for level, count in dropped_records().items()}
+    return render_counter('log_records_dropped_total', 'Log records dropped because the log queue was full.',
+                          samples, ('level',))
+
+
+class AppQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that waits for room for its stop sentinel, so stopping
+    with a full queue drains it instead of raising queue.Full.
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LoggerRoutingHandler(logging.Handler):
+    """
+    Runs on the listener thread and writes each record to the file
+    of the app logger it came from.
+    """
+
+    def __init__(self, handlers):
+        super().__init__()
+        self.handlers = handlers
+
+    def emit(self, record):
+        handler = self.handlers.get(record.name.split('.', 1)[0])
+        if handler is not None and record.levelno >= handler.level:
+            handler.handle(record)
+
+
+def build_file_handler(name, options, formatter):
+    filename = os.path.join(LOG_DIR, f'{name}.log')
+    if options['LOG_ROTATION'] == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(
+            filename, when=options['LOG_ROTATE_WHEN'], backupCount=options['LOG_BACKUP_COUNT'], delay=True
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=options['LOG_MAX_BYTES'], backupCount=options['LOG_BACKUP_COUNT'], delay=True
+        )
+    handler.setFormatter(formatter)
+    return handler
+
+
+def stop_logging():
+    """
+    Flushes queued records and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
 def setup_logging():
-    logging.config.dictConfig(LOGGING_CONFIG)
+    """
+    Sends app logs through a queue to a background listener thread.
+
+    Request threads only filter the record (trace id, DEBUG sampling) and
+    put it on the queue; formatting and file/console writes happen on the
+    listener. Calling it again replaces the previous setup.
+    """
+    global _listener, _queue_handler
+
+    options = get_logging_options()
+    stop_logging()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handlers = {name: build_file_handler(name, options, formatter) for name in APP_LOGGERS}
+    handlers = [LoggerRoutingHandler(file_handlers)]
+    if options['LOG_CONSOLE']:
+        console = logging.StreamHandler()
+        console.setFormatter(formatter)
+        console.setLevel(options['LOG_CONSOLE_LEVEL'])
+        handlers.append(console)
+
+    log_queue = queue.Queue(maxsize=options['LOG_QUEUE_SIZE'])
+    queue_handler = DroppingQueueHandler(log_queue, options['LOG_QUEUE_BLOCK_TIMEOUT'])
+    queue_handler.addFilter(TraceIDFilter())
+    queue_handler.addFilter(DebugSamplingFilter(options['LOG_DEBUG_SAMPLE_RATE']))
+
+    for name in APP_LOGGERS:
+        logger = logging.getLogger(name)
+        if _queue_handler is not None:
+            logger.removeHandler(_queue_handler)
+        logger.addHandler(queue_handler)
+        logger.setLevel(options['LOG_LEVELS'].get(name, options['LOG_LEVEL']))
+        logger.propagate = True
+
+    _queue_handler = queue_handler
+    _listener = AppQueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(stop_logging)
+register_collector(render_log_metrics)
@@ -0,0 +1,46 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Lower, Trim
+
+from utils.models import BaseModel
+
+
+class Command(BaseCommand):
+    """
+    Rewrites stored status values to the canonical 'active' / 'inactive'.
+
+    Rows written before the status values were normalised hold 'Active',
+    'ACTIVE' and similar. Those rows are invisible to the `active` manager
+    and to the partial indexes, so run this once after deploying.
+
+    Usage:
+        python manage.py normalize_status
+        python manage.py normalize_status --dry-run
+    """
+
+    help = "Normalise the status column of every BaseModel table to 'active'/'inactive'."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report rows that would change.")
+
+    def handle(self, *args, **options):
+        canonical = [BaseModel.ACTIVE, BaseModel.INACTIVE]
+
+        with transaction.atomic():
+            for model in apps.get_models():
+                if not issubclass(model, BaseModel):
+                    continue
+
+                stale = model._base_manager.exclude(status__in=canonical)
+                if options['dry_run']:
+                    updated = stale.count()
+                else:
+                    updated = stale.update(status=Lower(Trim('status')))
+                unknown = model._base_manager.exclude(status__in=canonical).count()
+
+                self.stdout.write(f"{model._meta.label}: {updated} row(s) normalised")
+                if unknown and not options['dry_run']:
+                    self.stdout.write(self.style.WARNING(
+                        f"{model._meta.label}: {unknown} row(s) have an unknown status"
+                    ))
@@ -0,0 +1,118 @@
+import multiprocessing
+import signal
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.jobs import DEFAULT_QUEUE, Worker
+from core.logger_config import setup_logging
+from core.telemetry import render_metrics
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port):
+    """
+    Serves this process's job metrics on the port from a daemon thread.
+    """
+    def metrics_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', PROMETHEUS_CONTENT_TYPE)])
+        return [render_metrics().encode()]
+
+    server = make_server('', port, metrics_app, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def run_worker_process(index, options):
+    """
+    Entry point of one worker process: runs the worker threads until SIGTERM/SIGINT.
+    """
+    if multiprocessing.parent_process() is not None:
+        if not apps.ready:
+            django.setup()
+        # The logging listener thread does not survive a fork.
+        setup_logging()
+    if options['metrics_port']:
+        serve_metrics(options['metrics_port'] + index)
+
+    worker = Worker(
+        options['queues'],
+        threads=options['threads'],
+        batch_size=options['batch_size'],
+        poll_interval=options['poll_interval'],
+        burst=options['burst'],
+        name=f'worker-{index}',
+    )
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *args: worker.stop())
+    worker.run()
+
+
+class Command(BaseCommand):
+    """
+    Runs job workers for the database job queue (see core.jobs).
+
+    Starts --processes worker processes with --threads threads each. Every
+    thread claims due jobs, runs them, and retries failures with backoff.
+    SIGTERM or Ctrl-C lets running jobs finish, then exits.
+
+    Threads suit jobs that wait on the network or the database; use more
+    processes for CPU-bound jobs.
+
+    Usage:
+        python manage.py run_workers
+        python manage.py run_workers --processes 4 --threads 8 --queue default --queue hotel
+        python manage.py run_workers --burst
+    """
+
+    help = "Run background job workers until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4, help="Worker threads per process.")
+        parser.add_argument('--queue', action='append', help=f"Queues to serve (default: {DEFAULT_QUEUE}).")
+        parser.add_argument('--batch-size', type=int, default=1, help="Jobs a thread claims at once.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when no job is due.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due.")
+        parser.add_argument(
+            '--metrics-port', type=int,
+            help="Serve each process's job metrics on this port plus the process index.",
+        )
+
+    def handle(self, *args, **options):
+        for name in ('processes', 'threads', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+
+        queues = options['queue'] or [DEFAULT_QUEUE]
+        worker_options = {name: options[name] for name in ('threads', 'batch_size', 'poll_interval', 'burst', 'metrics_port')}
+        worker_options['queues'] = queues
+        self.stdout.write(
+            f"Starting {options['processes']} process(es) x {options['threads']} thread(s) on {', '.join(queues)}"
+        )
+
+        if options['processes'] == 1:
+            run_worker_process(0, worker_options)
+        else:
+            # Connections must not be shared with the forked processes.
+            connections.close_all()
+            processes = [
+                multiprocessing.Process(target=run_worker_process, args=(index, worker_options), name=f'job-worker-{index}')
+                for index in range(options['processes'])
+            ]
+            for process in processes:
+                process.start()
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *args: [process.terminate() for process in processes])
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
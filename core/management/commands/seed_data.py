@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.seeding import DEFAULT_BATCH_SIZE, DEFAULT_PASSWORD, DataSeeder
+
+
+class Command(BaseCommand):
+    """
+    Loads a deterministic synthetic dataset for benchmarks and capacity planning.
+
+    Writes straight to the tables (see core.seeding.DataSeeder), so no
+    serializers, signals or postal API lookups run. Menus cached before
+    the run do not include the new foods until they expire.
+
+    Usage:
+        python manage.py seed_data
+        python manage.py seed_data --hotels 50000 --foods-per-hotel 20 --customers 100000
+        python manage.py seed_data --method bulk --batch-size 2000
+    """
+
+    help = "Seed hotels, foods, categories, users and carts with synthetic data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotels', type=int, default=1000, help="Hotels, each with its own address and manager.")
+        parser.add_argument('--foods-per-hotel', type=int, default=20)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--customers', type=int, default=1000, help="Customers, each with a cart.")
+        parser.add_argument('--cart-items', type=int, default=5, help="Items in each customer's cart.")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Rows per COPY or INSERT.")
+        parser.add_argument(
+            '--method', choices=('auto', 'copy', 'bulk'), default='auto',
+            help="COPY (PostgreSQL only) or bulk_create; 'auto' picks COPY on PostgreSQL.",
+        )
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help="Password of every seeded user.")
+
+    def handle(self, *args, **options):
+        for name in ('hotels', 'foods_per_hotel', 'categories', 'customers', 'cart_items', 'batch_size'):
+            if options[name] < 0 or (name in ('categories', 'batch_size') and options[name] == 0):
+                raise CommandError(f"--{name.replace('_', '-')} must be positive.")
+
+        try:
+            seeder = DataSeeder(
+                hotels=options['hotels'],
+                foods_per_hotel=options['foods_per_hotel'],
+                categories=options['categories'],
+                customers=options['customers'],
+                cart_items=options['cart_items'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                method=options['method'],
+                password=options['password'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Seeding with {seeder.method}...")
+        start = time.perf_counter()
+        report = seeder.run()
+        elapsed = time.perf_counter() - start
+
+        total = 0
+        for label, (rows, seconds) in report.items():
+            total += rows
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(f"{label:<38}{rows:>12} rows {seconds:>8.2f}s {rate:>12.0f} rows/s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
@@ -1,13 +1,136 @@
 import uuid
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import db_router
 from .filter import set_trace_id
+from .telemetry import end_request, start_request
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
 
 class TraceIDMiddleware:
+    """
+    Assigns a trace id to every request and records its telemetry.
+
+    Wall time, database queries and time, serializer time and response
+    size go to the histograms of core.telemetry, tagged by view and
+    method. Responses carry `X-Trace-Id` and `Server-Timing` headers.
+
+    Works in both sync and async chains, so async views stay on the
+    event loop under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        trace_id, metrics, token = self.start(request)
+        try:
+            response = self.get_response(request)
+            return self.finish(request, response, trace_id, metrics)
+        finally:
+            end_request(token)
+
+    async def __acall__(self, request):
+        trace_id, metrics, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+            return self.finish(request, response, trace_id, metrics)
+        finally:
+            end_request(token)
+
+    def start(self, request):
         trace_id = str(uuid.uuid4())
         set_trace_id(trace_id)
-        response = self.get_response(request)
-        return response
\ No newline at end of file
+        metrics, token = start_request()
+        return trace_id, metrics, token
+
+    def finish(self, request, response, trace_id, metrics):
+        metrics.record(self.get_view_name(request), request.method, self.get_response_size(response))
+        response['X-Trace-Id'] = trace_id
+        response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    @staticmethod
+    def get_view_name(request):
+        # Unmatched paths share one label so 404s cannot grow the series.
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match._func_path
+
+    @staticmethod
+    def get_response_size(response):
+        if response.streaming:
+            return None
+        return len(response.content)
+
+
+class PrimaryPinMiddleware:
+    """
+    Tracks whether a request writes to the primary database, and pins the
+    user of a writing POST/PUT/PATCH/DELETE to the primary for
+    REPLICA_PIN_SECONDS so their next reads see the write (see
+    core.db_router).
+
+    Writes made while serving reads, like the buffered hotel view counts,
+    keep only the rest of that request on the primary. Does nothing when
+    no replica is configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not db_router.get_replica_aliases():
+            return self.get_response(request)
+
+        writes, token = db_router.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.end_request(token)
+        user_id = self.get_pinned_user_id(request, writes)
+        if user_id is not None:
+            db_router.pin_to_primary(user_id)
+        return response
+
+    async def __acall__(self, request):
+        if not db_router.get_replica_aliases():
+            return await self.get_response(request)
+
+        writes, token = db_router.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            db_router.end_request(token)
+        user_id = self.get_pinned_user_id(request, writes)
+        if user_id is not None:
+            await db_router.apin_to_primary(user_id)
+        return response
+
+    @staticmethod
+    def get_pinned_user_id(request, writes):
+        # DRF sets the user it authenticated on the underlying request too.
+        user = getattr(request, 'user', None)
+        if not writes.wrote or request.method in SAFE_METHODS or user is None or not user.is_authenticated:
+            return None
+        return user.id
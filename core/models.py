@@ -0,0 +1,50 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A deferred call of a task, queued in the database (see core.jobs).
+
+    Queued jobs wait until `run_at`; a worker claims one by moving it to
+    running with a lease (`locked_until`). Finished jobs are deleted;
+    jobs that used up their attempts stay as failed with the last error.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+
+    STATE_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    task = models.CharField(max_length=200)  # Registered task name
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    queue = models.CharField(max_length=50, default='default')
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)  # At most one queued job per key
+    state = models.CharField(choices=STATE_CHOICES, max_length=20, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)  # Runs started so far
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)  # Not run before this time
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)  # Start of the last attempt
+    locked_by = models.CharField(max_length=100, blank=True)  # Claim of the worker running it
+    locked_until = models.DateTimeField(null=True, blank=True)  # Lease; expired jobs are queued again
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Partial index serving the workers' claim query
+            models.Index(fields=['queue', 'run_at', 'id'], condition=Q(state='queued'), name='job_queued_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedup_key'], condition=Q(state='queued'), name='job_queued_dedup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.state})"
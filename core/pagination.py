@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from utils.exceptions import BadRequestException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _reject_number(value):
+    # Keys are encoded as integers or strings; floats, NaN and Infinity
+    # never come from encode_cursor and may overflow in to_python.
+    raise ValueError(value)
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination over an ascending, unique ordering.
+
+    Each page is fetched with `WHERE (key) > (last key seen) ORDER BY key LIMIT n + 1`,
+    so page 10,000 costs the same as page 1 and no COUNT(*) is issued.
+    The cursor is an opaque, URL-safe encoding of the last key.
+
+    Query params:
+        - cursor: Cursor returned as `next_cursor` by the previous page.
+        - page_size: Rows per page, capped at PAGINATION_MAX_PAGE_SIZE.
+
+    Args:
+        ordering (tuple): Field names forming the key; must end with a unique field.
+    """
+
+    cursor_param = 'cursor'
+    page_size_param = 'page_size'
+
+    def __init__(self, ordering=('id',)):
+        self.ordering = tuple(ordering)
+
+    @property
+    def default_page_size(self):
+        return getattr(settings, 'PAGINATION_DEFAULT_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_param)
+        if page_size is None:
+            return min(self.default_page_size, self.max_page_size)
+        try:
+            page_size = int(page_size)
+        except ValueError:
+            raise BadRequestException(key='INVALID_PAGE_SIZE')
+        if page_size < 1:
+            raise BadRequestException(key='INVALID_PAGE_SIZE')
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, instance):
+        if isinstance(instance, dict):
+            values = [instance[field] for field in self.ordering]
+        else:
+            values = [getattr(instance, field) for field in self.ordering]
+        payload = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor, model):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()),
+                parse_float=_reject_number,
+                parse_constant=_reject_number,
+            )
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError(cursor)
+            return [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (ValueError, TypeError, OverflowError, binascii.Error, ValidationError):
+            raise BadRequestException(key='INVALID_CURSOR')
+
+    def after(self, values):
+        """
+        Returns the filter selecting rows whose key sorts after `values`.
+        """
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            term = Q(**{f'{field}__gt': values[position]})
+            for previous_field, previous_value in zip(self.ordering[:position], values[:position]):
+                term &= Q(**{previous_field: previous_value})
+            condition |= term
+        return condition
+
+    def page_queryset(self, queryset, request):
+        """
+        Returns the queryset of the requested page, with one extra row
+        to tell whether a next page exists, and the page size.
+        """
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor, queryset.model)))
+        return queryset[:page_size + 1], page_size
+
+    def build_page(self, items, page_size):
+        next_cursor = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            next_cursor = self.encode_cursor(items[-1])
+        return items, next_cursor
+
+    def paginate(self, queryset, request):
+        """
+        Returns the requested page of `queryset`.
+        Works on model and `.values()` querysets; the latter must include the ordering fields.
+
+        Returns:
+            tuple: (list of instances, cursor of the next page or None on the last page)
+        """
+        queryset, page_size = self.page_queryset(queryset, request)
+        return self.build_page(list(queryset), page_size)
+
+    async def apaginate(self, queryset, request):
+        """
+        Async version of paginate, fetching the page with the async ORM.
+        """
+        queryset, page_size = self.page_queryset(queryset, request)
+        return self.build_page([item async for item in queryset], page_size)
@@ -0,0 +1,45 @@
+HTTP_METHODS = ('get', 'post', 'put', 'patch', 'delete')
+
+
+def query_budget(**budgets):
+    """
+    Declares the most database queries a view may run per request, by method.
+
+    The budget must not depend on how much data there is; the query budget
+    test in core/tests.py runs every route at two data sizes and fails when
+    a request goes over its budget or runs more queries on the larger data.
+
+    Usage:
+        @query_budget(get=5, post=8)
+        class HotelItemView(APIView):
+            ...
+
+        @query_budget(post=4)
+        @api_view(['POST'])
+        def login_view(request):
+            ...
+    """
+    def decorator(view):
+        view.query_budgets = {method.upper(): count for method, count in budgets.items()}
+        return view
+    return decorator
+
+
+def get_query_budgets(callback):
+    """
+    Returns the {method: budget} declared for a URL callback, or an empty dict.
+    """
+    budgets = getattr(callback, 'query_budgets', None)
+    if budgets is None:
+        budgets = getattr(getattr(callback, 'view_class', None), 'query_budgets', None)
+    return budgets or {}
+
+
+def get_view_methods(callback):
+    """
+    Returns the HTTP methods a URL callback handles, upper case.
+    """
+    view_class = getattr(callback, 'view_class', None)
+    if view_class is None:
+        return []
+    return [method.upper() for method in HTTP_METHODS if hasattr(view_class, method)]
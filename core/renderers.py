@@ -0,0 +1,13 @@
+from rest_framework.renderers import JSONRenderer
+
+from .telemetry import serializer_timer
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that counts rendering time as serializer time of the request.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with serializer_timer():
+            return super().render(data, accepted_media_type, renderer_context)
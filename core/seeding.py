@@ -0,0 +1,263 @@
+import csv
+import io
+import logging
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from address.models import Address
+from authenticate.models import CustomUser
+from food.models import Category, Food
+from hotel.models import Hotel
+from orders.models import CartDetails, CartItem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PASSWORD = 'seed-password'
+DEFAULT_BATCH_SIZE = 5000
+
+CATEGORY_NAMES = (
+    'Biriyani', 'Dosa', 'Idli', 'Parotta', 'Meals', 'Chaat', 'Curry', 'Tandoor', 'Noodles', 'Fried Rice',
+    'Pizza', 'Burger', 'Sandwich', 'Salad', 'Soup', 'Desserts', 'Ice Cream', 'Juices', 'Coffee', 'Tea',
+)
+HOTEL_WORDS = (
+    'Saravana', 'Anjappar', 'Murugan', 'Bhavan', 'Annapoorna', 'Sangeetha', 'Adyar', 'Ananda', 'Thalappakatti',
+    'Junior', 'Kuppanna', 'Ponnusamy', 'Shree', 'Krishna', 'Vasanta', 'Madras', 'Coffee', 'House', 'Kitchen', 'Mess',
+)
+FOOD_WORDS = (
+    'Masala', 'Paneer', 'Chicken', 'Mutton', 'Ghee', 'Onion', 'Rava', 'Butter', 'Podi', 'Egg',
+    'Kothu', 'Veg', 'Mushroom', 'Gobi', 'Prawn', 'Fish', 'Special', 'Plain', 'Kadai', 'Pepper',
+)
+LOCATIONS = (
+    ('Adyar', 600020, 'Chennai', 'Tamil Nadu'),
+    ('Velachery', 600042, 'Chennai', 'Tamil Nadu'),
+    ('Koramangala', 560034, 'Bengaluru', 'Karnataka'),
+    ('Indiranagar', 560038, 'Bengaluru', 'Karnataka'),
+    ('Gachibowli', 500032, 'Hyderabad', 'Telangana'),
+    ('Andheri', 400053, 'Mumbai', 'Maharashtra'),
+    ('Connaught Place', 110001, 'New Delhi', 'Delhi'),
+    ('Peelamedu', 641004, 'Coimbatore', 'Tamil Nadu'),
+)
+
+
+def food_price(food_id, seed):
+    """
+    Returns the deterministic price of a seeded food, so cart lines can
+    be priced without reading the foods back.
+    """
+    return Decimal(40 + (food_id * 7919 + seed) % 560) + Decimal('0.50') * (food_id % 2)
+
+
+class DataSeeder:
+    """
+    Writes a deterministic synthetic dataset straight to the database.
+
+    Rows skip the serializers, model `save` methods and signals: ids are
+    assigned up front, addresses get their city and state from a fixed
+    table instead of the postal API, and one password hash is shared by
+    every user. Rows are written with PostgreSQL `COPY` when available
+    (method 'auto' or 'copy'), else with batched `bulk_create`.
+
+    For the same arguments and starting ids the generated rows are the same.
+    """
+
+    def __init__(self, hotels=1000, foods_per_hotel=20, categories=20, customers=1000, cart_items=5,
+                 seed=42, batch_size=DEFAULT_BATCH_SIZE, method='auto', password=DEFAULT_PASSWORD):
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'bulk'
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise ValueError("COPY needs a PostgreSQL database.")
+
+        self.hotels = hotels
+        self.foods_per_hotel = foods_per_hotel
+        self.categories = categories
+        self.customers = customers
+        self.cart_items = cart_items
+        self.seed = seed
+        self.batch_size = batch_size
+        self.method = method
+        self.password = password
+        self.report = {}
+
+    def run(self):
+        """
+        Seeds every table and returns {model label: (rows, seconds)}.
+        """
+        self.now = timezone.now()
+        self.password_hash = make_password(self.password)
+        self.start_ids = {
+            model: (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+            for model in (Category, Address, CustomUser, Hotel, Food, CartDetails, CartItem)
+        }
+
+        self.insert(Category, self.category_rows())
+        self.insert(Address, self.address_rows())
+        self.insert(CustomUser, self.manager_rows(), label='authenticate.CustomUser (managers)')
+        self.insert(Hotel, self.hotel_rows())
+        self.insert(Food, self.food_rows())
+        self.insert(CustomUser, self.customer_rows(), label='authenticate.CustomUser (customers)')
+        self.insert(CartDetails, self.cart_rows())
+        self.insert(CartItem, self.cart_item_rows())
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), list(self.start_ids)):
+                cursor.execute(sql)
+        return self.report
+
+    def ids(self, model, count, offset=0):
+        start = self.start_ids[model] + offset
+        return range(start, start + count)
+
+    @property
+    def food_count(self):
+        return self.hotels * self.foods_per_hotel
+
+    def category_rows(self):
+        for index, category_id in enumerate(self.ids(Category, self.categories)):
+            name = CATEGORY_NAMES[index % len(CATEGORY_NAMES)]
+            if index >= len(CATEGORY_NAMES):
+                name = f'{name} {index // len(CATEGORY_NAMES) + 1}'
+            yield {'id': category_id, 'name': name}
+
+    def address_rows(self):
+        rng = random.Random(f'{self.seed}:address')
+        for address_id in self.ids(Address, self.hotels):
+            area, pincode, city, state = rng.choice(LOCATIONS)
+            yield {
+                'id': address_id, 'area': area, 'street': f'{rng.randint(1, 300)} Main Road',
+                'pincode': pincode, 'city': city, 'state': state,
+            }
+
+    def user_row(self, user_id, kind, role):
+        return {
+            'id': user_id, 'email': f'seed-{kind}-{user_id}@example.com', 'name': kind.title(),
+            'role': role, 'password': self.password_hash,
+        }
+
+    def manager_rows(self):
+        for user_id in self.ids(CustomUser, self.hotels):
+            yield self.user_row(user_id, 'manager', 'manager')
+
+    def hotel_rows(self):
+        rng = random.Random(f'{self.seed}:hotel')
+        managers = self.ids(CustomUser, self.hotels)
+        addresses = self.ids(Address, self.hotels)
+        for hotel_id, user_id, address_id in zip(self.ids(Hotel, self.hotels), managers, addresses):
+            name = f'{rng.choice(HOTEL_WORDS)} {rng.choice(HOTEL_WORDS)}'
+            yield {'id': hotel_id, 'name': name, 'user_id': user_id, 'address_id': address_id}
+
+    def food_rows(self):
+        rng = random.Random(f'{self.seed}:food')
+        categories = self.ids(Category, self.categories)
+        food_ids = iter(self.ids(Food, self.food_count))
+        for hotel_id in self.ids(Hotel, self.hotels):
+            for _ in range(self.foods_per_hotel):
+                food_id = next(food_ids)
+                yield {
+                    'id': food_id, 'name': f'{rng.choice(FOOD_WORDS)} {rng.choice(CATEGORY_NAMES)}',
+                    'price': food_price(food_id, self.seed), 'category_id': rng.choice(categories),
+                    'hotel_id': hotel_id,
+                }
+
+    def customer_rows(self):
+        for user_id in self.ids(CustomUser, self.customers, offset=self.hotels):
+            yield self.user_row(user_id, 'customer', 'customer')
+
+    def cart_lines(self, customer_index):
+        """
+        Returns the (food id, quantity) lines of one customer's cart.
+        """
+        rng = random.Random(f'{self.seed}:cart:{customer_index}')
+        foods = self.ids(Food, self.food_count)
+        count = min(self.cart_items, len(foods))
+        return [(food_id, rng.randint(1, 5)) for food_id in rng.sample(foods, count)]
+
+    def cart_rows(self):
+        customers = self.ids(CustomUser, self.customers, offset=self.hotels)
+        for index, (cart_id, user_id) in enumerate(zip(self.ids(CartDetails, self.customers), customers)):
+            total = sum((food_price(food_id, self.seed) * quantity for food_id, quantity in self.cart_lines(index)),
+                        Decimal('0.00'))
+            yield {'id': cart_id, 'user_id': user_id, 'total_price': total}
+
+    def cart_item_rows(self):
+        item_ids = iter(self.ids(CartItem, self.customers * self.cart_items))
+        for index, cart_id in enumerate(self.ids(CartDetails, self.customers)):
+            for food_id, quantity in self.cart_lines(index):
+                yield {
+                    'id': next(item_ids), 'cart_id': cart_id, 'food_id': food_id,
+                    'price': food_price(food_id, self.seed), 'quantity': quantity,
+                }
+
+    def defaults(self, model):
+        """
+        Returns {attname: value} for columns the generators leave out.
+        """
+        values = {}
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                values[field.attname] = self.now
+            elif field.has_default():
+                values[field.attname] = field.get_default()
+            else:
+                values[field.attname] = None
+        return values
+
+    def batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def insert(self, model, rows, label=None):
+        label = label or model._meta.label
+        defaults = self.defaults(model)
+        fields = model._meta.concrete_fields
+        write = self.copy_batch if self.method == 'copy' else self.bulk_create_batch
+
+        count = 0
+        start = time.perf_counter()
+        for batch in self.batches(rows):
+            with transaction.atomic():
+                write(model, fields, [{**defaults, **row} for row in batch])
+            count += len(batch)
+        elapsed = time.perf_counter() - start
+
+        self.report[label] = (count, elapsed)
+        logger.debug("Seeded %s %s row(s) in %.2fs", count, label, elapsed)
+
+    def bulk_create_batch(self, model, fields, rows):
+        model.objects.bulk_create([model(**row) for row in rows])
+
+    def copy_batch(self, model, fields, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+        for row in rows:
+            writer.writerow([row[field.attname] for field in fields])
+        buffer.seek(0)
+
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        options = 'FORMAT csv'
+        # The writer quotes None as an empty string; FORCE_NULL loads it as NULL.
+        nullable = [quote(field.column) for field in fields if field.null]
+        if nullable:
+            options += f", FORCE_NULL ({', '.join(nullable)})"
+        sql = f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN WITH ({options})"
+
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy'):  # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+            else:  # psycopg2
+                raw.copy_expert(sql, buffer)
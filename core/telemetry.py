@@ -0,0 +1,238 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+_current_request = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    """
+    Cumulative histogram with one series per label set, rendered in the
+    Prometheus text format.
+    """
+
+    def __init__(self, name, documentation, buckets, labelnames=('view', 'method')):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            if index < len(self.buckets):
+                series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def series(self):
+        with self._lock:
+            return {key: {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+                    for key, value in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.series().items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{_format(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {_format(series["sum"])}')
+            lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Wall time of the request in seconds.', DURATION_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries run by the request.', QUERY_BUCKETS
+)
+DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Time the request spent in database queries.', DURATION_BUCKETS
+)
+SERIALIZER_DURATION = Histogram(
+    'http_request_serializer_duration_seconds', 'Time the request spent serializing and rendering data.',
+    DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'Size of the response body in bytes.', SIZE_BUCKETS
+)
+
+JOB_WAIT = Histogram(
+    'job_wait_seconds', 'Time a job waited between becoming due and starting.', JOB_BUCKETS, labelnames=('task',)
+)
+JOB_DURATION = Histogram(
+    'job_duration_seconds', 'Run time of a job attempt in seconds.', JOB_BUCKETS, labelnames=('task', 'outcome')
+)
+
+HISTOGRAMS = (REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION, RESPONSE_SIZE, JOB_WAIT, JOB_DURATION)
+
+# Functions returning extra metrics text, rendered after the histograms
+_collectors = []
+
+
+def register_collector(collector):
+    """
+    Adds a function called on every render_metrics(), returning metrics in
+    the Prometheus text format; for values read at scrape time, like gauges.
+    """
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render_gauge(name, documentation, samples, labelnames):
+    """
+    Returns a gauge in the Prometheus text format from {label values: value}.
+    """
+    return _render_samples(name, documentation, 'gauge', samples, labelnames)
+
+
+def render_counter(name, documentation, samples, labelnames):
+    """
+    Returns a counter in the Prometheus text format from {label values: value}.
+    """
+    return _render_samples(name, documentation, 'counter', samples, labelnames)
+
+
+def _render_samples(name, documentation, metric_type, samples, labelnames):
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    for key, value in sorted(samples.items()):
+        labels = ','.join(f'{label}="{_escape(str(part))}"' for label, part in zip(labelnames, key))
+        lines.append(f'{name}{{{labels}}} {_format(value)}')
+    return '\n'.join(lines)
+
+
+class RequestMetrics:
+    """
+    Timings collected while one request is handled.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def record(self, view, method, response_size):
+        labels = {'view': view, 'method': method}
+        REQUEST_DURATION.observe(self.elapsed, **labels)
+        DB_QUERIES.observe(self.db_queries, **labels)
+        DB_DURATION.observe(self.db_time, **labels)
+        SERIALIZER_DURATION.observe(self.serializer_time, **labels)
+        if response_size is not None:
+            RESPONSE_SIZE.observe(response_size, **labels)
+
+    def server_timing(self):
+        """
+        Returns the value of the `Server-Timing` header, in milliseconds.
+        """
+        return (
+            f'total;dur={self.elapsed * 1000:.2f}, '
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.db_queries} queries", '
+            f'ser;dur={self.serializer_time * 1000:.2f}'
+        )
+
+
+def track_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper that adds each query and its time to the
+    current request's metrics.
+
+    It is installed on every connection (see install_query_tracking) and
+    finds the request through a ContextVar, so it also counts queries the
+    async ORM runs in worker threads.
+    """
+    metrics = _current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - start
+        metrics.db_queries += 1
+
+
+def install_query_tracking(sender, connection, **kwargs):
+    """
+    `connection_created` receiver adding track_queries to the connection.
+    """
+    if track_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_queries)
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current_request.set(metrics)
+
+
+def end_request(token):
+    _current_request.reset(token)
+
+
+def get_request_metrics():
+    return _current_request.get()
+
+
+@contextmanager
+def serializer_timer():
+    """
+    Adds the time spent in the block to the current request's serializer time.
+    Does nothing outside a request.
+    """
+    metrics = _current_request.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - start
+
+
+def render_metrics():
+    """
+    Returns all histograms of this process, and the registered collectors'
+    metrics, in the Prometheus text format.
+    """
+    parts = [histogram.render() for histogram in HISTOGRAMS]
+    parts.extend(collector() for collector in _collectors)
+    return '\n'.join(part for part in parts if part) + '\n'
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
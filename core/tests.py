@@ -0,0 +1,690 @@
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import URLResolver, get_resolver, resolve
+from rest_framework.test import APIClient
+
+from .db_router import (
+    PrimaryReplicaRouter, end_request, pin_to_primary, primary_reads, render_replica_metrics, replica_lag, replica_reads,
+    replicas, start_request,
+)
+from .jobs import Worker, claim_jobs, defer, recover_abandoned_jobs, run_job, run_pending_jobs, task
+from .logger_config import DroppingQueueHandler, dropped_records, render_log_metrics
+from .models import Job
+from .query_budget import get_query_budgets, get_view_methods
+from .telemetry import DB_QUERIES, JOB_DURATION, REQUEST_DURATION, Histogram, render_metrics, reset_metrics
+from address.models import Address
+from authenticate.models import CustomUser
+from food.models import Category, Food
+from hotel.models import Hotel
+from hotel.nearby import nearby_index
+from hotel.search import search_index
+from orders.models import CartDetails, CartItem
+
+
+class HistogramTest(TestCase):
+
+    def test_renders_cumulative_buckets(self):
+        histogram = Histogram('test_seconds', 'Test histogram.', (0.1, 1.0))
+        histogram.observe(0.05, view='v', method='GET')
+        histogram.observe(0.5, view='v', method='GET')
+        histogram.observe(5, view='v', method='GET')
+
+        text = histogram.render()
+        self.assertIn('# TYPE test_seconds histogram', text)
+        self.assertIn('test_seconds_bucket{view="v",method="GET",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{view="v",method="GET",le="1.0"} 2', text)
+        self.assertIn('test_seconds_bucket{view="v",method="GET",le="+Inf"} 3', text)
+        self.assertIn('test_seconds_count{view="v",method="GET"} 3', text)
+
+
+class DroppingQueueHandlerTest(SimpleTestCase):
+    """
+    A full log queue drops DEBUG and INFO records at once, and gives
+    WARNING and above a moment for the listener to catch up.
+    """
+
+    def make_record(self, level):
+        return logging.LogRecord('core', level, __file__, 1, 'message', None, None)
+
+    def test_low_levels_are_dropped_and_counted(self):
+        log_queue = queue.Queue(maxsize=1)
+        handler = DroppingQueueHandler(log_queue, block_timeout=5)
+        handler.enqueue(self.make_record(logging.INFO))
+        before = dropped_records().get('DEBUG', 0)
+
+        started = time.monotonic()
+        handler.enqueue(self.make_record(logging.DEBUG))
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(dropped_records()['DEBUG'], before + 1)
+        self.assertIn('log_records_dropped_total{level="DEBUG"}', render_log_metrics())
+
+    def test_warnings_wait_for_room(self):
+        log_queue = queue.Queue(maxsize=1)
+        handler = DroppingQueueHandler(log_queue, block_timeout=5)
+        handler.enqueue(self.make_record(logging.INFO))
+        before = dropped_records().get('WARNING', 0)
+
+        threading.Timer(0.05, log_queue.get).start()
+        handler.enqueue(self.make_record(logging.WARNING))
+        self.assertEqual(log_queue.get_nowait().levelno, logging.WARNING)
+        self.assertEqual(dropped_records().get('WARNING', 0), before)
+
+
+@override_settings(HOTEL_VIEW_COUNT_FLUSH_INTERVAL=3600, HOTEL_VIEW_COUNT_BUFFER_SIZE=100000)
+class TelemetryMiddlewareTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_metrics()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='viewer@example.com', password='secret', name='Viewer')
+        self.client.force_authenticate(user=self.user)
+
+    def test_response_headers(self):
+        response = self.client.get('/hotels/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['X-Trace-Id'])
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", ser;dur=[\d.]+$')
+
+    def test_records_histograms_by_view_and_method(self):
+        self.client.get('/hotels/')
+        self.client.get('/hotels/')
+
+        series = REQUEST_DURATION.series()[('hotel-filter', 'GET')]
+        self.assertEqual(series['count'], 2)
+        self.assertGreater(DB_QUERIES.series()[('hotel-filter', 'GET')]['sum'], 0)
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint(self):
+        self.client.get('/hotels/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="hotel-filter",method="GET"} 1', body)
+        self.assertIn('http_response_size_bytes_bucket', body)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_endpoint_token(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        response = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_metrics_endpoint_without_token_is_closed_outside_debug(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+
+
+def alpha_name(prefix, index):
+    """
+    Returns a unique name made of letters only, as the name validators require.
+    """
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('a') + remainder) + letters
+    return f'{prefix} {letters}'
+
+
+@override_settings(
+    HOTEL_VIEW_COUNT_FLUSH_INTERVAL=3600, HOTEL_VIEW_COUNT_BUFFER_SIZE=100000, CACHE_ASSUME_SHARED=True
+)
+class AsyncViewTest(TestCase):
+    """
+    The async listing views return what their sync counterparts return.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'}):
+            address = Address.objects.create(area='Adyar', street='Main Street', pincode=600020)
+        cls.user = CustomUser.objects.create_user(
+            email='manager@example.com', password='secret', name='Manager', role='manager'
+        )
+        cls.hotel = Hotel.objects.create(name='Hotel', user=cls.user, address=address)
+        category = Category.objects.create(name='Meals')
+        Food.objects.bulk_create([
+            Food(name=f'Food {index}', price='12.50', category=category, hotel=cls.hotel) for index in range(3)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        reset_metrics()
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/login/', {'email': 'manager@example.com', 'password': 'secret'}, format='json')
+        return response.data['access']
+
+    def test_responses_match_sync_views(self):
+        self.client.force_authenticate(user=self.user)
+        for path, query in (
+            ('foods/', ''), ('foods/', f'hotel_id={self.hotel.id}'), ('foods/', 'page_size=2'),
+            ('hotels/', ''), ('hotels/', 'area=Adyar'), ('address/', ''),
+            ('foods/', 'hotel_id=abc'), ('hotels/', 'hotel_name=1'), ('foods/', 'cursor=bad'),
+        ):
+            with self.subTest(path=path, query=query):
+                cache.clear()
+                expected = self.client.get(f'/{path}', QUERY_STRING=query)
+                cache.clear()
+                response = self.client.get(f'/async/{path}', QUERY_STRING=query)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_requires_authentication(self):
+        response = self.client.get('/async/hotels/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), self.client.get('/hotels/').json())
+
+        response = self.client.get('/async/hotels/', HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertEqual((response.status_code, response.json()['code']), (401, 'token_not_valid'))
+
+    def test_only_get_is_allowed(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.post('/async/foods/', {}, format='json').status_code, 405)
+
+    def test_inactive_user_is_rejected(self):
+        token = self.login()
+        self.user.refresh_from_db()
+        self.user.status = CustomUser.INACTIVE
+        self.user.save()
+        response = self.client.get('/async/foods/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual((response.status_code, response.json()['code']), (403, 'AUTH_002'))
+
+    async def test_runs_on_event_loop_with_telemetry(self):
+        token = await sync_to_async(self.login)()
+        response = await AsyncClient().get(
+            '/async/foods/', {'hotel_id': self.hotel.id}, headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['food_items']), 3)
+        self.assertTrue(response['X-Trace-Id'])
+        self.assertEqual(REQUEST_DURATION.series()[('food-filter-async', 'GET')]['count'], 1)
+        self.assertEqual(DB_QUERIES.series()[('food-filter-async', 'GET')]['sum'], 1)
+
+
+@override_settings(HOTEL_VIEW_COUNT_FLUSH_INTERVAL=3600, HOTEL_VIEW_COUNT_BUFFER_SIZE=100000, METRICS_TOKEN='scrape-token')
+class QueryBudgetTest(TestCase):
+    """
+    Runs every route against seeded data at two sizes and checks the
+    queries of each request against the budget declared on its view
+    (see core.query_budget). A request may not run more queries on the
+    larger data than on the smaller.
+
+    Requests are made with a cold cache, so cached paths are measured
+    at their most expensive. Users are force-authenticated, so budgets
+    leave out the user lookup of JWT authentication.
+    """
+
+    SIZES = (10, 1000)
+
+    def setUp(self):
+        patcher = patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('address.serializers.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        cache.clear()
+        search_index.reset()
+        self.addCleanup(search_index.reset)
+        nearby_index.reset()
+        self.addCleanup(nearby_index.reset)
+        self.client = APIClient()
+        self.admin = CustomUser.objects.create_user(
+            email='admin@example.com', password='secret', name='Admin', role='admin'
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.category = Category.objects.create(name='Meals')
+        self.cart = CartDetails.objects.create(user=self.admin, total_price=0)
+        self.counter = 0
+        self.seeded = 0
+
+    def next_index(self):
+        self.counter += 1
+        return self.counter
+
+    def seed(self, size):
+        """
+        Adds addresses, managers, hotels, foods and cart lines up to `size` rows each.
+        """
+        start, self.seeded = self.seeded, size
+        password = make_password('secret')
+        addresses = Address.objects.bulk_create([
+            Address(area='Adyar', street=f'Street {index}', pincode=600020, city='Chennai', state='Tamil Nadu')
+            for index in range(start, size)
+        ])
+        managers = CustomUser.objects.bulk_create([
+            CustomUser(email=f'manager{index}@example.com', password=password, name='Manager', role='manager')
+            for index in range(start, size)
+        ])
+        hotels = Hotel.objects.bulk_create([
+            Hotel(name=alpha_name('Hotel', index), user=manager, address=address)
+            for index, manager, address in zip(range(start, size), managers, addresses)
+        ])
+        foods = Food.objects.bulk_create([
+            Food(name=alpha_name('Food', index), price='10.50', category=self.category, hotel=hotel)
+            for index, hotel in zip(range(start, size), hotels)
+        ])
+        CartItem.objects.bulk_create([CartItem(cart=self.cart, food=food, price=food.price, quantity=1) for food in foods])
+        self.hotel = Hotel.active.first()
+        self.food = Food.active.first()
+        self.cart_item = CartItem.objects.filter(cart=self.cart).first()
+
+    def new_hotel_data(self):
+        index = self.next_index()
+        address = Address.objects.create(area='Adyar', street=alpha_name('Street', index), pincode=600020)
+        manager = CustomUser.objects.create_user(email=f'new{index}@example.com', password='secret', name='Manager')
+        return {'name': alpha_name('Hotel', index), 'address': address.id, 'user': manager.id}
+
+    def bulk_cart_data(self):
+        # Lines already in the cart are updated, the new food is inserted.
+        food = Food.objects.create(
+            name=alpha_name('Food', self.next_index()), price='10.50', category=self.category, hotel=self.hotel
+        )
+        food_ids = list(Food.active.values_list('id', flat=True)[:5]) + [food.id]
+        return {'data': {'items': [{'food': food_id, 'quantity': 2} for food_id in food_ids]}}
+
+    def checkout_data(self):
+        # SQLite splits inserts over 999 parameters, so the cart is kept small.
+        CartItem.objects.filter(cart=self.cart).exclude(
+            id__in=CartItem.objects.filter(cart=self.cart).order_by('id').values('id')[:20]
+        ).delete()
+        return {}
+
+    def requests(self):
+        """
+        Returns (path, method, build) for every route and method; `build`
+        prepares any rows the request needs and returns the client kwargs.
+        """
+        return [
+            ('/login/', 'POST', lambda: {'data': {'email': 'admin@example.com', 'password': 'secret'}}),
+            ('/register/', 'POST', lambda: {'data': {
+                'email': f'user{self.next_index()}@example.com', 'password': 'secret',
+                'name': 'New User', 'role': 'customer',
+            }}),
+            ('/cart/', 'POST', lambda: {'data': {'food': self.food.id, 'quantity': 1}}),
+            ('/cart/', 'PATCH', lambda: {'data': {'id': self.cart_item.id, 'quantity': 3}}),
+            ('/cart/bulk/', 'POST', self.bulk_cart_data),
+            ('/checkout/', 'POST', self.checkout_data),
+            ('/address/', 'GET', lambda: {}),
+            ('/address/', 'POST', lambda: {'data': {
+                'area': 'Adyar', 'street': alpha_name('Street', self.next_index()), 'pincode': 600020,
+            }}),
+            ('/address/', 'PATCH', lambda: {'data': {'address_id': self.hotel.address_id, 'street': 'Beach Road'}}),
+            ('/hotels/', 'GET', lambda: {}),
+            ('/hotels/', 'POST', lambda: {'data': self.new_hotel_data()}),
+            ('/hotels/', 'PATCH', lambda: {'data': {'id': self.hotel.id, 'name': 'Renamed Hotel'}}),
+            ('/hotels/search/', 'GET', lambda: {'QUERY_STRING': 'q=hotel'}),
+            ('/hotels/nearby/', 'GET', lambda: {'QUERY_STRING': 'latitude=13.0&longitude=80.25&radius_km=50'}),
+            ('/hotels/', 'DELETE', lambda: {'QUERY_STRING': f'hotel_id={Hotel.active.last().id}'}),
+            ('/foods/', 'GET', lambda: {}),
+            ('/foods/', 'POST', lambda: {'data': {
+                'name': 'Masala Dosa', 'price': '80.00', 'category': self.category.id, 'hotel': self.hotel.id,
+            }}),
+            ('/foods/cache-stats/', 'GET', lambda: {}),
+            ('/async/address/', 'GET', lambda: {}),
+            ('/async/hotels/', 'GET', lambda: {}),
+            ('/async/foods/', 'GET', lambda: {}),
+            ('/metrics/', 'GET', lambda: {'HTTP_AUTHORIZATION': 'Bearer scrape-token'}),
+        ]
+
+    def measure(self, path, method, build):
+        kwargs = build()
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method.lower())(path, format='json', **kwargs)
+        self.assertLess(response.status_code, 400, f"{method} {path}: {getattr(response, 'data', response)}")
+        return len(context.captured_queries)
+
+    def test_every_route_declares_budgets(self):
+        for pattern, callback in iter_routes(get_resolver().url_patterns):
+            budgets = get_query_budgets(callback)
+            with self.subTest(route=pattern):
+                self.assertTrue(budgets, f"{pattern} declares no query budget")
+                for method in get_view_methods(callback):
+                    self.assertIn(method, budgets, f"{method} {pattern} declares no query budget")
+
+    def test_every_route_is_exercised(self):
+        exercised = {path.strip('/') for path, method, build in self.requests()}
+        for pattern, callback in iter_routes(get_resolver().url_patterns):
+            with self.subTest(route=pattern):
+                self.assertIn(pattern.strip('/'), exercised)
+
+    def test_queries_within_budget_at_every_size(self):
+        counts = {}
+        for size in self.SIZES:
+            self.seed(size)
+            for path, method, build in self.requests():
+                counts.setdefault((path, method), []).append(self.measure(path, method, build))
+
+        for (path, method), (small, large) in counts.items():
+            budget = get_query_budgets(resolve(path).func).get(method)
+            with self.subTest(route=path, method=method):
+                self.assertIsNotNone(budget, f"{method} {path} declares no query budget")
+                self.assertLessEqual(small, budget, f"{method} {path} ran {small} queries, budget is {budget}")
+                self.assertLessEqual(large, budget, f"{method} {path} ran {large} queries, budget is {budget}")
+                self.assertLessEqual(large, small, f"{method} {path} grew from {small} to {large} queries")
+
+
+def iter_routes(patterns, prefix=''):
+    """
+    Yields (route, callback) for the project's URL patterns, without the admin site.
+    """
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name == 'admin':
+                continue
+            yield from iter_routes(pattern.url_patterns, route)
+        else:
+            yield route, pattern.callback
+
+
+class SeedDataTest(TestCase):
+
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_data', method='bulk', stdout=out, **options)
+        return out.getvalue()
+
+    def test_seeds_requested_rows(self):
+        output = self.seed(hotels=4, foods_per_hotel=3, categories=2, customers=5, cart_items=2)
+
+        self.assertEqual(Hotel.objects.count(), 4)
+        self.assertEqual(Address.objects.count(), 4)
+        self.assertEqual(Food.objects.count(), 12)
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(CustomUser.objects.filter(role='customer').count(), 5)
+        self.assertEqual(CartItem.objects.count(), 10)
+        self.assertIn('rows/s', output)
+
+        # Seeded rows are consistent with the code that maintains them.
+        self.assertEqual(CartDetails.reconcile_totals(), 0)
+        self.assertFalse(Address.objects.filter(city='').exists())
+        manager = Hotel.objects.select_related('user').first().user
+        self.assertTrue(manager.check_password('seed-password'))
+
+    def test_same_seed_gives_same_rows(self):
+        self.seed(hotels=3, foods_per_hotel=4, customers=2)
+        first = list(Food.objects.order_by('id').values_list('name', 'price', 'category__name'))
+        Food.objects.all().delete()
+        Hotel.objects.all().delete()
+        self.seed(hotels=3, foods_per_hotel=4, customers=2)
+        second = list(Food.objects.order_by('id').values_list('name', 'price', 'category__name'))
+        self.assertEqual([row[0] for row in first], [row[0] for row in second])
+        self.assertEqual(len(second), 12)
+
+    def test_sequences_continue_after_seeding(self):
+        self.seed(hotels=2, foods_per_hotel=1, customers=1)
+        category = Category.objects.create(name='Snacks')
+        self.assertGreater(category.id, Category.objects.exclude(id=category.id).order_by('-id').first().id)
+
+
+calls = []
+
+
+@task(name='tests.record', dedup_key='record:{0}')
+def record_call(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError(f"failed on {value}")
+
+
+class JobQueueTest(TestCase):
+    """
+    Deferred jobs run once in a worker, with retries, dedup and lease recovery.
+    """
+
+    def setUp(self):
+        calls.clear()
+        reset_metrics()
+
+    def test_defer_and_run(self):
+        job = record_call.defer('a')
+        self.assertEqual((job.task, job.args, job.state), ('tests.record', ['a'], Job.QUEUED))
+        self.assertEqual(calls, [])
+
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(calls, ['a'])
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(JOB_DURATION.series()[('tests.record', 'done')]['count'], 1)
+
+    def test_dedup_key_keeps_one_queued_job(self):
+        first = record_call.defer('a')
+        self.assertEqual(record_call.defer('a').id, first.id)
+        self.assertNotEqual(record_call.defer('b').id, first.id)
+
+        # Once the job runs, the key can be queued again.
+        claimed, = claim_jobs(['default'], 'test')
+        self.assertNotEqual(record_call.defer('a').id, first.id)
+        run_job(claimed)
+        self.assertEqual(Job.objects.filter(state=Job.QUEUED).count(), 2)
+
+    @override_settings(JOBS_RETRY_BACKOFF=10)
+    def test_failures_retry_with_backoff_then_fail(self):
+        defer('tests.record', 'a', fail=True, _max_attempts=2)
+
+        self.assertEqual(run_pending_jobs(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.state, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('failed on a', job.last_error)
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=9))
+        self.assertEqual(run_pending_jobs(), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending_jobs(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.state, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(calls, ['a', 'a'])
+
+    def test_abandoned_jobs_are_recovered(self):
+        record_call.defer('a')
+        defer('tests.record', 'b', _max_attempts=1)
+        claim_jobs(['default'], 'dead-worker', limit=2)
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(recover_abandoned_jobs(), 2)
+        self.assertEqual({job.args[0]: job.state for job in Job.objects.all()}, {'a': Job.QUEUED, 'b': Job.FAILED})
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(calls, ['a'])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        self.assertIsNone(record_call.defer('a'))
+        self.assertEqual(calls, ['a'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_queue_metrics(self):
+        record_call.defer('a')
+        defer('tests.record', 'b', _delay=3600)
+        Job.objects.filter(args=['a']).update(run_at=timezone.now() - timedelta(seconds=30))
+
+        body = render_metrics()
+        self.assertIn('job_queue_depth{queue="default",state="queued"} 2', body)
+        age = float(body.split('job_queue_oldest_due_seconds{queue="default"} ')[1].split()[0])
+        self.assertGreaterEqual(age, 30)
+
+
+
+class JobWorkerTest(TransactionTestCase):
+    """
+    Worker threads use their own connections, so the jobs must be committed.
+    One thread only: SQLite locks the whole table on concurrent writes.
+    """
+
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_runs_jobs_until_queue_is_empty(self):
+        for value in range(20):
+            record_call.defer(value)
+
+        Worker(['default'], threads=1, batch_size=3, burst=True).run()
+        self.assertEqual(sorted(calls), list(range(20)))
+        self.assertFalse(Job.objects.exists())
+
+        record_call.defer('command')
+        out = StringIO()
+        call_command('run_workers', '--burst', '--threads', '2', stdout=out)
+        self.assertEqual(calls[-1], 'command')
+        self.assertIn('Workers stopped.', out.getvalue())
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_CHECK_INTERVAL=60, REPLICA_MAX_LAG_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    """
+    Routing decisions with the replica check patched. Not a TestCase: its
+    transaction would keep every read on the primary.
+    """
+
+    def setUp(self):
+        cache.clear()
+        replicas.reset()
+        self.addCleanup(replicas.reset)
+        patcher = patch('core.db_router.replica_lag', return_value=0.0)
+        self.replica_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = PrimaryReplicaRouter()
+        self.request = SimpleNamespace(user=SimpleNamespace(id=7, is_authenticated=True))
+
+    def read_db(self):
+        return self.router.db_for_read(Food)
+
+    def test_only_marked_reads_go_to_a_replica(self):
+        self.assertEqual(self.read_db(), 'default')
+        with replica_reads(self.request):
+            self.assertEqual(self.read_db(), 'replica')
+            self.assertEqual(self.router.db_for_write(Food), 'default')
+            with primary_reads():
+                self.assertEqual(self.read_db(), 'default')
+            with patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(self.read_db(), 'default')
+        self.assertEqual(self.read_db(), 'default')
+
+    def test_user_is_pinned_to_primary_after_a_write(self):
+        pin_to_primary(7)
+        with replica_reads(self.request):
+            self.assertEqual(self.read_db(), 'default')
+        with replica_reads(SimpleNamespace(user=SimpleNamespace(id=8, is_authenticated=True))):
+            self.assertEqual(self.read_db(), 'replica')
+
+        cache.clear()  # The pin expired
+        with replica_reads(self.request):
+            self.assertEqual(self.read_db(), 'replica')
+
+    def test_request_reads_after_its_write_stay_on_primary(self):
+        writes, token = start_request()
+        try:
+            with replica_reads(self.request):
+                self.assertEqual(self.read_db(), 'replica')
+                self.router.db_for_write(Food)
+                self.assertEqual(self.read_db(), 'default')
+        finally:
+            end_request(token)
+        self.assertTrue(writes.wrote)
+
+    @override_settings(REPLICA_CHECK_INTERVAL=0)
+    def test_lagging_or_failing_replica_is_skipped_until_it_recovers(self):
+        with replica_reads(self.request):
+            self.replica_lag.return_value = 30.0
+            self.assertEqual(self.read_db(), 'default')
+            self.replica_lag.side_effect = OperationalError('connection refused')
+            self.assertEqual(self.read_db(), 'default')
+            self.replica_lag.side_effect = None
+            self.replica_lag.return_value = None  # WAL receiver disconnected
+            self.assertEqual(self.read_db(), 'default')
+            self.replica_lag.return_value = 0.5
+            self.assertEqual(self.read_db(), 'replica')
+
+        metrics = render_replica_metrics()
+        self.assertIn('db_replica_healthy{alias="replica"} 1', metrics)
+        self.assertIn('db_replica_lag_seconds{alias="replica"} 0.5', metrics)
+
+    def test_postgres_replica_not_streaming_has_no_lag(self):
+        connection = MagicMock(vendor='postgresql')
+        cursor = connection.cursor.return_value.__enter__.return_value
+        with patch('core.db_router.connections', {'replica': connection}):
+            cursor.fetchone.return_value = (True, 1.5)
+            self.assertEqual(replica_lag('replica'), 1.5)
+            cursor.fetchone.return_value = (False, 0)
+            self.assertIsNone(replica_lag('replica'))
+
+    def test_replica_is_checked_once_per_interval(self):
+        with replica_reads(self.request):
+            for _ in range(3):
+                self.assertEqual(self.read_db(), 'replica')
+        self.assertEqual(self.replica_lag.call_count, 1)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_stays_on_primary(self):
+        with patch('core.db_router.cache') as router_cache, replica_reads(self.request):
+            self.assertEqual(self.read_db(), 'default')
+        router_cache.get.assert_not_called()
+        self.replica_lag.assert_not_called()
+
+
+@skipUnless('replica' in settings.DATABASES, "Needs a second database alias named 'replica'")
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaReadTest(TransactionTestCase):
+    """
+    Reads against two real databases: 'replica' holds a stale copy of the
+    address, so each response shows which database served it.
+    """
+
+    databases = {'default', 'replica'} & set(settings.DATABASES)
+
+    def setUp(self):
+        cache.clear()
+        replicas.reset()
+        self.addCleanup(replicas.reset)
+        with patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'}):
+            self.address = Address.objects.create(area='Adyar', street='Main Street', pincode=600020)
+            self.address.save(using='replica')
+        self.user = CustomUser.objects.create_user(
+            email='manager@example.com', password='secret', name='Manager', role='manager'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def streets(self, path='/address/'):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return [item['street'] for item in response.json()['address_items']]
+
+    def test_user_reads_own_writes_then_returns_to_replica(self):
+        Address.objects.filter(id=self.address.id).update(street='Beach Road')  # Not yet replicated
+        self.assertEqual(self.streets(), ['Main Street'])
+
+        response = self.client.patch('/address/', {'address_id': self.address.id, 'street': 'Lake View'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.streets(), ['Lake View'])
+        self.assertEqual(self.streets('/async/address/'), ['Lake View'])
+
+        cache.clear()  # The pin expired
+        self.assertEqual(self.streets(), ['Main Street'])
+        self.assertEqual(self.streets('/async/address/'), ['Main Street'])
+
+    def test_falls_back_to_primary_when_replica_is_down(self):
+        Address.objects.filter(id=self.address.id).update(street='Beach Road')
+        with patch('core.db_router.replica_lag', side_effect=OperationalError('connection refused')):
+            self.assertEqual(self.streets(), ['Beach Road'])
@@ -0,0 +1,27 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .telemetry import render_metrics
+from .query_budget import query_budget
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@query_budget(get=1)
+def metrics_view(request):
+    """
+    Exposes the request and job histograms of this process, and the job
+    queue gauges (see core.jobs), in the Prometheus text format.
+
+    Scrapers must send `Authorization: Bearer <METRICS_TOKEN>`. Without a
+    token the endpoint is open only when DEBUG is on, and refused otherwise.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
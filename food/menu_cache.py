@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import is_shared_cache
+from core.db_router import primary_reads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 300
+DEFAULT_LOCK_TIMEOUT = 5
+LOCK_POLL_INTERVAL = 0.05
+
+
+class MenuCache:
+    """
+    Cache of serialized hotel menus, keyed by hotel and filter.
+
+    Every hotel has a version number in the cache; entry keys include it,
+    so invalidating a hotel is a single version bump and old entries are
+    simply never read again. A cold entry is rebuilt by one worker only:
+    the first caller takes a short lock with `cache.add`, the others poll
+    for its result until MENU_CACHE_LOCK_TIMEOUT and then build it themselves.
+
+    Invalidations made in a transaction are repeated when it commits, so a
+    menu rebuilt from the uncommitted state is never served afterwards.
+    The versions must reach every process: with a per-process cache
+    backend (see core.cache) menus are built on every request instead.
+
+    Settings:
+        - MENU_CACHE_TIMEOUT: Seconds an entry is kept.
+        - MENU_CACHE_LOCK_TIMEOUT: Seconds to wait on another worker's rebuild.
+    """
+
+    def __init__(self, prefix='menu'):
+        self.prefix = prefix
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'MENU_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+    @property
+    def lock_timeout(self):
+        return getattr(settings, 'MENU_CACHE_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+
+    def _count(self, name, amount=1):
+        if amount:
+            with self._stats_lock:
+                self._stats[name] += amount
+
+    def stats(self):
+        """
+        Returns hit, miss, rebuild, wait and invalidation counts of this process.
+        """
+        with self._stats_lock:
+            stats = {name: self._stats[name] for name in ('hits', 'misses', 'rebuilds', 'waits', 'invalidations')}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+    def _version_key(self, hotel_id):
+        return f"{self.prefix}:version:{hotel_id}"
+
+    def _new_version(self):
+        # Time based, so a version lost to eviction never comes back as an old number.
+        return int(time.time() * 1000)
+
+    def _versions(self, hotel_ids):
+        keys = {hotel_id: self._version_key(hotel_id) for hotel_id in hotel_ids}
+        stored = cache.get_many(list(keys.values()))
+        versions = {}
+        for hotel_id, key in keys.items():
+            version = stored.get(key)
+            if version is None:
+                cache.add(key, self._new_version(), None)
+                version = cache.get(key)
+            versions[hotel_id] = version
+        return versions
+
+    async def _aversions(self, hotel_ids):
+        keys = {hotel_id: self._version_key(hotel_id) for hotel_id in hotel_ids}
+        stored = await cache.aget_many(list(keys.values()))
+        versions = {}
+        for hotel_id, key in keys.items():
+            version = stored.get(key)
+            if version is None:
+                await cache.aadd(key, self._new_version(), None)
+                version = await cache.aget(key)
+            versions[hotel_id] = version
+        return versions
+
+    def _entry_key(self, hotel_id, version, filter_key):
+        # Filter keys carry client input such as cursors; hash them to keep keys short and safe.
+        digest = hashlib.md5(filter_key.encode()).hexdigest()
+        return f"{self.prefix}:{hotel_id}:{version}:{digest}"
+
+    def invalidate(self, *hotel_ids):
+        """
+        Drops every cached menu of the given hotels, now and again when
+        the current transaction commits: another request may rebuild a
+        menu from the data before the commit in between.
+        """
+        hotel_ids = {hotel_id for hotel_id in hotel_ids if hotel_id is not None}
+        if not hotel_ids:
+            return
+        self._bump_versions(hotel_ids)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._bump_versions(hotel_ids), robust=True)
+
+    def _bump_versions(self, hotel_ids):
+        for hotel_id in hotel_ids:
+            key = self._version_key(hotel_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, self._new_version(), None)
+            self._count('invalidations')
+            logger.debug("Menu cache invalidated for hotel %s", hotel_id)
+
+    def get_many(self, hotel_ids, filter_key, build):
+        """
+        Returns cached menus for the hotels, building the missing ones.
+
+        Args:
+            hotel_ids (list): Hotels to return menus for.
+            filter_key (str): Identifies the filter/serializer the menu was built with.
+            build (callable): Takes a list of hotel ids and returns {hotel_id: menu}.
+
+        Returns:
+            dict: Mapping of hotel id to menu.
+        """
+        if not is_shared_cache():
+            return build(list(hotel_ids))
+        versions = self._versions(hotel_ids)
+        keys = {hotel_id: self._entry_key(hotel_id, versions[hotel_id], filter_key) for hotel_id in hotel_ids}
+        cached = cache.get_many(list(keys.values()))
+
+        menus = {hotel_id: cached[key] for hotel_id, key in keys.items() if key in cached}
+        missing = [hotel_id for hotel_id in hotel_ids if hotel_id not in menus]
+        self._count('hits', len(menus))
+        self._count('misses', len(missing))
+        if not missing:
+            return menus
+
+        locked = [hotel_id for hotel_id in missing if cache.add(f"{keys[hotel_id]}:lock", 1, self.lock_timeout)]
+        waiting = [hotel_id for hotel_id in missing if hotel_id not in locked]
+
+        if locked:
+            try:
+                # A replica behind the invalidating write would be cached for MENU_CACHE_TIMEOUT.
+                with primary_reads():
+                    built = build(locked)
+                cache.set_many({keys[hotel_id]: built[hotel_id] for hotel_id in locked}, self.timeout)
+                menus.update({hotel_id: built[hotel_id] for hotel_id in locked})
+                self._count('rebuilds', len(locked))
+            finally:
+                cache.delete_many([f"{keys[hotel_id]}:lock" for hotel_id in locked])
+
+        if waiting:
+            self._count('waits', len(waiting))
+            deadline = time.monotonic() + self.lock_timeout
+            while waiting and time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                ready = cache.get_many([keys[hotel_id] for hotel_id in waiting])
+                for hotel_id in list(waiting):
+                    if keys[hotel_id] in ready:
+                        menus[hotel_id] = ready[keys[hotel_id]]
+                        waiting.remove(hotel_id)
+            if waiting:
+                # The other worker did not finish in time; build without caching.
+                menus.update(build(waiting))
+
+        return menus
+
+    def get(self, hotel_id, filter_key, build):
+        """
+        Returns the cached menu of one hotel, building it if missing.
+        `build` takes no arguments and returns the menu.
+        """
+        return self.get_many([hotel_id], filter_key, lambda hotel_ids: {hotel_id: build()})[hotel_id]
+
+
+    async def aget_many(self, hotel_ids, filter_key, build):
+        """
+        Async version of get_many; `build` is a coroutine function.
+        """
+        if not is_shared_cache():
+            return await build(list(hotel_ids))
+        versions = await self._aversions(hotel_ids)
+        keys = {hotel_id: self._entry_key(hotel_id, versions[hotel_id], filter_key) for hotel_id in hotel_ids}
+        cached = await cache.aget_many(list(keys.values()))
+
+        menus = {hotel_id: cached[key] for hotel_id, key in keys.items() if key in cached}
+        missing = [hotel_id for hotel_id in hotel_ids if hotel_id not in menus]
+        self._count('hits', len(menus))
+        self._count('misses', len(missing))
+        if not missing:
+            return menus
+
+        locked = [hotel_id for hotel_id in missing if await cache.aadd(f"{keys[hotel_id]}:lock", 1, self.lock_timeout)]
+        waiting = [hotel_id for hotel_id in missing if hotel_id not in locked]
+
+        if locked:
+            try:
+                with primary_reads():
+                    built = await build(locked)
+                await cache.aset_many({keys[hotel_id]: built[hotel_id] for hotel_id in locked}, self.timeout)
+                menus.update({hotel_id: built[hotel_id] for hotel_id in locked})
+                self._count('rebuilds', len(locked))
+            finally:
+                await cache.adelete_many([f"{keys[hotel_id]}:lock" for hotel_id in locked])
+
+        if waiting:
+            self._count('waits', len(waiting))
+            deadline = time.monotonic() + self.lock_timeout
+            while waiting and time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                ready = await cache.aget_many([keys[hotel_id] for hotel_id in waiting])
+                for hotel_id in list(waiting):
+                    if keys[hotel_id] in ready:
+                        menus[hotel_id] = ready[keys[hotel_id]]
+                        waiting.remove(hotel_id)
+            if waiting:
+                menus.update(await build(waiting))
+
+        return menus
+
+    async def aget(self, hotel_id, filter_key, build):
+        """
+        Async version of get; `build` is a coroutine function taking no arguments.
+        """
+        async def build_one(hotel_ids):
+            return {hotel_id: await build()}
+
+        return (await self.aget_many([hotel_id], filter_key, build_one))[hotel_id]
+
+
+menu_cache = MenuCache()
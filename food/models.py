@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from utils.models import BaseModel
 from hotel.models import Hotel
 
@@ -25,6 +26,7 @@ class Food(BaseModel):
 
     name = models.CharField(max_length=100, null=False)  # Name of the food item
     price = models.DecimalField(max_digits=10, decimal_places=2, null=False)  # Price in ₹
+    stock = models.PositiveIntegerField(null=True, blank=True)  # Units left to reserve (orders.stock), null when not tracked
     category = models.ForeignKey(Category, on_delete=models.CASCADE, null=False)  # Linked category
     hotel = models.ForeignKey(
         Hotel,
@@ -33,6 +35,23 @@ class Food(BaseModel):
         null=False
     )  # Hotel that offers this food item
 
+    class Meta:
+        indexes = [
+            # Partial indexes serving the active-food filters of the listings
+            models.Index(fields=['hotel', 'id'], condition=Q(status=BaseModel.ACTIVE), name='food_active_hotel_idx'),
+            models.Index(fields=['category', 'id'], condition=Q(status=BaseModel.ACTIVE), name='food_active_category_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the loaded hotel so a move to another hotel
+        can invalidate the old hotel's cached menu.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_hotel_id = dict(zip(field_names, values)).get('hotel_id')
+        return instance
+
     def __str__(self):
         """
         String representation of the food item.
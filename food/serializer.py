@@ -1,4 +1,6 @@
 import re
+from functools import lru_cache
+
 from rest_framework import serializers
 
 from .models import Food, Category
@@ -55,7 +57,7 @@ class FoodCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Food
-        fields = ['id', 'name', 'price', 'category', 'hotel']
+        fields = ['id', 'name', 'price', 'stock', 'category', 'hotel']
 
     def validate_name(self, value):
         """
@@ -78,7 +80,7 @@ class FoodCreateSerializer(serializers.ModelSerializer):
         """
         Ensures category is active.
         """
-        if value.status != "Active":
+        if value.status != value.ACTIVE:
             raise BadRequestException(key="INACTIVE_CATEGORY")
         return value
 
@@ -86,7 +88,7 @@ class FoodCreateSerializer(serializers.ModelSerializer):
         """
         Ensures hotel is active.
         """
-        if value.status != "Active":
+        if value.status != value.ACTIVE:
             raise BadRequestException(key='INACTIVE_HOTEL')
         return value
 
@@ -105,4 +107,61 @@ class FoodOnlyViewSerializer(serializers.ModelSerializer):
         rep['price_with_tax'] = f"₹{round(float(rep['price']), 2)}"
         rep['price'] = f"₹{rep['price']}"
         rep['currency'] = "INR"
-        return rep
\ No newline at end of file
+        return rep
+
+# Fast read path: builds the same output as FoodDetailsSerializer and
+# FoodOnlyViewSerializer from `.values()` rows, without creating model
+# instances or running the ModelSerializer machinery per row.
+
+FOOD_DETAILS_VALUES = ('id', 'name', 'price', 'hotel_id', 'hotel__name', 'category_id', 'category__name')
+FOOD_ONLY_VALUES = ('id', 'name', 'price')
+
+_price_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+@lru_cache(maxsize=4096)
+def _price_representation(price):
+    """
+    Returns (price, price_with_tax) formatted exactly as the model serializers do.
+    Menus repeat a small set of prices, so results are memoised.
+    """
+    price = _price_field.to_representation(price)
+    return f"₹{price}", f"₹{round(float(price), 2)}"
+
+
+def serialize_food_details_rows(rows):
+    """
+    Serializes rows of `Food.objects.values(*FOOD_DETAILS_VALUES)`.
+    Output matches FoodDetailsSerializer(many=True).data.
+    """
+    data = []
+    for row in rows:
+        price, price_with_tax = _price_representation(row['price'])
+        data.append({
+            'id': row['id'],
+            'name': row['name'],
+            'price': price,
+            'hotel': {'id': row['hotel_id'], 'name': row['hotel__name']},
+            'category': {'id': row['category_id'], 'name': row['category__name']},
+            'price_with_tax': price_with_tax,
+            'currency': "INR",
+        })
+    return data
+
+
+def serialize_food_only_rows(rows):
+    """
+    Serializes rows of `Food.objects.values(*FOOD_ONLY_VALUES)`.
+    Output matches FoodOnlyViewSerializer(many=True).data.
+    """
+    data = []
+    for row in rows:
+        price, price_with_tax = _price_representation(row['price'])
+        data.append({
+            'id': row['id'],
+            'name': row['name'],
+            'price': price,
+            'price_with_tax': price_with_tax,
+            'currency': "INR",
+        })
+    return data
@@ -1,12 +1,61 @@
 import logging
 from django.core.exceptions import FieldError
 
+from .menu_cache import menu_cache
 from .models import Food
-from .serializer import FoodDetailsSerializer, FoodCreateSerializer
+from core.db_router import replica_reads
+from core.pagination import KeysetPaginator
+from core.telemetry import serializer_timer
+from .serializer import (
+    FoodCreateSerializer,
+    FOOD_DETAILS_VALUES,
+    FOOD_ONLY_VALUES,
+    serialize_food_details_rows,
+    serialize_food_only_rows,
+)
 from utils.exceptions import BadRequestException
 
 logger = logging.getLogger(__name__)
 
+paginator = KeysetPaginator(ordering=('id',))
+
+
+def build_food_query(request):
+    """
+    Parses the filters of a food listing request.
+
+    Raises:
+        ValueError: If a filter is not an integer.
+
+    Returns:
+        tuple: (values queryset of the matching active foods, hotel id or None,
+               menu cache key of the page)
+    """
+    food_id = request.query_params.get('food_id')
+    hotel_id = request.query_params.get('hotel_id')
+    category_id = request.query_params.get('category_id')
+
+    queryset = Food.active.values(*FOOD_DETAILS_VALUES)
+
+    if food_id:
+        food_id = int(food_id)
+        queryset = queryset.filter(id=food_id)
+
+    if category_id:
+        category_id = int(category_id)
+        queryset = queryset.filter(category_id=category_id)
+
+    if hotel_id:
+        hotel_id = int(hotel_id)
+        queryset = queryset.filter(hotel_id=hotel_id)
+
+    filter_key = "details:{}:{}:{}:{}".format(
+        food_id, category_id,
+        request.query_params.get(paginator.cursor_param, ''),
+        paginator.get_page_size(request),
+    )
+    return queryset, hotel_id or None, filter_key
+
 
 def get_food_items(request):
     """
@@ -17,39 +66,102 @@ def get_food_items(request):
         - hotel_id: Filter foods by hotel ID
         - category_id: Filter foods by category ID
 
+    Pagination (see core.pagination.KeysetPaginator):
+        - cursor: Cursor of the page to fetch
+        - page_size: Rows per page
+
+    Pages filtered by hotel_id are served from the menu cache; other reads
+    go to a read replica when one is configured (see core.db_router).
+
     Raises:
         BadRequestException: For invalid query parameter types or field errors.
 
     Returns:
-        list: Serialized food items.
+        tuple: Serialized food items of the page, and the next page cursor.
     """
     try:
-        food_id = request.query_params.get('food_id')
-        hotel_id = request.query_params.get('hotel_id')
-        category_id = request.query_params.get('category_id')
+        with replica_reads(request):
+            queryset, hotel_id, filter_key = build_food_query(request)
 
-        queryset = Food.objects.select_related('category', 'hotel')
+            def build_page():
+                foods, next_cursor = paginator.paginate(queryset, request)
+                logger.debug("Retrieved %d food item(s).", len(foods))
+                with serializer_timer():
+                    return serialize_food_details_rows(foods), next_cursor
+
+            if not hotel_id:
+                return build_page()
+            return menu_cache.get(hotel_id, filter_key, build_page)
+
+    except (ValueError, FieldError) as e:
+        logger.warning("Invalid query parameter in get_food_items: %s", str(e))
+        raise BadRequestException(key='INVALID_FOOD_FIELD_VALUE')
 
-        if food_id:
-            food_id = int(food_id)
-            queryset = queryset.filter(id=food_id, status__iexact='active')
 
-        if category_id:
-            category_id = int(category_id)
-            queryset = queryset.filter(category_id=category_id, status__iexact='active')
+async def aget_food_items(request):
+    """
+    Async version of get_food_items, querying with the async ORM.
+    """
+    try:
+        async with replica_reads(request):
+            queryset, hotel_id, filter_key = build_food_query(request)
 
-        if hotel_id:
-            hotel_id = int(hotel_id)
-            queryset = queryset.filter(hotel_id=hotel_id, status__iexact='active')
+            async def build_page():
+                foods, next_cursor = await paginator.apaginate(queryset, request)
+                logger.debug("Retrieved %d food item(s).", len(foods))
+                with serializer_timer():
+                    return serialize_food_details_rows(foods), next_cursor
 
-        logger.debug("Retrieved %d food item(s).", queryset.count())
-        return FoodDetailsSerializer(queryset, many=True).data
+            if not hotel_id:
+                return await build_page()
+            return await menu_cache.aget(hotel_id, filter_key, build_page)
 
     except (ValueError, FieldError) as e:
-        logger.warning("Invalid query parameter in get_food_items: %s", str(e))
+        logger.warning("Invalid query parameter in aget_food_items: %s", str(e))
         raise BadRequestException(key='INVALID_FOOD_FIELD_VALUE')
 
 
+def _serialize_menus(foods, hotel_ids):
+    foods_by_hotel = {hotel_id: [] for hotel_id in hotel_ids}
+    for food in foods:
+        foods_by_hotel[food['hotel_id']].append(food)
+    with serializer_timer():
+        return {
+            hotel_id: serialize_food_only_rows(hotel_foods)
+            for hotel_id, hotel_foods in foods_by_hotel.items()
+        }
+
+
+def _menus_queryset(hotel_ids):
+    return Food.active.filter(hotel_id__in=hotel_ids).values('hotel_id', *FOOD_ONLY_VALUES).order_by('id')
+
+
+def get_hotel_menus(hotel_ids):
+    """
+    Returns the serialized active foods of each hotel, from the menu cache.
+
+    Missing menus are built together with one query.
+
+    Returns:
+        dict: Mapping of hotel id to a list of serialized foods.
+    """
+    def build_menus(missing_hotel_ids):
+        return _serialize_menus(_menus_queryset(missing_hotel_ids), missing_hotel_ids)
+
+    return menu_cache.get_many(list(hotel_ids), 'only', build_menus)
+
+
+async def aget_hotel_menus(hotel_ids):
+    """
+    Async version of get_hotel_menus.
+    """
+    async def build_menus(missing_hotel_ids):
+        foods = [food async for food in _menus_queryset(missing_hotel_ids)]
+        return _serialize_menus(foods, missing_hotel_ids)
+
+    return await menu_cache.aget_many(list(hotel_ids), 'only', build_menus)
+
+
 def insert_food_items(request):
     """
     Inserts a new food item into the database.
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from food.menu_cache import menu_cache
+from food.models import Category, Food
+
+
+@receiver([post_save, post_delete], sender=Food)
+def invalidate_menu_on_food_change(sender, instance, **kwargs):
+    """
+    Signal to drop the cached menus of the food's hotel,
+    and of its previous hotel if the food was moved.
+    """
+    menu_cache.invalidate(instance.hotel_id, getattr(instance, '_loaded_hotel_id', None))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_menus_on_category_change(sender, instance, **kwargs):
+    """
+    Signal to drop the cached menus of every hotel serving foods of the category,
+    since the menus embed the category name.
+    """
+    hotel_ids = Food.objects.filter(category=instance).values_list('hotel_id', flat=True).distinct()
+    menu_cache.invalidate(*hotel_ids)
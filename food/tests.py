@@ -1,3 +1,263 @@
-from django.test import TestCase
+import base64
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .menu_cache import MenuCache
+from .models import Category, Food
+from .serializer import (
+    FoodDetailsSerializer,
+    FoodOnlyViewSerializer,
+    FOOD_DETAILS_VALUES,
+    FOOD_ONLY_VALUES,
+    serialize_food_details_rows,
+    serialize_food_only_rows,
+)
+from address.models import Address
+from authenticate.models import CustomUser
+from hotel.models import Hotel
+
+
+class FoodTestCase(TestCase):
+    """
+    Base test case with one hotel, one category and an authenticated client.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'}):
+            address = Address.objects.create(area='Adyar', street='Main Street', pincode=600020)
+        cls.manager = CustomUser.objects.create_user(
+            email='manager@example.com', password='secret', name='Manager', role='manager'
+        )
+        cls.hotel = Hotel.objects.create(name='Hotel', user=cls.manager, address=address)
+        cls.category = Category.objects.create(name='Meals')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.manager)
+
+    def create_foods(self, count):
+        Food.objects.bulk_create([
+            Food(name=f'Food {index}', price='12.50', category=self.category, hotel=self.hotel)
+            for index in range(count)
+        ])
+
+
+@override_settings(PAGINATION_DEFAULT_PAGE_SIZE=10, PAGINATION_MAX_PAGE_SIZE=10)
+class FoodPaginationTest(FoodTestCase):
+    """
+    Food listing pages through results with a cursor and never counts rows.
+    """
+
+    def test_pages_cover_all_rows_once(self):
+        self.create_foods(25)
+        seen = []
+        cursor = None
+        page_query_counts = []
+
+        while True:
+            params = {'hotel_id': self.hotel.id}
+            if cursor:
+                params['cursor'] = cursor
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get('/foods/', params)
+            self.assertEqual(response.status_code, 200)
+            page_query_counts.append(len(context.captured_queries))
+            self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+
+            seen.extend(food['id'] for food in response.data['food_items'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(seen, sorted(Food.objects.values_list('id', flat=True)))
+        self.assertEqual(len(set(page_query_counts)), 1)
+
+    def test_page_size_is_capped(self):
+        self.create_foods(15)
+        response = self.client.get('/foods/', {'page_size': 500})
+        self.assertEqual(len(response.data['food_items']), 10)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/foods/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_non_integer_cursor_values_are_rejected(self):
+        for payload in (b'[1e400]', b'[1.5]', b'[NaN]', b'[Infinity]'):
+            cursor = base64.urlsafe_b64encode(payload).decode().rstrip('=')
+            response = self.client.get('/foods/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, payload)
+
+
+class ActiveIndexTest(FoodTestCase):
+    """
+    The hot active-row filters are served by the partial indexes.
+    """
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always get a sequential scan.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_food_by_hotel_uses_partial_index(self):
+        plan = self.explain(Food.active.filter(hotel_id=self.hotel.id).order_by('id'))
+        self.assertIn('food_active_hotel_idx', plan)
+
+    def test_food_by_category_uses_partial_index(self):
+        plan = self.explain(Food.active.filter(category_id=self.category.id).order_by('id'))
+        self.assertIn('food_active_category_idx', plan)
+
+    def test_hotel_listing_uses_partial_index(self):
+        plan = self.explain(Hotel.active.filter(id__gt=0).order_by('id'))
+        self.assertIn('hotel_active_id_idx', plan)
+
+    def test_hotel_by_name_uses_partial_index(self):
+        plan = self.explain(Hotel.active.filter(name='Hotel').order_by('id'))
+        self.assertIn('hotel_active_name_idx', plan)
+
+    def test_address_listing_uses_partial_index(self):
+        plan = self.explain(Address.active.filter(id__gt=0).order_by('id'))
+        self.assertIn('address_active_id_idx', plan)
+
+
+class NormalizeStatusTest(FoodTestCase):
+    """
+    Legacy status spellings are rewritten to the canonical values.
+    """
+
+    def test_legacy_status_is_normalised(self):
+        self.create_foods(3)
+        Food.objects.filter(name='Food 0').update(status='Active')
+        Food.objects.filter(name='Food 1').update(status='INACTIVE ')
+        self.assertEqual(Food.active.count(), 1)
+
+        call_command('normalize_status', stdout=StringIO())
+
+        self.assertEqual(Food.active.count(), 2)
+        self.assertEqual(Food.objects.filter(status=Food.INACTIVE).count(), 1)
+
+
+@override_settings(CACHE_ASSUME_SHARED=True)
+class MenuCacheTest(FoodTestCase):
+    """
+    Hotel menus are served from the cache until a change invalidates them.
+    """
+
+    def get_menu(self):
+        response = self.client.get('/foods/', {'hotel_id': self.hotel.id})
+        self.assertEqual(response.status_code, 200)
+        return response.data['food_items']
+
+    def assertMenuCached(self):
+        with CaptureQueriesContext(connection) as context:
+            menu = self.get_menu()
+        self.assertFalse(any('food_food' in query['sql'] for query in context.captured_queries))
+        return menu
+
+    def test_food_change_invalidates_menu(self):
+        food = Food.objects.create(name='Dosa', price='40.00', category=self.category, hotel=self.hotel)
+        self.get_menu()
+        self.assertMenuCached()
+
+        food.price = '45.00'
+        food.save()
+        self.assertEqual(self.get_menu()[0]['price'], '₹45.00')
+        self.assertMenuCached()
+
+        food.delete()
+        self.assertEqual(self.get_menu(), [])
+
+    def test_category_rename_invalidates_menu(self):
+        Food.objects.create(name='Dosa', price='40.00', category=self.category, hotel=self.hotel)
+        self.get_menu()
+
+        self.category.name = 'Tiffin'
+        self.category.save()
+        self.assertEqual(self.get_menu()[0]['category']['name'], 'Tiffin')
+
+    def test_hotel_deactivation_invalidates_menu(self):
+        Food.objects.create(name='Dosa', price='40.00', category=self.category, hotel=self.hotel)
+        self.get_menu()
+
+        self.hotel.status = Hotel.INACTIVE
+        self.hotel.save()
+        self.assertEqual(self.get_menu(), [])
+
+    def test_invalidation_is_repeated_on_commit(self):
+        food = Food.objects.create(name='Dosa', price='40.00', category=self.category, hotel=self.hotel)
+        with self.captureOnCommitCallbacks(execute=True):
+            food.price = '45.00'
+            food.save()
+            # A request between the save and the commit caches what it can see.
+            self.get_menu()
+            self.assertMenuCached()
+        with CaptureQueriesContext(connection) as context:
+            self.get_menu()
+        self.assertTrue(any('food_food' in query['sql'] for query in context.captured_queries))
+
+    @override_settings(CACHE_ASSUME_SHARED=False)
+    def test_per_process_cache_is_bypassed(self):
+        Food.objects.create(name='Dosa', price='40.00', category=self.category, hotel=self.hotel)
+        self.get_menu()
+        with CaptureQueriesContext(connection) as context:
+            self.get_menu()
+        self.assertTrue(any('food_food' in query['sql'] for query in context.captured_queries))
+
+    def test_cold_entry_is_built_once(self):
+        menu_cache = MenuCache(prefix='stampede-test')
+        build_calls = []
+
+        def build(hotel_ids):
+            build_calls.append(hotel_ids)
+            time.sleep(0.2)
+            return {hotel_id: ['menu'] for hotel_id in hotel_ids}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(menu_cache.get_many([1], 'only', build)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(build_calls), 1)
+        self.assertEqual(results, [{1: ['menu']}] * 5)
+        self.assertEqual(menu_cache.stats()['rebuilds'], 1)
+
+
+class FastFoodSerializerTest(FoodTestCase):
+    """
+    The `.values()` serializers render the same JSON bytes as the model serializers.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for index, price in enumerate(['10.50', '0.05', '100.00', '99999999.99', '7.1', '12.345']):
+            Food.objects.create(name=f'Food {index}', price=price, category=self.category, hotel=self.hotel)
+
+    def test_details_json_is_identical(self):
+        queryset = Food.objects.order_by('id')
+        expected = JSONRenderer().render(FoodDetailsSerializer(queryset.select_related('category', 'hotel'), many=True).data)
+        actual = JSONRenderer().render(serialize_food_details_rows(queryset.values(*FOOD_DETAILS_VALUES)))
+        self.assertEqual(actual, expected)
+
+    def test_food_only_json_is_identical(self):
+        queryset = Food.objects.order_by('id')
+        expected = JSONRenderer().render(FoodOnlyViewSerializer(queryset, many=True).data)
+        actual = JSONRenderer().render(serialize_food_only_rows(queryset.values(*FOOD_ONLY_VALUES)))
+        self.assertEqual(actual, expected)
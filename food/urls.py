@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import FoodItemView
+from .views import FoodItemAsyncView, FoodItemView, MenuCacheStatsView
 
 urlpatterns = [
     path('foods/', FoodItemView.as_view(), name='food-filter'),
+    path('async/foods/', FoodItemAsyncView.as_view(), name='food-filter-async'),
+    path('foods/cache-stats/', MenuCacheStatsView.as_view(), name='menu-cache-stats'),
 ]
\ No newline at end of file
@@ -4,13 +4,17 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 
-from authenticate.permissions import IsManagerOrAdmin, IsAccessToAll
-from .service import get_food_items, insert_food_items
+from authenticate.permissions import IsAdmin, IsManagerOrAdmin, IsAccessToAll
+from .menu_cache import menu_cache
+from .service import aget_food_items, get_food_items, insert_food_items
 from utils.exceptions import AuthorizationException
+from core.async_views import AsyncAPIView
+from core.query_budget import query_budget
 
 logger = logging.getLogger(__name__)
 
 
+@query_budget(get=1, post=3)
 class FoodItemView(APIView):
     """
     Handles GET and POST requests for Food items.
@@ -31,15 +35,17 @@ class FoodItemView(APIView):
         - food_id
         - hotel_id
         - category_id
+
+        Paginated with `cursor` and `page_size`; `next_cursor` is null on the last page.
         """
         if not request.user or not request.user.is_authenticated:
             logger.warning("Unauthorized GET request to FoodItemView")
             raise AuthorizationException()
 
         logger.debug("Fetching food items with filters: %s", request.query_params)
-        food_items = get_food_items(request)
+        food_items, next_cursor = get_food_items(request)
         logger.info("Food items fetched: %d", len(food_items))
-        return Response({'food_items': food_items}, status=status.HTTP_200_OK)
+        return Response({'food_items': food_items, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
 
     def post(self, request):
         """
@@ -53,3 +59,36 @@ class FoodItemView(APIView):
         food_item = insert_food_items(request)
         logger.info("New food item created successfully")
         return Response({'food_items': food_item}, status=status.HTTP_200_OK)
+
+
+@query_budget(get=0)
+class MenuCacheStatsView(APIView):
+    """
+    Returns hit/miss counters of the menu cache for this worker process.
+    - GET: Admin only
+    """
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({'menu_cache': menu_cache.stats()}, status=status.HTTP_200_OK)
+
+
+@query_budget(get=1)
+class FoodItemAsyncView(AsyncAPIView):
+    """
+    GET of FoodItemView served on the event loop (see core.async_views).
+    - GET: Any authenticated user
+    """
+
+    async def get(self, request):
+        """
+        Returns filtered food items; same filters and pagination as FoodItemView.
+        """
+        if not request.user or not request.user.is_authenticated:
+            logger.warning("Unauthorized GET request to FoodItemAsyncView")
+            raise AuthorizationException()
+
+        food_items, next_cursor = await aget_food_items(request)
+        logger.info("Food items fetched: %d", len(food_items))
+        return Response({'food_items': food_items, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class HotelConfig(AppConfig):
@@ -6,4 +7,6 @@ class HotelConfig(AppConfig):
     name = 'hotel'
 
     def ready(self):
-        import hotel.signals
\ No newline at end of file
+        import hotel.signals
+        from .search import ensure_trigram_indexes
+        post_migrate.connect(ensure_trigram_indexes, sender=self)
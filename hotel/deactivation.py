@@ -0,0 +1,119 @@
+"""
+Cascade of a hotel deactivation to its foods and the carts holding them.
+
+When a hotel goes from active to inactive (hotel.signals), its active
+foods are deactivated in batches of HOTEL_CASCADE_BATCH_SIZE and the
+cart lines for those foods are deleted, with the affected cart totals
+recomputed in bulk (CartDetails.reconcile_totals).
+
+Hotels with up to HOTEL_CASCADE_INLINE_LIMIT active foods are handled
+inline, in one transaction with the request. Larger menus are deferred
+to a background job (hotel.jobs.finish_hotel_deactivation), which
+commits batch by batch and so can be interrupted and run again: an
+inactive hotel with active foods is all the state a pending cascade
+needs. The `cascade_hotel_deactivations` command finishes any that
+were left behind.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from food.models import Food
+from orders.models import CartDetails, CartItem, held_quantities
+from orders.stock import release_stock
+from .models import Hotel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_INLINE_LIMIT = 5000
+
+
+def get_batch_size():
+    return getattr(settings, 'HOTEL_CASCADE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def _deactivate_foods(food_ids):
+    """
+    Deactivates the foods, deletes their cart lines, gives back the stock
+    those lines held and fixes those carts' totals.
+
+    Returns:
+        int: Number of cart lines deleted.
+    """
+    # Carts are locked before the foods, as checkout and cart edits lock the
+    # cart before reserving stock on the food rows; the reverse can deadlock.
+    cart_ids = list(
+        CartDetails.objects.select_for_update()
+        .filter(id__in=CartItem.objects.filter(food_id__in=food_ids).values('cart_id'))
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    Food.objects.filter(id__in=food_ids).update(status=Food.INACTIVE)
+    if not cart_ids:
+        return 0
+    release_stock(held_quantities(CartItem.objects.filter(food_id__in=food_ids)))
+    deleted, _ = CartItem.objects.filter(food_id__in=food_ids).delete()
+    CartDetails.reconcile_totals(CartDetails.objects.filter(id__in=cart_ids))
+    return deleted
+
+
+def cascade_deactivation(hotel_id):
+    """
+    Deactivates the foods of a deactivated hotel inline if its menu is
+    small enough, else queues a job to do it.
+
+    Returns:
+        bool: Whether the cascade ran (False when deferred).
+    """
+    inline_limit = getattr(settings, 'HOTEL_CASCADE_INLINE_LIMIT', DEFAULT_INLINE_LIMIT)
+    food_ids = list(Food.active.filter(hotel_id=hotel_id).order_by('id').values_list('id', flat=True)[:inline_limit + 1])
+    if len(food_ids) > inline_limit:
+        from .jobs import finish_hotel_deactivation
+        finish_hotel_deactivation.defer(hotel_id)
+        logger.info("Hotel %s has over %d active foods, cascade deferred", hotel_id, inline_limit)
+        return False
+
+    batch_size = get_batch_size()
+    cart_lines = 0
+    with transaction.atomic():
+        for start in range(0, len(food_ids), batch_size):
+            cart_lines += _deactivate_foods(food_ids[start:start + batch_size])
+    logger.info("Hotel %s deactivated: %d food(s), %d cart line(s) removed", hotel_id, len(food_ids), cart_lines)
+    return True
+
+
+def resume_deactivation(hotel_id):
+    """
+    Deactivates the remaining active foods of an inactive hotel,
+    committing after each batch.
+
+    Returns:
+        tuple: (foods deactivated, cart lines removed)
+    """
+    batch_size = get_batch_size()
+    foods = cart_lines = 0
+    while True:
+        with transaction.atomic():
+            # Not locked here: _deactivate_foods locks the carts before the foods.
+            # A concurrent run deactivating the same foods repeats idempotent updates.
+            food_ids = list(
+                Food.active.filter(hotel_id=hotel_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if food_ids:
+                cart_lines += _deactivate_foods(food_ids)
+        foods += len(food_ids)
+        if len(food_ids) < batch_size:
+            break
+    logger.info("Hotel %s deactivation resumed: %d food(s), %d cart line(s) removed", hotel_id, foods, cart_lines)
+    return foods, cart_lines
+
+
+def pending_hotel_ids():
+    """
+    Returns the ids of inactive hotels that still have active foods.
+    """
+    return list(
+        Food.active.filter(hotel__status=Hotel.INACTIVE).order_by('hotel_id').values_list('hotel_id', flat=True).distinct()
+    )
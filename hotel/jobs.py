@@ -0,0 +1,30 @@
+from django.db import transaction
+
+from core.jobs import task
+from food.menu_cache import menu_cache
+from .deactivation import resume_deactivation
+from .models import Hotel
+
+
+@task(dedup_key='hotel-deactivation:{0}')
+def finish_hotel_deactivation(hotel_id):
+    """
+    Deactivates the foods of a deactivated hotel whose menu was too large
+    to handle inline (see hotel.deactivation).
+    """
+    resume_deactivation(hotel_id)
+    menu_cache.invalidate(hotel_id)
+
+
+@task()
+def add_view_counts(counts):
+    """
+    Writes view counts flushed by hotel.view_counts, which calls it
+    directly. Still a task so jobs queued by older releases run; job
+    arguments are JSON, so their hotel ids arrive as strings.
+
+    All updates commit together, so a retry after a failure does not
+    count the views of already updated hotels twice.
+    """
+    with transaction.atomic():
+        Hotel.add_view_counts({int(hotel_id): increment for hotel_id, increment in counts.items()})
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LiveHotelIndex:
+    """
+    In-process index of the active hotels, kept current as they change.
+
+    Built from the database on first use. Hotel and Address signals
+    (hotel.signals) apply the changes of this process as they happen; a
+    rebuild every `ttl` seconds picks up changes from other processes
+    and bulk writes. While a rebuild runs, reads use the previous index
+    and changes are replayed on the new one.
+
+    Subclasses implement `load()`, returning a new index filled from the
+    database, and make changes through `apply()` and reads through `read()`.
+    """
+
+    ttl_setting = None
+    default_ttl = 300
+
+    def __init__(self):
+        self._index = None
+        self._built_at = 0.0
+        self._replay = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, self.ttl_setting, self.default_ttl)
+
+    @property
+    def is_loaded(self):
+        """
+        Whether an index exists or is being built, i.e. whether changes matter.
+        """
+        return self._index is not None or self._replay is not None
+
+    def load(self):
+        raise NotImplementedError
+
+    def apply(self, change):
+        """
+        Calls `change(index)` on the current index, and on the one being built.
+        Does nothing before the first build, which reads the database anyway.
+        """
+        with self._lock:
+            if self._index is not None:
+                change(self._index)
+            if self._replay is not None:
+                self._replay.append(change)
+
+    def peek(self, read):
+        """
+        Returns `read(index)` on the current index, or None before the first
+        build. Never builds.
+        """
+        with self._lock:
+            return read(self._index) if self._index is not None else None
+
+    def read(self, read):
+        """
+        Returns `read(index)`, building or refreshing the index first if needed.
+        """
+        self._ensure_current()
+        with self._lock:
+            return read(self._index)
+
+    def rebuild(self):
+        """
+        Loads a new index and swaps it in.
+        """
+        with self._lock:
+            self._replay = []
+        try:
+            index = self.load()
+        except BaseException:
+            with self._lock:
+                self._replay = None
+            raise
+        with self._lock:
+            for change in self._replay:
+                change(index)
+            self._index, self._replay = index, None
+            self._built_at = time.monotonic()
+        logger.info("%s built with %d hotel(s)", type(self).__name__, len(index))
+
+    def _expired(self):
+        return self._index is None or (self.ttl and time.monotonic() - self._built_at >= self.ttl)
+
+    def _ensure_current(self):
+        if not self._expired():
+            return
+        # Only the first build makes readers wait; later rebuilds run in the
+        # thread that noticed the expiry while the others keep the old index.
+        if not self._build_lock.acquire(blocking=self._index is None):
+            return
+        try:
+            if self._expired():
+                self.rebuild()
+        finally:
+            self._build_lock.release()
+
+    def reset(self):
+        """
+        Drops the index; the next read rebuilds it.
+        """
+        with self._lock:
+            self._index = None
+            self._built_at = 0.0
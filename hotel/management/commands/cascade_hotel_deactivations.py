@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from food.menu_cache import menu_cache
+from hotel.deactivation import pending_hotel_ids, resume_deactivation
+
+
+class Command(BaseCommand):
+    """
+    Finishes hotel deactivations whose foods are still active.
+
+    Foods of hotels with menus over HOTEL_CASCADE_INLINE_LIMIT are
+    deactivated by a background job (see hotel.deactivation); this does
+    the same for hotels whose job failed or was never run, batch by
+    batch. Each batch commits on its own, so an interrupted run picks up
+    where it stopped.
+
+    Usage:
+        python manage.py cascade_hotel_deactivations
+        python manage.py cascade_hotel_deactivations --hotel 42
+    """
+
+    help = "Deactivate the remaining foods of inactive hotels and remove them from carts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hotel', type=int, action='append', help="Only these hotel ids.")
+
+    def handle(self, *args, **options):
+        hotel_ids = pending_hotel_ids()
+        if options['hotel']:
+            hotel_ids = [hotel_id for hotel_id in hotel_ids if hotel_id in options['hotel']]
+
+        foods = cart_lines = 0
+        for hotel_id in hotel_ids:
+            hotel_foods, hotel_cart_lines = resume_deactivation(hotel_id)
+            menu_cache.invalidate(hotel_id)
+            foods += hotel_foods
+            cart_lines += hotel_cart_lines
+        self.stdout.write(self.style.SUCCESS(
+            f"Deactivated {foods} food(s) of {len(hotel_ids)} hotel(s), removed {cart_lines} cart line(s)."
+        ))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F, Q
 
 from utils.models import BaseModel
 from address.models import Address
@@ -34,6 +35,40 @@ class Hotel(BaseModel):
         help_text="Number of times the hotel page was viewed."
     )
 
+    class Meta:
+        indexes = [
+            # Partial indexes serving the active-hotel listing and name filter
+            models.Index(fields=['id'], condition=Q(status=BaseModel.ACTIVE), name='hotel_active_id_idx'),
+            models.Index(fields=['name', 'id'], condition=Q(status=BaseModel.ACTIVE), name='hotel_active_name_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the loaded status so the post_save signals can tell
+        a deactivation from any other save (see `was_deactivated`).
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = dict(zip(field_names, values)).get('status')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the hotel; the post_save signals still see the status it was loaded with.
+        """
+        super().save(*args, **kwargs)
+        if kwargs.get('update_fields') is None or 'status' in kwargs['update_fields']:
+            self._loaded_status = self.status
+
+    def was_deactivated(self, update_fields=None):
+        """
+        Whether the save being signalled moved the hotel from active to inactive.
+        Hotels not loaded from the database count as previously active.
+        """
+        if self.status != self.INACTIVE or (update_fields is not None and 'status' not in update_fields):
+            return False
+        return getattr(self, '_loaded_status', self.ACTIVE) != self.INACTIVE
+
     def __str__(self):
         """Returns a readable string representation of the hotel."""
         return self.name
@@ -42,7 +77,28 @@ class Hotel(BaseModel):
         """
         Increments the view count of the hotel.
         Useful for tracking hotel popularity.
+
+        The increment is buffered and written later in a batch,
+        see `hotel.view_counts`.
+        """
+        from .view_counts import view_counter
+        view_counter.record([self.id])
+
+    @classmethod
+    def add_view_counts(cls, counts):
+        """
+        Adds buffered view counts to hotels.
+
+        Args:
+            counts (dict): Mapping of hotel id to the number of views to add.
+
+        Hotels sharing the same increment are updated in one
+        `F('view_count') + n` UPDATE. Does not touch `updated_at`
+        or send `post_save`.
         """
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        hotel_ids_by_increment = {}
+        for hotel_id, increment in counts.items():
+            hotel_ids_by_increment.setdefault(increment, []).append(hotel_id)
 
+        for increment, hotel_ids in hotel_ids_by_increment.items():
+            cls.objects.filter(id__in=hotel_ids).update(view_count=F('view_count') + increment)
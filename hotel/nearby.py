@@ -0,0 +1,207 @@
+"""
+Nearby-hotel search over pincode centroids.
+
+Hotels are placed at the centroid of their address pincode, taken from
+the offline pincode directory (address.pincode_directory), so no
+geocoding happens per request. GeoGrid buckets the pincodes that have
+active hotels into cells of HOTEL_NEARBY_GRID_DEGREES; a query only
+measures the pincodes in the cells its radius overlaps, which stays at a
+few hundred distance computations however many hotels are indexed.
+
+Hotels whose pincode has no coordinates stay indexed but are never
+returned, and show up once the directory knows the pincode and the
+index is rebuilt.
+"""
+import math
+from collections import defaultdict
+
+from django.conf import settings
+
+from address.pincode_directory import get_pincode_directory
+from .live_index import LiveHotelIndex
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+DEFAULT_GRID_DEGREES = 0.1
+DEFAULT_INDEX_TTL = 300
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def distance_km(latitude, longitude, other_latitude, other_longitude):
+    """
+    Great-circle (haversine) distance between two points in degrees.
+    """
+    latitude, other_latitude = math.radians(latitude), math.radians(other_latitude)
+    half_dlat = (other_latitude - latitude) / 2
+    half_dlon = math.radians(other_longitude - longitude) / 2
+    a = math.sin(half_dlat) ** 2 + math.cos(latitude) * math.cos(other_latitude) * math.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GeoGrid:
+    """
+    Active hotels grouped by pincode, with the located pincodes bucketed
+    into square grid cells.
+
+    `locate(pincode)` returns the (latitude, longitude) of a pincode or
+    None; each pincode is located once and remembered.
+    """
+
+    def __init__(self, locate, cell_degrees=DEFAULT_GRID_DEGREES):
+        self.locate = locate
+        self.cell_degrees = cell_degrees
+        self.hotels = {}                   # hotel_id -> (address_id, pincode)
+        self.by_pincode = defaultdict(set)  # pincode -> hotel ids
+        self.by_address = defaultdict(set)  # address_id -> hotel ids
+        self.cells = defaultdict(set)      # (row, column) -> located pincodes with hotels
+        self.points = {}                   # pincode -> (latitude, longitude) or None
+
+    def __len__(self):
+        return len(self.hotels)
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def _point(self, pincode):
+        if pincode not in self.points:
+            self.points[pincode] = self.locate(pincode) if pincode else None
+        return self.points[pincode]
+
+    def add(self, hotel_id, address_id, pincode):
+        """
+        Adds a hotel, or moves it if it is already indexed.
+        """
+        if self.hotels.get(hotel_id) == (address_id, pincode):
+            return
+        self.remove(hotel_id)
+        self.hotels[hotel_id] = (address_id, pincode)
+        self.by_address[address_id].add(hotel_id)
+        hotels = self.by_pincode[pincode]
+        hotels.add(hotel_id)
+        point = self._point(pincode)
+        if len(hotels) == 1 and point is not None:
+            self.cells[self._cell(*point)].add(pincode)
+
+    def remove(self, hotel_id):
+        entry = self.hotels.pop(hotel_id, None)
+        if entry is None:
+            return
+        address_id, pincode = entry
+        self._discard(self.by_address, address_id, hotel_id)
+        if self._discard(self.by_pincode, pincode, hotel_id):
+            point = self.points.get(pincode)
+            if point is not None:
+                self._discard(self.cells, self._cell(*point), pincode)
+
+    @staticmethod
+    def _discard(groups, key, member):
+        """
+        Removes `member` from `groups[key]`, dropping the group once empty.
+        Returns whether it was dropped.
+        """
+        group = groups[key]
+        group.discard(member)
+        if not group:
+            del groups[key]
+            return True
+        return False
+
+    def set_pincode(self, address_id, pincode):
+        """
+        Moves the hotels at an address to its new pincode.
+        """
+        for hotel_id in list(self.by_address.get(address_id, ())):
+            self.add(hotel_id, address_id, pincode)
+
+    def nearest(self, latitude, longitude, radius_km, limit):
+        """
+        Returns up to `limit` (hotel_id, distance_km) within `radius_km`,
+        nearest first; hotels sharing a pincode are ordered by id.
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        # Longitude degrees shrink towards the poles; widen the box to match.
+        widest = math.radians(min(abs(latitude) + lat_span, 89.0))
+        lon_span = radius_km / (KM_PER_DEGREE * math.cos(widest))
+        first_row, first_column = self._cell(latitude - lat_span, longitude - lon_span)
+        last_row, last_column = self._cell(latitude + lat_span, longitude + lon_span)
+
+        in_range = []
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                for pincode in self.cells.get((row, column), ()):
+                    distance = distance_km(latitude, longitude, *self.points[pincode])
+                    if distance <= radius_km:
+                        in_range.append((distance, pincode))
+        in_range.sort()
+
+        results = []
+        for distance, pincode in in_range:
+            for hotel_id in sorted(self.by_pincode[pincode]):
+                if len(results) == limit:
+                    return results
+                results.append((hotel_id, distance))
+        return results
+
+
+class NearbyHotelIndex(LiveHotelIndex):
+    """
+    GeoGrid of the active hotels in the database, located with the
+    offline pincode directory. Kept current as described in hotel.live_index.
+    """
+
+    ttl_setting = 'HOTEL_NEARBY_INDEX_TTL'
+    default_ttl = DEFAULT_INDEX_TTL
+
+    def load(self):
+        from .models import Hotel
+
+        directory = get_pincode_directory()
+        locate = directory.coordinates if directory is not None else (lambda pincode: None)
+        grid = GeoGrid(locate, getattr(settings, 'HOTEL_NEARBY_GRID_DEGREES', DEFAULT_GRID_DEGREES))
+        rows = Hotel.active.values_list('id', 'address_id', 'address__pincode')
+        for hotel_id, address_id, pincode in rows.iterator(chunk_size=5000):
+            grid.add(hotel_id, address_id, pincode)
+        return grid
+
+    def indexed_pincode(self, hotel_id, address_id):
+        """
+        Returns the pincode indexed for the hotel if its address is unchanged, else None.
+        """
+        entry = self.peek(lambda grid: grid.hotels.get(hotel_id))
+        if entry is None or entry[0] != address_id:
+            return None
+        return entry[1]
+
+    def index_hotel(self, hotel_id, address_id, pincode, active=True):
+        """
+        Adds, moves or (when not active) removes a hotel.
+        """
+        if active:
+            self.apply(lambda grid: grid.add(hotel_id, address_id, pincode))
+        else:
+            self.remove_hotel(hotel_id)
+
+    def remove_hotel(self, hotel_id):
+        self.apply(lambda grid: grid.remove(hotel_id))
+
+    def set_pincode(self, address_id, pincode):
+        self.apply(lambda grid: grid.set_pincode(address_id, pincode))
+
+    def nearest(self, latitude, longitude, radius_km, limit):
+        return self.read(lambda grid: grid.nearest(latitude, longitude, radius_km, limit))
+
+
+nearby_index = NearbyHotelIndex()
+
+
+def locate_pincode(pincode):
+    """
+    Returns the (latitude, longitude) of the pincode centroid, or None
+    if the pincode directory is missing or does not locate it.
+    """
+    directory = get_pincode_directory()
+    return directory.coordinates(pincode) if directory is not None else None
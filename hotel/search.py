@@ -0,0 +1,417 @@
+"""
+Hotel name and area search with prefix and typo-tolerant matching.
+
+Two backends, picked by HOTEL_SEARCH_BACKEND:
+
+    database  PostgreSQL pg_trgm. Hotel names and address areas carry GiST
+              trigram indexes (created after migrate, see
+              ensure_trigram_indexes); matches are filtered with the
+              word-similarity operator and ordered by distance straight
+              from the index, so a search reads only `limit` rows.
+    memory    HotelSearchIndex, an in-process prefix and trigram index
+              built from the database on first use and kept current by
+              the Hotel and Address signals of this process (see
+              hotel.live_index). Changes made by other processes or by
+              bulk writes show up when the index is rebuilt, every
+              HOTEL_SEARCH_INDEX_TTL seconds.
+
+'auto' uses the database backend on PostgreSQL and the memory backend
+elsewhere (SQLite in development and tests).
+
+Settings:
+    - HOTEL_SEARCH_BACKEND: 'auto', 'database' or 'memory'.
+    - HOTEL_SEARCH_MIN_SIMILARITY: Share of the query's trigrams a fuzzy match
+      must contain (memory backend; PostgreSQL uses pg_trgm.word_similarity_threshold).
+    - HOTEL_SEARCH_INDEX_TTL: Seconds before the memory index is rebuilt (0 never).
+    - HOTEL_SEARCH_MAX_LIMIT: Most results one search returns.
+"""
+import bisect
+import logging
+import math
+import re
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connection, connections
+from django.db.models import FloatField, Func, Value
+
+from .live_index import LiveHotelIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIMILARITY = 0.5
+DEFAULT_INDEX_TTL = 300
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_LENGTH = 100
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+
+def tokenize(text):
+    """
+    Returns the lower-case words of `text`.
+    """
+    return _NON_WORD.sub(' ', (text or '').casefold()).split()
+
+
+def trigrams(words):
+    """
+    Returns the trigrams of `words` the way pg_trgm forms them: each word
+    is padded with two spaces in front and one behind.
+    """
+    grams = set()
+    for word in words:
+        padded = f'  {word} '
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def normalize_query(query):
+    return ' '.join(tokenize(query))
+
+
+class SearchIndex:
+    """
+    Prefix and trigram index over hotel names and areas. Not thread safe.
+
+    Names and areas each keep a sorted list of their distinct words, every
+    word pointing to the hotels using it, so a prefix is a binary search
+    and a range scan. Misspellings are looked up in the vocabulary rather
+    than among hotels: a trigram index over the distinct words finds those
+    sharing at least `min_similarity` of a query word's trigrams, and
+    their hotels come from the word lists. The vocabulary grows much more
+    slowly than the number of hotels, which keeps fuzzy lookups cheap.
+    """
+
+    def __init__(self):
+        self.docs = {}              # hotel id -> (name, area, address id, words)
+        self.by_address = {}        # address id -> hotel id
+        self.name_words = _WordIndex()
+        self.area_words = _WordIndex()
+        self.word_uses = Counter()  # word -> name and area lists it is in
+        self.word_trigrams = {}     # trigram -> words containing it
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, hotel_id, name, address_id, area):
+        """
+        Adds a hotel, replacing what was indexed for it before.
+        """
+        if hotel_id in self.docs:
+            self.remove(hotel_id)
+        name_tokens = {sys.intern(word) for word in tokenize(name)}
+        area_tokens = {sys.intern(word) for word in tokenize(area)}
+        self.docs[hotel_id] = (name, area, address_id, tuple(name_tokens | area_tokens))
+        self.by_address[address_id] = hotel_id
+        for word_index, tokens in ((self.name_words, name_tokens), (self.area_words, area_tokens)):
+            for word in tokens:
+                if word_index.add(word, hotel_id):
+                    self._use_word(word, 1)
+
+    def remove(self, hotel_id):
+        doc = self.docs.pop(hotel_id, None)
+        if doc is None:
+            return
+        name, area, address_id, _ = doc
+        if self.by_address.get(address_id) == hotel_id:
+            del self.by_address[address_id]
+        for word_index, text in ((self.name_words, name), (self.area_words, area)):
+            for word in set(tokenize(text)):
+                if word_index.remove(word, hotel_id):
+                    self._use_word(word, -1)
+
+    def _use_word(self, word, change):
+        # Words enter the trigram index with their first list and leave with their last.
+        self.word_uses[word] += change
+        if change > 0 and self.word_uses[word] == 1:
+            for gram in trigrams([word]):
+                self.word_trigrams.setdefault(gram, set()).add(word)
+        elif change < 0 and self.word_uses[word] == 0:
+            del self.word_uses[word]
+            for gram in trigrams([word]):
+                self.word_trigrams[gram].discard(word)
+                if not self.word_trigrams[gram]:
+                    del self.word_trigrams[gram]
+
+    def set_area(self, address_id, area):
+        """
+        Updates the area of the hotel at `address_id`, if one is indexed.
+        """
+        hotel_id = self.by_address.get(address_id)
+        if hotel_id is not None:
+            self.add(hotel_id, self.docs[hotel_id][0], address_id, area)
+
+    def search(self, query, limit, min_similarity=DEFAULT_MIN_SIMILARITY):
+        """
+        Returns up to `limit` hotels having, for every query word, a word that
+        starts with it or is spelled close to it. Prefix matches rank before
+        misspellings, and name matches before area matches.
+
+        Returns:
+            list: Dicts with the hotel `id`, `name` and `area`.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+
+        # Scan the hotels of the query word with the fewest prefix matches
+        # and check the other words against each hotel's own words.
+        prefixed = {word: self._prefixed(word) for word in words}
+        driver = min(words, key=lambda word: self._hotel_count(prefixed[word]))
+        others = [word for word in words if word is not driver]
+        similar = {}
+
+        def matches(word, tokens):
+            if any(token.startswith(word) for token in tokens):
+                return True
+            if word not in similar:
+                similar[word] = set(self._similar(word, min_similarity))
+            return any(token in similar[word] for token in tokens)
+
+        found, seen = [], set()
+        tiers = (prefixed[driver], lambda: self._similar(driver, min_similarity))
+        for tier in tiers:
+            tier = tier() if callable(tier) else tier
+            for word_index in (self.name_words, self.area_words):
+                for word in tier:
+                    for hotel_id in word_index.hotels.get(word, ()):
+                        if hotel_id in seen:
+                            continue
+                        seen.add(hotel_id)
+                        tokens = self.docs[hotel_id][3]
+                        if all(matches(other, tokens) for other in others):
+                            found.append(hotel_id)
+                            if len(found) == limit:
+                                return self._rows(found)
+        return self._rows(found)
+
+    def _prefixed(self, prefix):
+        """
+        Returns the indexed words starting with `prefix`, sorted.
+        """
+        return sorted(set(self.name_words.prefixed(prefix)) | set(self.area_words.prefixed(prefix)))
+
+    def _similar(self, word, min_similarity):
+        """
+        Returns the indexed words not starting with `word` that share at least
+        `min_similarity` of its trigrams, most similar first.
+        """
+        grams = trigrams([word])
+        need = max(1, math.ceil(min_similarity * len(grams)))
+        # A word sharing `need` trigrams is in one of the rarest len - need + 1 postings.
+        postings = sorted((self.word_trigrams.get(gram, ()) for gram in grams), key=len)
+        candidates = set().union(*postings[:len(grams) - need + 1])
+        shared = Counter()
+        for posting in postings:
+            shared.update(candidates.intersection(posting))
+
+        scored = sorted(
+            (-count, candidate) for candidate, count in shared.items()
+            if count >= need and not candidate.startswith(word)
+        )
+        return [candidate for _, candidate in scored]
+
+    def _hotel_count(self, words):
+        return sum(
+            len(word_index.hotels.get(word, ()))
+            for word in words for word_index in (self.name_words, self.area_words)
+        )
+
+    def _rows(self, hotel_ids):
+        return [{'id': hotel_id, 'name': self.docs[hotel_id][0], 'area': self.docs[hotel_id][1]} for hotel_id in hotel_ids]
+
+
+class _WordIndex:
+    """
+    Sorted distinct words, each with the hotels using it.
+    """
+
+    def __init__(self):
+        self.words = []
+        self.hotels = {}
+
+    def add(self, word, hotel_id):
+        """
+        Returns whether the word is new to the index.
+        """
+        hotels = self.hotels.get(word)
+        if hotels is not None:
+            hotels.append(hotel_id)
+            return False
+        bisect.insort(self.words, word)
+        self.hotels[word] = [hotel_id]
+        return True
+
+    def remove(self, word, hotel_id):
+        """
+        Returns whether the word left the index.
+        """
+        hotels = self.hotels[word]
+        hotels.remove(hotel_id)
+        if hotels:
+            return False
+        del self.hotels[word]
+        del self.words[bisect.bisect_left(self.words, word)]
+        return True
+
+    def prefixed(self, prefix):
+        start = bisect.bisect_left(self.words, prefix)
+        end = bisect.bisect_left(self.words, prefix + '\U0010ffff', start)
+        return self.words[start:end]
+
+
+class HotelSearchIndex(LiveHotelIndex):
+    """
+    SearchIndex of the active hotels in the database, for the memory backend.
+    Kept current as described in hotel.live_index.
+    """
+
+    ttl_setting = 'HOTEL_SEARCH_INDEX_TTL'
+    default_ttl = DEFAULT_INDEX_TTL
+
+    @property
+    def min_similarity(self):
+        return getattr(settings, 'HOTEL_SEARCH_MIN_SIMILARITY', DEFAULT_MIN_SIMILARITY)
+
+    def load(self):
+        from .models import Hotel
+
+        index = SearchIndex()
+        rows = Hotel.active.values_list('id', 'name', 'address_id', 'address__area')
+        for hotel_id, name, address_id, area in rows.iterator(chunk_size=5000):
+            index.add(hotel_id, name, address_id, area)
+        return index
+
+    def indexed_area(self, hotel_id, address_id):
+        """
+        Returns the area indexed for the hotel if its address is unchanged, else None.
+        """
+        doc = self.peek(lambda index: index.docs.get(hotel_id))
+        if doc is None or doc[2] != address_id:
+            return None
+        return doc[1]
+
+    def index_hotel(self, hotel_id, name, address_id, area, active=True):
+        """
+        Adds, updates or (when not active) removes a hotel.
+        """
+        if active:
+            self.apply(lambda index: index.add(hotel_id, name, address_id, area))
+        else:
+            self.remove_hotel(hotel_id)
+
+    def remove_hotel(self, hotel_id):
+        self.apply(lambda index: index.remove(hotel_id))
+
+    def set_area(self, address_id, area):
+        self.apply(lambda index: index.set_area(address_id, area))
+
+    def search(self, query, limit):
+        return self.read(lambda index: index.search(query, limit, self.min_similarity))
+
+
+search_index = HotelSearchIndex()
+
+
+def get_backend():
+    backend = getattr(settings, 'HOTEL_SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return 'database' if connection.vendor == 'postgresql' else 'memory'
+    return backend
+
+
+class IndexedWordDistance(Func):
+    """
+    pg_trgm word distance written `column <->> query`.
+
+    Same value as TrigramWordDistance (`query <<-> column`), but in the
+    form a GiST trigram index on the column can order by.
+    """
+
+    output_field = FloatField()
+    arg_joiner = ' <->> '
+    template = '(%(expressions)s)'
+
+    def __init__(self, expression, string, **extra):
+        if not hasattr(string, 'resolve_expression'):
+            string = Value(string)
+        super().__init__(expression, string, **extra)
+
+
+def search_database(query, limit):
+    """
+    Searches with pg_trgm: names and areas are matched and ordered by word
+    distance straight from their GiST indexes, then merged.
+    """
+    from .models import Hotel
+
+    matches = []
+    for field in ('name', 'address__area'):
+        rows = (
+            Hotel.active
+            .filter(**{f'{field}__trigram_word_similar': query})
+            .annotate(distance=IndexedWordDistance(field, query))
+            .order_by('distance')
+            .values('id', 'name', 'address__area', 'distance')[:limit]
+        )
+        matches.extend(rows)
+
+    # Name matches win ties with area matches of the same hotel.
+    best = {}
+    for row in matches:
+        if row['id'] not in best or row['distance'] < best[row['id']]['distance']:
+            best[row['id']] = row
+    ranked = sorted(best.values(), key=lambda row: (row['distance'], row['name'], row['id']))[:limit]
+    return [{'id': row['id'], 'name': row['name'], 'area': row['address__area']} for row in ranked]
+
+
+def find_hotels(query, limit):
+    """
+    Returns up to `limit` active hotels whose name or area matches `query`,
+    best match first.
+
+    Returns:
+        list: Dicts with the hotel `id`, `name` and `area`.
+    """
+    if get_backend() == 'database':
+        return search_database(query, limit)
+    return search_index.search(query, limit)
+
+
+def ensure_trigram_indexes(sender, using, **kwargs):
+    """
+    `post_migrate` receiver creating the pg_trgm extension and the trigram
+    indexes of the database backend. The indexes are kept out of the model
+    Meta so the models still migrate on SQLite. Does nothing elsewhere.
+    """
+    database = connections[using]
+    if database.vendor != 'postgresql':
+        return
+
+    from address.models import Address
+    from .models import Hotel
+
+    quote = database.ops.quote_name
+    statements = [
+        ("CREATE EXTENSION IF NOT EXISTS pg_trgm", []),
+        (
+            f"CREATE INDEX IF NOT EXISTS hotel_active_name_trgm_idx ON {quote(Hotel._meta.db_table)} "
+            f"USING gist (name gist_trgm_ops) WHERE status = %s",
+            [Hotel.ACTIVE],
+        ),
+        (
+            f"CREATE INDEX IF NOT EXISTS address_area_trgm_idx ON {quote(Address._meta.db_table)} "
+            f"USING gist (area gist_trgm_ops)",
+            [],
+        ),
+    ]
+    try:
+        with database.cursor() as cursor:
+            for sql, params in statements:
+                cursor.execute(sql, params)
+    except DatabaseError as e:
+        logger.warning("Could not create hotel search trigram indexes: %s", str(e))
@@ -38,15 +38,16 @@ class HotelItemViewSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'address','status', 'food_items']
 
     def get_food_items(self, obj):
-        active_foods = obj.foods.filter(status__iexact='active')
-        return FoodOnlyViewSerializer(active_foods, many=True).data
-    
-    def to_representation(self, instance):
         """
-        Increment view count before serializing
+        Returns the active foods of the hotel.
+        Uses the cached menus passed in the `menus` context when present,
+        so listing hotels does not cost one query per hotel.
         """
-        instance.increment_view_count()
-        return super().to_representation(instance)
+        menus = self.context.get('menus')
+        if menus is not None and obj.id in menus:
+            return menus[obj.id]
+        active_foods = obj.foods(manager='active').all()
+        return FoodOnlyViewSerializer(active_foods, many=True).data
 
 
 class HotelCreateSerializer(serializers.ModelSerializer):
@@ -54,7 +55,7 @@ class HotelCreateSerializer(serializers.ModelSerializer):
     Serializer for creating Hotel objects with validation.
     Validations:
         - Name must be alphabetic with spaces only.
-        - Address must have an 'Active' status.
+        - Address must have an 'active' status.
     """
 
     class Meta:
@@ -82,7 +83,7 @@ class HotelCreateSerializer(serializers.ModelSerializer):
         Returns:
             Address: Validated address object.
         """
-        if value.status != "Active":
+        if value.status != value.ACTIVE:
             raise BadRequestException(key='INACTIVE_ADDRESS')
         if Hotel.objects.filter(address=value).exists():
                 raise BadRequestException(key='HOTEL_WITH_ADDRESS_EXISTS')
@@ -105,6 +106,6 @@ class HotelUpdateSerializer(serializers.ModelSerializer):
         Returns:
             Address: Validated address object.
         """
-        if value.status != "Active":
+        if value.status != value.ACTIVE:
             raise BadRequestException(key='INACTIVE_ADDRESS')
         return value
\ No newline at end of file
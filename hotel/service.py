@@ -1,62 +1,260 @@
 import re
 import logging
 
+from django.conf import settings
 from django.db import IntegrityError
 from django.core.exceptions import FieldError, ObjectDoesNotExist
 
 from .models import Hotel
 from address.models import Address
+from food.menu_cache import menu_cache
+from food.service import aget_hotel_menus, get_hotel_menus
+from core.db_router import replica_reads
 from .serializer import (
     HotelItemViewSerializer,
     HotelCreateSerializer,
     HotelUpdateSerializer,
 )
+from .search import (
+    DEFAULT_LIMIT,
+    MAX_LIMIT,
+    MAX_QUERY_LENGTH,
+    MIN_QUERY_LENGTH,
+    find_hotels,
+    normalize_query,
+    search_index,
+)
+from . import nearby
+from .view_counts import view_counter
+from core.pagination import KeysetPaginator
+from core.telemetry import serializer_timer
 from utils.exceptions import BadRequestException
 
 logger = logging.getLogger(__name__)
 
 VALID_NAME_PATTERN = r'^[A-Za-z ]{2,100}$'
 
+paginator = KeysetPaginator(ordering=('id',))
 
-def get_hotel_item(request):
+
+def get_hotel_queryset():
     """
-    Returns hotel(s) filtered by ID, name, or area.
+    Returns the base queryset for active hotel listings, with the address joined.
+    Menus come from the menu cache, see food.service.get_hotel_menus.
     """
+    return Hotel.active.select_related('address')
+
 
+def build_hotel_query(request):
+    """
+    Returns the queryset of active hotels matching the request filters.
+    Only the first of hotel_id, hotel_name and area is applied.
+
+    Raises:
+        BadRequestException: If hotel_name or area is not a valid name.
+        ValueError: If hotel_id is not an integer.
+    """
     hotel_id = request.query_params.get('hotel_id')
     hotel_name = request.query_params.get('hotel_name')
     area = request.query_params.get('area')
 
+    if hotel_id:
+        hotel_id = int(hotel_id)
+        logger.debug("Filter: hotel_id = %s", hotel_id)
+        return get_hotel_queryset().filter(id=hotel_id)
+
+    if hotel_name:
+        if not re.fullmatch(VALID_NAME_PATTERN, hotel_name):
+            raise BadRequestException(key='INVALID_HOTEL_NAME')
+        logger.debug("Filter: hotel_name = %s", hotel_name)
+        return get_hotel_queryset().filter(name=hotel_name)
+
+    if area:
+        if not re.fullmatch(VALID_NAME_PATTERN, area):
+            raise BadRequestException(key="INVALID_AREA")
+        logger.debug("Filter: area = %s", area)
+        return get_hotel_queryset().filter(address__area=area)
+
+    logger.debug("No filters applied. Fetching all active hotels.")
+    return get_hotel_queryset()
+
+
+def serialize_hotels(hotels, menus):
+    with serializer_timer():
+        return HotelItemViewSerializer(hotels, many=True, context={'menus': menus}).data
+
+
+def get_hotel_item(request):
+    """
+    Returns hotel(s) filtered by ID, name, or area.
+    Paginated with `cursor` and `page_size` (see core.pagination).
+    Reads go to a read replica when one is configured (see core.db_router).
+
+    Returns:
+        tuple: Serialized hotels of the page, and the next page cursor.
+    """
     try:
-        if hotel_id:
-            hotel_id = int(hotel_id)
-            logger.debug("Filter: hotel_id = %s", hotel_id)
-            queryset = Hotel.objects.filter(id=hotel_id, status='Active')
-
-        elif hotel_name:
-            if not re.fullmatch(VALID_NAME_PATTERN, hotel_name):
-                raise BadRequestException(key='INVALID_HOTEL_NAME')
-            logger.debug("Filter: hotel_name = %s", hotel_name)
-            queryset = Hotel.objects.filter(name=hotel_name, status='Active')
-
-        elif area:
-            if not re.fullmatch(VALID_NAME_PATTERN, area):
-                raise BadRequestException(key="INVALID_AREA")
-            logger.debug("Filter: area = %s", area)
-            queryset = Hotel.objects.filter(address__area=area, status='Active')
-
-        else:
-            logger.debug("No filters applied. Fetching all active hotels.")
-            queryset = Hotel.objects.filter(status='Active')
-
-        logger.info("Hotels retrieved: %s", queryset.count())
-        return HotelItemViewSerializer(queryset, many=True).data
+        with replica_reads(request):
+            queryset = build_hotel_query(request)
+            hotels, next_cursor = paginator.paginate(queryset, request)
+            logger.info("Hotels retrieved: %s", len(hotels))
+            view_counter.record([hotel.id for hotel in hotels])
+            menus = get_hotel_menus([hotel.id for hotel in hotels])
+            return serialize_hotels(hotels, menus), next_cursor
 
     except (ValueError, FieldError) as e:
         logger.error("Filter error in get_hotel_item: %s", str(e))
         raise BadRequestException(key='INVALID_HOTEL_FIELD_OR_FORMAT')
 
 
+async def aget_hotel_item(request):
+    """
+    Async version of get_hotel_item, querying with the async ORM.
+    """
+    try:
+        async with replica_reads(request):
+            queryset = build_hotel_query(request)
+            hotels, next_cursor = await paginator.apaginate(queryset, request)
+            logger.info("Hotels retrieved: %s", len(hotels))
+            await view_counter.arecord([hotel.id for hotel in hotels])
+            menus = await aget_hotel_menus([hotel.id for hotel in hotels])
+            return serialize_hotels(hotels, menus), next_cursor
+
+    except (ValueError, FieldError) as e:
+        logger.error("Filter error in aget_hotel_item: %s", str(e))
+        raise BadRequestException(key='INVALID_HOTEL_FIELD_OR_FORMAT')
+
+
+def parse_limit(request, default, most):
+    """
+    Returns the `limit` query param capped at `most`, or `default` if absent.
+
+    Raises:
+        BadRequestException: If limit is not a positive integer.
+    """
+    limit = request.query_params.get('limit')
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise BadRequestException(key='INVALID_SEARCH_LIMIT')
+    if limit < 1:
+        raise BadRequestException(key='INVALID_SEARCH_LIMIT')
+    return min(limit, most)
+
+
+def search_hotels(request):
+    """
+    Searches active hotels by name or area, for autocomplete.
+
+    Query params:
+        - q: Text to match; each word matches words starting with it,
+          and close misspellings match too (see hotel.search)
+        - limit: Most results to return, capped at HOTEL_SEARCH_MAX_LIMIT
+
+    Raises:
+        BadRequestException: For a missing or malformed query or limit.
+
+    Returns:
+        list: Matching hotels (`id`, `name`, `area`), best match first.
+    """
+    query = request.query_params.get('q', '')
+    normalized = normalize_query(query)
+    if len(query) > MAX_QUERY_LENGTH or len(normalized.replace(' ', '')) < MIN_QUERY_LENGTH:
+        raise BadRequestException(key='INVALID_SEARCH_QUERY')
+
+    limit = parse_limit(request, DEFAULT_LIMIT, getattr(settings, 'HOTEL_SEARCH_MAX_LIMIT', MAX_LIMIT))
+
+    results = find_hotels(normalized, limit)
+    logger.debug("Hotel search %r matched %d hotel(s)", normalized, len(results))
+    return results
+
+
+def parse_nearby_location(request):
+    """
+    Returns the (latitude, longitude) to search around: the `latitude` and
+    `longitude` query params, else the centroid of the `pincode` one.
+
+    Raises:
+        BadRequestException: If neither is given or well formed, or the
+            pincode directory does not locate the pincode.
+    """
+    latitude = request.query_params.get('latitude')
+    longitude = request.query_params.get('longitude')
+    pincode = request.query_params.get('pincode')
+
+    if latitude is not None or longitude is not None:
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            raise BadRequestException(key='INVALID_NEARBY_LOCATION')
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise BadRequestException(key='INVALID_NEARBY_LOCATION')
+        return latitude, longitude
+
+    if not pincode or not re.fullmatch(r'\d{6}', pincode):
+        raise BadRequestException(key='INVALID_NEARBY_LOCATION')
+    location = nearby.locate_pincode(int(pincode))
+    if location is None:
+        raise BadRequestException(key='PINCODE_LOCATION_UNKNOWN')
+    return location
+
+
+def nearby_hotels(request):
+    """
+    Returns the active hotels nearest to a location, within a radius.
+
+    Query params:
+        - pincode: Search around this pincode's centroid, or
+        - latitude, longitude: Search around this point (in degrees)
+        - radius_km: Search radius, capped at HOTEL_NEARBY_MAX_RADIUS_KM
+        - limit: Most results to return, capped at HOTEL_NEARBY_MAX_LIMIT
+
+    Hotels are placed at their pincode's centroid (see hotel.nearby).
+
+    Raises:
+        BadRequestException: For a missing or malformed location, radius or limit.
+
+    Returns:
+        list: Hotels (`id`, `name`, `area`, `pincode`, `distance_km`), nearest first.
+    """
+    latitude, longitude = parse_nearby_location(request)
+
+    radius = request.query_params.get('radius_km')
+    max_radius = getattr(settings, 'HOTEL_NEARBY_MAX_RADIUS_KM', nearby.MAX_RADIUS_KM)
+    if radius is None:
+        radius = getattr(settings, 'HOTEL_NEARBY_DEFAULT_RADIUS_KM', nearby.DEFAULT_RADIUS_KM)
+    else:
+        try:
+            radius = float(radius)
+        except ValueError:
+            raise BadRequestException(key='INVALID_NEARBY_RADIUS')
+        if not radius > 0:
+            raise BadRequestException(key='INVALID_NEARBY_RADIUS')
+    radius = min(radius, max_radius)
+    limit = parse_limit(request, nearby.DEFAULT_LIMIT, getattr(settings, 'HOTEL_NEARBY_MAX_LIMIT', nearby.MAX_LIMIT))
+
+    nearest = nearby.nearby_index.nearest(latitude, longitude, radius, limit)
+    if not nearest:
+        return []
+    hotels = Hotel.active.filter(id__in=[hotel_id for hotel_id, _ in nearest]).select_related('address').in_bulk()
+    results = [
+        {
+            'id': hotel_id,
+            'name': hotels[hotel_id].name,
+            'area': hotels[hotel_id].address.area,
+            'pincode': hotels[hotel_id].address.pincode,
+            'distance_km': round(distance, 2),
+        }
+        for hotel_id, distance in nearest
+        # Hotels deactivated by another process stay in the index until it is rebuilt.
+        if hotel_id in hotels
+    ]
+    logger.debug("Nearby search within %s km of %s, %s found %d hotel(s)", radius, latitude, longitude, len(results))
+    return results
+
+
 def insert_hotel_items(request):
     """
     Creates a new hotel item.
@@ -96,7 +294,7 @@ def update_hotel_item(request):
     if address_id:
         try:
             address_id = int(address_id)
-            if not Address.objects.filter(id=address_id, status='Active').exists():
+            if not Address.active.filter(id=address_id).exists():
                 raise BadRequestException("Inactive or missing address.")
             update_data['address_id'] = address_id
         except (ValueError, FieldError) as e:
@@ -108,7 +306,12 @@ def update_hotel_item(request):
         if not queryset.exists():
             raise BadRequestException(key='NO_HOTEL_FOUND')
         queryset.update(**update_data)
-        hotel = queryset.first() 
+        menu_cache.invalidate(int(hotel_id))
+        hotel = queryset.select_related('address').first()
+        # queryset.update() sends no post_save, so the hotel indexes are updated here.
+        active = hotel.status == Hotel.ACTIVE
+        search_index.index_hotel(hotel.id, hotel.name, hotel.address_id, hotel.address.area, active)
+        nearby.nearby_index.index_hotel(hotel.id, hotel.address_id, hotel.address.pincode, active)
         logger.info("Hotel updated: %s", hotel_id)
         return HotelUpdateSerializer(hotel).data
     except IntegrityError as e:
@@ -129,7 +332,7 @@ def remove_hotel(request):
     try:
         hotel_id = int(hotel_id)
         hotel = Hotel.objects.get(id=hotel_id)
-        hotel.status = "inactive"
+        hotel.status = Hotel.INACTIVE
         hotel.save()
         logger.info("Hotel deactivated: %s", hotel_id)
         return {"message": f"Hotel {hotel_id} deactivated."}
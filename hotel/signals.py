@@ -1,12 +1,71 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from hotel.deactivation import cascade_deactivation
 from hotel.models import Hotel
-from food.models import Food
+from hotel.nearby import nearby_index
+from hotel.search import search_index
+from address.models import Address
+from food.menu_cache import menu_cache
 
 @receiver(post_save, sender=Hotel)
-def deactivate_foods_if_hotel_inactive(sender, instance, **kwargs):
+def deactivate_foods_if_hotel_inactive(sender, instance, update_fields=None, **kwargs):
     """
-    Signal to deactivate all foods under a hotel if hotel is inactive.
+    Signal to cascade a hotel's deactivation to its foods and the carts
+    holding them (see hotel.deactivation). Only the active to inactive
+    transition cascades, not every save of an inactive hotel.
+    The cascade sends no Food signals, so the hotel's cached menus are
+    invalidated here; they also embed the hotel name.
     """
-    if instance.status == 'inactive':
-        Food.objects.filter(hotel=instance).update(status='inactive')
\ No newline at end of file
+    if instance.was_deactivated(update_fields):
+        cascade_deactivation(instance.id)
+    menu_cache.invalidate(instance.id)
+
+
+@receiver(post_save, sender=Hotel)
+def update_search_index(sender, instance, **kwargs):
+    """
+    Keeps the in-process hotel search index (hotel.search) current.
+    The area is taken from the loaded address or the index, and only
+    queried for hotels whose address is new to the index.
+    """
+    if not search_index.is_loaded:
+        return
+    if Hotel.address.is_cached(instance):
+        area = instance.address.area
+    else:
+        area = search_index.indexed_area(instance.id, instance.address_id)
+        if area is None:
+            area = Address.objects.filter(id=instance.address_id).values_list('area', flat=True).first()
+    search_index.index_hotel(instance.id, instance.name, instance.address_id, area, instance.status == Hotel.ACTIVE)
+
+
+@receiver(post_save, sender=Hotel)
+def update_nearby_index(sender, instance, **kwargs):
+    """
+    Keeps the in-process nearby-hotel index (hotel.nearby) current, taking
+    the pincode from the loaded address or the index like update_search_index.
+    """
+    if not nearby_index.is_loaded:
+        return
+    if instance.status != Hotel.ACTIVE:
+        nearby_index.remove_hotel(instance.id)
+        return
+    if Hotel.address.is_cached(instance):
+        pincode = instance.address.pincode
+    else:
+        pincode = nearby_index.indexed_pincode(instance.id, instance.address_id)
+        if pincode is None:
+            pincode = Address.objects.filter(id=instance.address_id).values_list('pincode', flat=True).first()
+    nearby_index.index_hotel(instance.id, instance.address_id, pincode)
+
+
+@receiver(post_delete, sender=Hotel)
+def remove_from_hotel_indexes(sender, instance, **kwargs):
+    search_index.remove_hotel(instance.id)
+    nearby_index.remove_hotel(instance.id)
+
+
+@receiver(post_save, sender=Address)
+def update_hotel_indexes_address(sender, instance, **kwargs):
+    search_index.set_area(instance.id, instance.area)
+    nearby_index.set_pincode(instance.id, instance.pincode)
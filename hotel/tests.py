@@ -1,3 +1,491 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .jobs import add_view_counts
+from .models import Hotel
+from .nearby import GeoGrid, nearby_index
+from .search import SearchIndex, search_index
+from .view_counts import ViewCountBuffer
+from address.models import Address
+from core.jobs import run_pending_jobs
+from core.models import Job
+from address.pincode_directory import reset_pincode_directory, write_index
+from authenticate.models import CustomUser
+from food.models import Category, Food
+from orders.models import CartDetails, CartItem
+
+
+@override_settings(HOTEL_VIEW_COUNT_FLUSH_INTERVAL=3600, HOTEL_VIEW_COUNT_BUFFER_SIZE=100000)
+@patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'})
+class HotelItemViewQueryCountTest(TestCase):
+    """
+    The hotel listing must cost the same number of queries
+    however many hotels and foods it returns.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.viewer = CustomUser.objects.create_user(email='viewer@example.com', password='secret', name='Viewer')
+        self.client.force_authenticate(user=self.viewer)
+        self.category = Category.objects.create(name='Meals')
+        self.hotel_count = 0
+
+    def create_hotels(self, count, foods_per_hotel=3):
+        for _ in range(count):
+            self.hotel_count += 1
+            index = self.hotel_count
+            address = Address.objects.create(area='Adyar', street=f'Street {index}', pincode=600020)
+            manager = CustomUser.objects.create_user(
+                email=f'manager{index}@example.com', password='secret', name='Manager', role='manager'
+            )
+            hotel = Hotel.objects.create(name=f'Hotel {index}', user=manager, address=address)
+            for food_index in range(foods_per_hotel):
+                Food.objects.create(name=f'Food {food_index}', price='10.50', category=self.category, hotel=hotel)
+
+    def count_listing_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/hotels/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['hotel_item']), self.hotel_count)
+        return len(context.captured_queries)
+
+    def test_query_count_is_constant(self, mock_postal):
+        self.create_hotels(2)
+        small = self.count_listing_queries()
+        self.create_hotels(20)
+        large = self.count_listing_queries()
+        self.assertEqual(small, large)
+
+    def test_listing_returns_active_foods_only(self, mock_postal):
+        self.create_hotels(1)
+        Food.objects.filter(name='Food 0').update(status='inactive')
+        response = self.client.get('/hotels/')
+        food_names = [food['name'] for food in response.data['hotel_item'][0]['food_items']]
+        self.assertEqual(food_names, ['Food 1', 'Food 2'])
+
+
+class ViewCountBufferTest(TestCase):
+    """
+    View increments are buffered and written by each flush as
+    batched F() updates, without going through the job queue.
+    """
+
+    def setUp(self):
+        with patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'}):
+            address = Address.objects.create(area='Adyar', street='Main Street', pincode=600020)
+        manager = CustomUser.objects.create_user(email='manager@example.com', password='secret', name='Manager')
+        self.hotel = Hotel.objects.create(name='Hotel', user=manager, address=address)
+
+    def new_buffer(self):
+        buffer = ViewCountBuffer()
+        self.addCleanup(buffer.stop)
+        return buffer
+
+    @override_settings(HOTEL_VIEW_COUNT_FLUSH_INTERVAL=3600, HOTEL_VIEW_COUNT_BUFFER_SIZE=1000)
+    def test_increments_are_buffered_until_flush(self):
+        buffer = self.new_buffer()
+        updated_at = self.hotel.updated_at
+
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                buffer.record([self.hotel.id])
+        self.assertEqual(buffer.pending(), {self.hotel.id: 5})
+
+        # One UPDATE, in its savepoint.
+        with self.assertNumQueries(3):
+            buffer.flush()
+        self.assertEqual(run_pending_jobs(), 0)
+        self.hotel.refresh_from_db()
+        self.assertEqual(self.hotel.view_count, 5)
+        self.assertEqual(self.hotel.updated_at, updated_at)
+        self.assertEqual(buffer.pending(), {})
+
+    @override_settings(HOTEL_VIEW_COUNT_FLUSH_INTERVAL=3600, HOTEL_VIEW_COUNT_BUFFER_SIZE=1000)
+    def test_failed_flush_keeps_counts(self):
+        buffer = self.new_buffer()
+        buffer.record([self.hotel.id, self.hotel.id])
+        with patch.object(QuerySet, 'update', side_effect=DatabaseError('connection lost')):
+            buffer.flush()
+        self.assertEqual(buffer.pending(), {self.hotel.id: 2})
+
+        buffer.flush()
+        self.assertEqual(Hotel.objects.get(id=self.hotel.id).view_count, 2)
+
+    def test_failed_view_count_job_writes_nothing(self):
+        with patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'}):
+            address = Address.objects.create(area='Adyar', street='Side Street', pincode=600020)
+        manager = CustomUser.objects.create_user(email='other@example.com', password='secret', name='Manager')
+        other = Hotel.objects.create(name='Other', user=manager, address=address)
+        update = QuerySet.update
+        calls = []
+
+        def fail_second_update(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise DatabaseError('connection lost')
+            return update(queryset, **kwargs)
+
+        with patch.object(QuerySet, 'update', fail_second_update), self.assertRaises(DatabaseError):
+            add_view_counts({str(self.hotel.id): 2, str(other.id): 5})
+        self.assertEqual(list(Hotel.objects.order_by('id').values_list('view_count', flat=True)), [0, 0])
+
+        add_view_counts({str(self.hotel.id): 2, str(other.id): 5})
+        self.assertEqual(list(Hotel.objects.order_by('id').values_list('view_count', flat=True)), [2, 5])
+
+    @override_settings(HOTEL_VIEW_COUNT_FLUSH_INTERVAL=3600, HOTEL_VIEW_COUNT_BUFFER_SIZE=3)
+    def test_full_buffer_wakes_the_flusher(self):
+        buffer = self.new_buffer()
+        flushed = threading.Event()
+        # The flusher thread has its own connection, which cannot see this test's rows.
+        with patch.object(buffer, 'flush', side_effect=flushed.set):
+            with self.assertNumQueries(0):
+                buffer.record([self.hotel.id, self.hotel.id])
+                self.assertFalse(flushed.wait(0.1))
+                buffer.record([self.hotel.id])
+                self.assertTrue(flushed.wait(5))
+            buffer.stop()
+
+    @override_settings(HOTEL_VIEW_COUNT_FLUSH_INTERVAL=0.05, HOTEL_VIEW_COUNT_BUFFER_SIZE=1000)
+    def test_flusher_runs_every_interval(self):
+        buffer = self.new_buffer()
+        flushed = threading.Event()
+        with patch.object(buffer, 'flush', side_effect=flushed.set):
+            with self.assertNumQueries(0):
+                buffer.record([self.hotel.id])
+            self.assertTrue(flushed.wait(5))
+            buffer.stop()
+
+    @override_settings(HOTEL_VIEW_COUNT_FLUSH_INTERVAL=0)
+    def test_zero_interval_flushes_on_record(self):
+        buffer = self.new_buffer()
+        buffer.record([self.hotel.id])
+        self.assertEqual(Hotel.objects.get(id=self.hotel.id).view_count, 1)
+
+
+class SearchIndexTest(TestCase):
+    """
+    The in-process search index matches prefixes and misspellings.
+    """
+
+    def setUp(self):
+        self.index = SearchIndex()
+        for hotel_id, name, area in (
+            (1, 'Saravana Bhavan', 'Adyar'),
+            (2, 'Murugan Idli Shop', 'Saravanampatti'),
+            (3, 'Adyar Ananda Bhavan', 'Velachery'),
+            (4, 'Junior Kuppanna', 'Koramangala'),
+        ):
+            self.index.add(hotel_id, name, hotel_id + 100, area)
+
+    def ids(self, query, limit=10):
+        return [hotel['id'] for hotel in self.index.search(query, limit)]
+
+    def test_name_prefix_ranks_before_area_prefix(self):
+        self.assertEqual(self.ids('sarav'), [1, 2])
+        self.assertEqual(self.ids('ADYAR'), [3, 1])
+
+    def test_every_word_must_match(self):
+        self.assertCountEqual(self.ids('bha adya'), [1, 3])
+        self.assertEqual(self.ids('junior kor'), [4])
+
+    def test_misspelling_matches(self):
+        self.assertEqual(self.ids('kupana'), [4])
+        self.assertEqual(self.ids('muragan'), [2])
+        self.assertEqual(self.ids('xyzzy'), [])
+
+    def test_limit(self):
+        self.assertEqual(self.ids('bhavan', limit=1), [1])
+
+    def test_remove_and_area_change(self):
+        self.index.remove(1)
+        self.assertEqual(self.ids('sarav'), [2])
+        self.index.set_area(103, 'Mylapore')
+        self.assertEqual(self.ids('mylap'), [3])
+        self.assertEqual(self.ids('velach'), [])
+
+        for hotel_id in (2, 3, 4):
+            self.index.remove(hotel_id)
+        self.assertEqual((self.index.word_trigrams, self.index.name_words.words, self.index.area_words.words), ({}, [], []))
+
+
+@override_settings(HOTEL_SEARCH_BACKEND='memory')
+@patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'})
+class HotelSearchViewTest(TestCase):
+    """
+    The search endpoint follows hotel changes through signals.
+    """
+
+    def setUp(self):
+        search_index.reset()
+        self.addCleanup(search_index.reset)
+        self.client = APIClient()
+        self.admin = CustomUser.objects.create_user(
+            email='admin@example.com', password='secret', name='Admin', role='admin'
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.hotel_count = 0
+
+    def create_hotel(self, name, area):
+        self.hotel_count += 1
+        address = Address.objects.create(area=area, street=f'Street {self.hotel_count}', pincode=600020)
+        manager = CustomUser.objects.create_user(
+            email=f'manager{self.hotel_count}@example.com', password='secret', name='Manager', role='manager'
+        )
+        return Hotel.objects.create(name=name, user=manager, address=address)
+
+    def search(self, query):
+        response = self.client.get('/hotels/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [hotel['name'] for hotel in response.data['hotels']]
+
+    def test_search_follows_changes(self, mock_postal):
+        hotel = self.create_hotel('Saravana Bhavan', 'Adyar')
+        self.assertEqual(self.search('sarav'), ['Saravana Bhavan'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('saravna'), ['Saravana Bhavan'])
+
+        other = self.create_hotel('Anjappar', 'Velachery')
+        self.assertEqual(self.search('anjap'), ['Anjappar'])
+
+        self.client.patch('/hotels/', {'id': hotel.id, 'name': 'Murugan Idli'}, format='json')
+        self.assertEqual(self.search('murug'), ['Murugan Idli'])
+        self.assertEqual(self.search('sarav'), [])
+
+        address = other.address
+        address.area = 'Mylapore'
+        address.save()
+        self.assertEqual(self.search('mylap'), ['Anjappar'])
+
+        self.client.delete(f'/hotels/?hotel_id={other.id}')
+        self.assertEqual(self.search('anjap'), [])
+
+    def test_search_follows_address_endpoint(self, mock_postal):
+        hotel = self.create_hotel('Saravana Bhavan', 'Adyar')
+        self.assertEqual(self.search('adyar'), ['Saravana Bhavan'])
+
+        response = self.client.patch('/address/', {'address_id': hotel.address_id, 'area': 'Mylapore'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search('mylap'), ['Saravana Bhavan'])
+        self.assertEqual(self.search('adyar'), [])
+
+    def test_invalid_parameters(self, mock_postal):
+        for params, code in (
+            ({}, 'ERROR_035'), ({'q': 'a'}, 'ERROR_035'), ({'q': 'x' * 101}, 'ERROR_035'),
+            ({'q': 'ab', 'limit': 'ten'}, 'ERROR_036'), ({'q': 'ab', 'limit': 0}, 'ERROR_036'),
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/hotels/search/', params)
+                self.assertEqual((response.status_code, response.data['code']), (400, code))
+
+
+class GeoGridTest(TestCase):
+    """
+    The grid returns the nearest located hotels within the radius.
+    """
+
+    POINTS = {
+        600020: (13.0067, 80.2573),  # Adyar
+        600042: (12.9815, 80.2180),  # Velachery, about 5 km away
+        600001: (13.0878, 80.2785),  # Chennai GPO, about 9 km away
+        560001: (12.9762, 77.6033),  # Bangalore, about 290 km away
+    }
+
+    def setUp(self):
+        self.grid = GeoGrid(self.POINTS.get)
+        for hotel_id, pincode in ((1, 600020), (2, 600042), (3, 600001), (4, 560001), (5, 600020), (6, 999999)):
+            self.grid.add(hotel_id, hotel_id + 100, pincode)
+
+    def ids(self, radius_km, limit=10):
+        return [hotel_id for hotel_id, distance in self.grid.nearest(13.0067, 80.2573, radius_km, limit)]
+
+    def test_nearest_within_radius(self):
+        self.assertEqual(self.ids(7), [1, 5, 2])
+        self.assertEqual(self.ids(20), [1, 5, 2, 3])
+        self.assertEqual(self.ids(20, limit=3), [1, 5, 2])
+        self.assertEqual(self.ids(1000), [1, 5, 2, 3, 4])
+        distance = dict(self.grid.nearest(13.0067, 80.2573, 20, 10))[2]
+        self.assertAlmostEqual(distance, 5.1, delta=0.2)
+
+    def test_remove_and_pincode_change(self):
+        self.grid.remove(1)
+        self.grid.set_pincode(102, 560001)
+        self.assertEqual(self.ids(20), [5, 3])
+
+        self.grid.set_pincode(106, 600042)
+        self.assertEqual(self.ids(7), [5, 6])
+
+        for hotel_id in (2, 3, 4, 5, 6):
+            self.grid.remove(hotel_id)
+        self.assertEqual((self.grid.hotels, self.grid.by_pincode, self.grid.cells), ({}, {}, {}))
+
+
+@patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'})
+class HotelNearbyViewTest(TestCase):
+    """
+    The nearby endpoint locates pincodes offline and follows hotel changes.
+    """
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        index_path = os.path.join(temp_dir.name, 'pincodes.idx')
+        locations = {pincode: ('Chennai', 'Tamil Nadu') for pincode in GeoGridTest.POINTS}
+        write_index(locations, index_path, GeoGridTest.POINTS)
+        settings_override = override_settings(PINCODE_DIRECTORY_PATH=index_path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        reset_pincode_directory()
+        self.addCleanup(reset_pincode_directory)
+        nearby_index.reset()
+        self.addCleanup(nearby_index.reset)
+
+        self.client = APIClient()
+        self.admin = CustomUser.objects.create_user(
+            email='admin@example.com', password='secret', name='Admin', role='admin'
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.hotel_count = 0
+
+    def create_hotel(self, name, pincode):
+        self.hotel_count += 1
+        address = Address.objects.create(area='Adyar', street=f'Street {self.hotel_count}', pincode=pincode)
+        manager = CustomUser.objects.create_user(
+            email=f'manager{self.hotel_count}@example.com', password='secret', name='Manager', role='manager'
+        )
+        return Hotel.objects.create(name=name, user=manager, address=address)
+
+    def nearby(self, **params):
+        response = self.client.get('/hotels/nearby/', {'pincode': 600020, 'radius_km': 20, **params})
+        self.assertEqual(response.status_code, 200)
+        return [hotel['name'] for hotel in response.data['hotels']]
+
+    def test_nearby_follows_changes(self, mock_postal):
+        self.create_hotel('Adyar Ananda Bhavan', 600020)
+        velachery = self.create_hotel('Anjappar', 600042)
+        self.create_hotel('Bangalore Hotel', 560001)
+        self.assertEqual(self.nearby(), ['Adyar Ananda Bhavan', 'Anjappar'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/hotels/nearby/', {'latitude': 12.9815, 'longitude': 80.2180, 'limit': 1})
+        self.assertEqual(response.data['hotels'], [
+            {'id': velachery.id, 'name': 'Anjappar', 'area': 'Adyar', 'pincode': 600042, 'distance_km': 0.0},
+        ])
+
+        gpo = self.create_hotel('Buhari', 600001)
+        self.assertEqual(self.nearby(), ['Adyar Ananda Bhavan', 'Anjappar', 'Buhari'])
+
+        address = gpo.address
+        address.pincode = 560001
+        address.save()
+        self.client.delete(f'/hotels/?hotel_id={velachery.id}')
+        self.assertEqual(self.nearby(), ['Adyar Ananda Bhavan'])
+        self.assertEqual(self.nearby(pincode=560001), ['Bangalore Hotel', 'Buhari'])
+
+    def test_invalid_parameters(self, mock_postal):
+        for params, code in (
+            ({}, 'ERROR_037'), ({'pincode': '6000'}, 'ERROR_037'), ({'latitude': 13.0}, 'ERROR_037'),
+            ({'latitude': 'north', 'longitude': 80.2}, 'ERROR_037'), ({'latitude': 95, 'longitude': 80.2}, 'ERROR_037'),
+            ({'pincode': 110001}, 'ERROR_038'),
+            ({'pincode': 600020, 'radius_km': 0}, 'ERROR_039'), ({'pincode': 600020, 'radius_km': 'far'}, 'ERROR_039'),
+            ({'pincode': 600020, 'limit': 0}, 'ERROR_036'),
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/hotels/nearby/', params)
+                self.assertEqual((response.status_code, response.data['code']), (400, code))
+
+
+@patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'})
+class HotelDeactivationTest(TestCase):
+    """
+    Deactivating a hotel deactivates its foods and removes them from carts, once.
+    """
+
+    def setUp(self):
+        patcher = patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.category = Category.objects.create(name='Meals')
+        self.hotel = self.create_hotel(1, foods=5)
+        self.other_hotel = self.create_hotel(2, foods=1)
+        self.carts = []
+        for index in range(2):
+            user = CustomUser.objects.create_user(email=f'customer{index}@example.com', password='secret', name='Customer')
+            cart = CartDetails.objects.create(user=user, total_price=0)
+            for food in Food.objects.order_by('id')[index * 2:index * 2 + 4]:
+                CartItem.objects.create(cart=cart, food=food, quantity=2)
+            self.carts.append(cart)
+
+    def create_hotel(self, index, foods):
+        address = Address.objects.create(area='Adyar', street=f'Street {index}', pincode=600020)
+        manager = CustomUser.objects.create_user(
+            email=f'manager{index}@example.com', password='secret', name='Manager', role='manager'
+        )
+        hotel = Hotel.objects.create(name=f'Hotel {index}', user=manager, address=address)
+        Food.objects.bulk_create([
+            Food(name=f'Food {index} {number}', price='10.00', category=self.category, hotel=hotel)
+            for number in range(foods)
+        ])
+        return hotel
+
+    def deactivate(self):
+        hotel = Hotel.objects.get(id=self.hotel.id)
+        hotel.status = Hotel.INACTIVE
+        hotel.save()
+        return hotel
+
+    def assert_cascaded(self):
+        self.assertFalse(Food.active.filter(hotel=self.hotel).exists())
+        self.assertTrue(Food.active.filter(hotel=self.other_hotel).exists())
+        self.assertFalse(CartItem.objects.filter(food__hotel=self.hotel).exists())
+        # The second cart kept its line for the other hotel's food.
+        totals = [CartDetails.objects.get(id=cart.id).total_price for cart in self.carts]
+        self.assertEqual(totals, [Decimal('0.00'), Decimal('20.00')])
+
+    @override_settings(HOTEL_CASCADE_BATCH_SIZE=2)
+    def test_deactivation_cascades_in_batches(self, mock_postal):
+        hotel = self.deactivate()
+        self.assert_cascaded()
+
+        # Later saves of the inactive hotel do not cascade again.
+        Food.objects.filter(hotel=self.hotel).update(status=Food.ACTIVE)
+        hotel.name = 'Renamed Hotel'
+        with self.assertNumQueries(1):
+            hotel.save()
+        self.assertEqual(Food.active.filter(hotel=self.hotel).count(), 5)
+
+    @override_settings(HOTEL_CASCADE_BATCH_SIZE=2, HOTEL_CASCADE_INLINE_LIMIT=3)
+    def test_large_menus_are_deferred_to_a_job(self, mock_postal):
+        self.deactivate()
+        self.assertEqual(Food.active.filter(hotel=self.hotel).count(), 5)
+        self.assertEqual(Job.objects.filter(task='hotel.jobs.finish_hotel_deactivation').count(), 1)
+
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assert_cascaded()
+
+    @override_settings(HOTEL_CASCADE_BATCH_SIZE=2, HOTEL_CASCADE_INLINE_LIMIT=3)
+    def test_command_finishes_lost_cascades(self, mock_postal):
+        self.deactivate()
+        Job.objects.all().delete()
+
+        out = StringIO()
+        call_command('cascade_hotel_deactivations', stdout=out)
+        self.assertIn('Deactivated 5 food(s) of 1 hotel(s), removed 7 cart line(s).', out.getvalue())
+        self.assert_cascaded()
+
+        out = StringIO()
+        call_command('cascade_hotel_deactivations', stdout=out)
+        self.assertIn('Deactivated 0 food(s) of 0 hotel(s)', out.getvalue())
@@ -1,7 +1,10 @@
 from django.urls import path
 
-from .views import HotelItemView
+from .views import HotelItemAsyncView, HotelItemView, HotelNearbyView, HotelSearchView
 
 urlpatterns = [
-    path('hotels/', HotelItemView.as_view(), name='hotel-filter')
+    path('hotels/', HotelItemView.as_view(), name='hotel-filter'),
+    path('hotels/search/', HotelSearchView.as_view(), name='hotel-search'),
+    path('hotels/nearby/', HotelNearbyView.as_view(), name='hotel-nearby'),
+    path('async/hotels/', HotelItemAsyncView.as_view(), name='hotel-filter-async'),
 ]
\ No newline at end of file
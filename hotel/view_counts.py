@@ -0,0 +1,147 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 10
+DEFAULT_BUFFER_SIZE = 1000
+
+
+class ViewCountBuffer:
+    """
+    Collects hotel view increments in memory and writes them in batches
+    (hotel.jobs.add_view_counts), so requests never wait on updates of
+    popular hotel rows.
+
+    Settings:
+        - HOTEL_VIEW_COUNT_FLUSH_INTERVAL: Seconds between flushes (0 writes on every record).
+        - HOTEL_VIEW_COUNT_BUFFER_SIZE: Pending increments that force an early flush.
+
+    Pending counts are flushed by a background thread, started by the
+    first record, every interval or as soon as the buffer is full, and
+    once more when the process exits. Requests only add to the buffer,
+    so their query counts do not depend on when the last flush ran.
+    The thread writes the counts itself, so no job worker is needed.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._flusher = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'HOTEL_VIEW_COUNT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    @property
+    def buffer_size(self):
+        return getattr(settings, 'HOTEL_VIEW_COUNT_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+
+    def _add(self, hotel_ids):
+        """
+        Adds the views and returns whether the buffer is full.
+        """
+        with self._lock:
+            self._counts.update(hotel_ids)
+            self._pending += len(hotel_ids)
+            return self._pending >= self.buffer_size
+
+    def record(self, hotel_ids):
+        """
+        Adds one view to each given hotel.
+        """
+        full = self._add(hotel_ids)
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        self._start_flusher()
+        if full:
+            self._wake.set()
+
+    async def arecord(self, hotel_ids):
+        """
+        Async version of record; only a zero interval flushes, in a worker thread.
+        """
+        full = self._add(hotel_ids)
+        if self.flush_interval <= 0:
+            await sync_to_async(self.flush)()
+            return
+        self._start_flusher()
+        if full:
+            self._wake.set()
+
+    def _start_flusher(self):
+        # Also restarts the thread in a forked worker process, where it is gone.
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._stopped or (self._flusher is not None and self._flusher.is_alive()):
+                return
+            self._flusher = threading.Thread(target=self._run, name='view-count-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("View count flush failed")
+            finally:
+                # The thread's own connections, which no request cycle closes.
+                connections.close_all()
+
+    def stop(self):
+        """
+        Ends the flusher thread, which flushes once more on its way out.
+        """
+        self._stopped = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+
+    def pending(self):
+        """
+        Returns a copy of the counts not yet written.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def flush(self):
+        """
+        Writes the pending counts in one transaction.
+
+        On a database error nothing is written and the counts are put
+        back so they are retried by the next flush.
+        """
+        with self._lock:
+            counts = self._counts
+            self._counts = Counter()
+            self._pending = 0
+
+        if not counts:
+            return
+
+        from .jobs import add_view_counts
+        try:
+            add_view_counts(dict(counts))
+            logger.debug("Wrote view counts of %d hotel(s)", len(counts))
+        except DatabaseError as e:
+            logger.error("View count flush failed, keeping counts: %s", str(e))
+            with self._lock:
+                self._counts.update(counts)
+                self._pending += sum(counts.values())
+
+
+view_counter = ViewCountBuffer()
+atexit.register(view_counter.flush)
@@ -3,10 +3,21 @@ from rest_framework.views import APIView
 from rest_framework import status
 
 from authenticate.permissions import IsManagerOrAdmin, IsAccessToAll
-from .service import get_hotel_item, insert_hotel_items, update_hotel_item, remove_hotel
+from .service import (
+    aget_hotel_item,
+    get_hotel_item,
+    insert_hotel_items,
+    nearby_hotels,
+    remove_hotel,
+    search_hotels,
+    update_hotel_item,
+)
 from utils.exceptions import AuthorizationException
+from core.async_views import AsyncAPIView
+from core.query_budget import query_budget
 
 
+@query_budget(get=2, post=4, patch=3, delete=7)
 class HotelItemView(APIView):
     """
     Handles operations related to Hotel items.
@@ -36,14 +47,18 @@ class HotelItemView(APIView):
             - hotel_name
             - area
 
+        Pagination:
+            - cursor
+            - page_size
+
         Returns:
-            Filtered hotel list in response.
+            Filtered hotel page and `next_cursor` in response.
         """
         if not request.user or not request.user.is_authenticated:
             raise AuthorizationException()
 
-        data = get_hotel_item(request)
-        return Response({'hotel_item': data}, status=status.HTTP_200_OK)
+        data, next_cursor = get_hotel_item(request)
+        return Response({'hotel_item': data, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
 
     def post(self, request):
         """
@@ -91,3 +106,82 @@ class HotelItemView(APIView):
         """
         remove_hotel(request)
         return Response({"message": "Hotel deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
+
+
+@query_budget(get=2)
+class HotelSearchView(APIView):
+    """
+    Prefix and typo-tolerant search over hotel names and areas, for autocomplete.
+
+    Permissions:
+        - GET: All authenticated users
+    """
+
+    permission_classes = [IsAccessToAll]
+
+    def get(self, request):
+        """
+        Handle GET request to search hotels.
+
+        Query params:
+            - q: Search text (2 to 100 characters)
+            - limit: Most results to return
+
+        Returns:
+            Matching hotels, best match first.
+        """
+        if not request.user or not request.user.is_authenticated:
+            raise AuthorizationException()
+
+        results = search_hotels(request)
+        return Response({'hotels': results}, status=status.HTTP_200_OK)
+
+
+@query_budget(get=2)
+class HotelNearbyView(APIView):
+    """
+    Active hotels nearest to a pincode or a point, within a radius.
+
+    Permissions:
+        - GET: All authenticated users
+    """
+
+    permission_classes = [IsAccessToAll]
+
+    def get(self, request):
+        """
+        Handle GET request for nearby hotels.
+
+        Query params:
+            - pincode, or latitude and longitude: Where to search around
+            - radius_km: Search radius in kilometres
+            - limit: Most results to return
+
+        Returns:
+            Hotels with their distance, nearest first.
+        """
+        if not request.user or not request.user.is_authenticated:
+            raise AuthorizationException()
+
+        results = nearby_hotels(request)
+        return Response({'hotels': results}, status=status.HTTP_200_OK)
+
+
+@query_budget(get=2)
+class HotelItemAsyncView(AsyncAPIView):
+    """
+    GET of HotelItemView served on the event loop (see core.async_views).
+
+    Permissions:
+        - GET: All authenticated users
+    """
+
+    async def get(self, request):
+        """
+        Returns the filtered hotel page; same filters and pagination as HotelItemView.
+        """
+        if not request.user or not request.user.is_authenticated:
+            raise AuthorizationException()
+
+        data, next_cursor = await aget_hotel_item(request)
+        return Response({'hotel_item': data, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
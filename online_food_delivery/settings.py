@@ -42,6 +42,8 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
+    'core',
     'authenticate',
     'orders',
     'address',
@@ -57,7 +59,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'core.middleware.TraceIDMiddleware'
+    'core.middleware.TraceIDMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'online_food_delivery.urls'
@@ -94,6 +97,17 @@ DATABASES = {
     }
 }
 
+# Read replicas (core.db_router): DB_REPLICA_HOSTS=host1,host2 adds the aliases
+# replica_1, replica_2, ... with the primary's other settings
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))  # Reads of a user stay on the primary this long after they write
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))  # Replicas further behind are skipped
+REPLICA_CHECK_INTERVAL = float(os.getenv('REPLICA_CHECK_INTERVAL', 5))  # Seconds between health checks of a replica
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -115,15 +129,19 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authenticate.authentication.ClaimsJWTAuthentication',
     ),
     'EXCEPTION_HANDLER': 'core.exception_handler.handle_exceptions',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authenticate.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -131,6 +149,87 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+# The menu cache and token claims need a cache shared by all processes (core.cache);
+# with the per-process default they fall back to the database, unless this is set
+CACHE_ASSUME_SHARED = os.getenv('CACHE_ASSUME_SHARED', 'False') == 'True'  # Only for single-process deployments
+
+# Serialized hotel menus (food.menu_cache)
+MENU_CACHE_TIMEOUT = int(os.getenv('MENU_CACHE_TIMEOUT', 300))  # Seconds
+MENU_CACHE_LOCK_TIMEOUT = int(os.getenv('MENU_CACHE_LOCK_TIMEOUT', 5))  # Seconds to wait on another rebuild
+
+# Keyset pagination for list endpoints (core.pagination)
+PAGINATION_DEFAULT_PAGE_SIZE = int(os.getenv('PAGINATION_DEFAULT_PAGE_SIZE', 50))
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv('PAGINATION_MAX_PAGE_SIZE', 200))
+
+# Logging (core.logger_config): records go through a queue to a background listener
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_LEVELS = {
+    # Per-logger overrides, e.g. 'hotel': 'INFO'
+}
+LOG_CONSOLE = os.getenv('LOG_CONSOLE', 'True') == 'True'
+LOG_CONSOLE_LEVEL = os.getenv('LOG_CONSOLE_LEVEL', 'DEBUG')
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))  # Share of DEBUG records kept
+LOG_ROTATION = os.getenv('LOG_ROTATION', 'size')  # 'size' or 'time'
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))  # Size rotation threshold
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN', 'midnight')  # Time rotation interval
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))  # DEBUG/INFO records beyond this are dropped
+LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv('LOG_QUEUE_BLOCK_TIMEOUT', 0.1))  # Seconds WARNING+ wait for room
+
+# Hotel view counts are buffered in memory and written in batches
+HOTEL_VIEW_COUNT_FLUSH_INTERVAL = int(os.getenv('HOTEL_VIEW_COUNT_FLUSH_INTERVAL', 10))  # Seconds
+HOTEL_VIEW_COUNT_BUFFER_SIZE = int(os.getenv('HOTEL_VIEW_COUNT_BUFFER_SIZE', 1000))  # Pending increments
+
+# Hotel name/area search (hotel.search): pg_trgm on PostgreSQL, an in-process index elsewhere
+HOTEL_SEARCH_BACKEND = os.getenv('HOTEL_SEARCH_BACKEND', 'auto')  # 'auto', 'database' or 'memory'
+HOTEL_SEARCH_MIN_SIMILARITY = float(os.getenv('HOTEL_SEARCH_MIN_SIMILARITY', 0.5))  # Memory backend fuzzy threshold
+HOTEL_SEARCH_INDEX_TTL = int(os.getenv('HOTEL_SEARCH_INDEX_TTL', 300))  # Seconds between memory index rebuilds
+HOTEL_SEARCH_MAX_LIMIT = int(os.getenv('HOTEL_SEARCH_MAX_LIMIT', 50))  # Most results per search
+
+# Nearby-hotel search (hotel.nearby) over the pincode directory's centroids
+HOTEL_NEARBY_GRID_DEGREES = float(os.getenv('HOTEL_NEARBY_GRID_DEGREES', 0.1))  # Cell size of the nearby-hotel grid
+HOTEL_NEARBY_INDEX_TTL = int(os.getenv('HOTEL_NEARBY_INDEX_TTL', 300))  # Seconds between nearby index rebuilds
+HOTEL_NEARBY_DEFAULT_RADIUS_KM = float(os.getenv('HOTEL_NEARBY_DEFAULT_RADIUS_KM', 5))  # Radius when none is given
+HOTEL_NEARBY_MAX_RADIUS_KM = float(os.getenv('HOTEL_NEARBY_MAX_RADIUS_KM', 50))  # Largest radius accepted
+HOTEL_NEARBY_MAX_LIMIT = int(os.getenv('HOTEL_NEARBY_MAX_LIMIT', 50))  # Most results per nearby search
+
+# Hotel deactivation cascade to foods and carts (hotel.deactivation)
+HOTEL_CASCADE_BATCH_SIZE = int(os.getenv('HOTEL_CASCADE_BATCH_SIZE', 500))  # Foods deactivated per statement
+HOTEL_CASCADE_INLINE_LIMIT = int(os.getenv('HOTEL_CASCADE_INLINE_LIMIT', 5000))  # Larger menus are left to a background job
+
+# Postal API used to resolve pincodes, and its lookup cache
+POSTAL_API_BASE_URL = os.getenv('POSTAL_API_BASE_URL', 'https://api.postalpincode.in')
+PINCODE_CACHE_SIZE = int(os.getenv('PINCODE_CACHE_SIZE', 4096))  # Pincodes held in memory
+PINCODE_CACHE_TTL = int(os.getenv('PINCODE_CACHE_TTL', 3600))  # Seconds
+PINCODE_NEGATIVE_TTL = int(os.getenv('PINCODE_NEGATIVE_TTL', 86400))  # Seconds before a rejected pincode is retried
+# Offline pincode index, built with `manage.py refresh_pincode_directory`
+PINCODE_DIRECTORY_PATH = os.getenv('PINCODE_DIRECTORY_PATH', str(BASE_DIR / 'address' / 'data' / 'pincodes.idx'))
+PINCODE_OFFLINE_ONLY = os.getenv('PINCODE_OFFLINE_ONLY', 'False') == 'True'  # Never call the postal API
+
+
+# Requests are authenticated from JWT claims; users loaded from the database
+# (tokens without claims or issued before a role/status change) are cached this long
+JWT_USER_CACHE_TIMEOUT = int(os.getenv('JWT_USER_CACHE_TIMEOUT', 60))  # Seconds, 0 disables
+
+# Bearer token required by the Prometheus metrics endpoint; when empty the
+# endpoint is open with DEBUG on and refused otherwise
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Stock held by cart lines (orders.stock); expired holds are given back by
+# `manage.py release_stock_reservations`
+CART_RESERVATION_TTL = int(os.getenv('CART_RESERVATION_TTL', 900))  # Seconds a cart line holds its stock
+
+# Background jobs (core.jobs), run by `manage.py run_workers`
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False') == 'True'  # Run jobs inline when deferred, without workers
+JOBS_LEASE_SECONDS = int(os.getenv('JOBS_LEASE_SECONDS', 300))  # Running jobs not finished by then are queued again
+JOBS_RETRY_BACKOFF = int(os.getenv('JOBS_RETRY_BACKOFF', 5))  # Seconds before the first retry, doubled per attempt
+JOBS_RETRY_BACKOFF_MAX = int(os.getenv('JOBS_RETRY_BACKOFF_MAX', 3600))  # Longest wait between retries
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
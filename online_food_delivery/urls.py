@@ -24,5 +24,6 @@ urlpatterns = [
     path('', include('orders.urls')),
     path('', include('address.urls')),
     path('', include('hotel.urls')),
-    path('', include('food.urls'))
+    path('', include('food.urls')),
+    path('', include('core.urls')),
 ]
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import CartItem
+
+
+class Command(BaseCommand):
+    """
+    Merges cart lines for the same food into one line per cart.
+
+    Carts used to get a new line each time a food was added. Adding a
+    food now raises the quantity of its line, and a unique (cart, food)
+    constraint enforces it; run this once before migrating existing data.
+
+    Usage:
+        python manage.py merge_duplicate_cart_items
+    """
+
+    help = "Merge duplicate cart lines for the same food into one."
+
+    def handle(self, *args, **options):
+        removed = CartItem.merge_duplicate_lines()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} duplicate cart line(s)."))
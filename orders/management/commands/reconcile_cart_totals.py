@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import CartDetails
+
+
+class Command(BaseCommand):
+    """
+    Fixes cart totals that drifted from the sum of their items.
+
+    Cart totals are kept up to date with F() deltas; items changed through
+    queryset updates or bulk deletes skip those deltas. Run this periodically
+    (e.g. from cron) or on demand.
+
+    Usage:
+        python manage.py reconcile_cart_totals
+        python manage.py reconcile_cart_totals --cart 42
+    """
+
+    help = "Recompute total_price for carts whose stored total does not match their items."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cart', type=int, action='append', help="Only reconcile these cart ids.")
+
+    def handle(self, *args, **options):
+        queryset = CartDetails.objects.all()
+        if options['cart']:
+            queryset = queryset.filter(id__in=options['cart'])
+
+        corrected = CartDetails.reconcile_totals(queryset)
+        self.stdout.write(self.style.SUCCESS(f"Corrected {corrected} cart total(s)."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import CartItem
+
+
+class Command(BaseCommand):
+    """
+    Gives back the stock held by cart lines whose hold has expired.
+
+    Cart lines hold their food's stock for CART_RESERVATION_TTL seconds
+    after they were added or changed (see orders.stock). Run this
+    periodically (e.g. from cron every minute) so abandoned carts do not
+    keep stock from other customers; their lines reserve again at checkout.
+
+    Usage:
+        python manage.py release_stock_reservations
+        python manage.py release_stock_reservations --batch-size 100
+    """
+
+    help = "Release the stock held by cart lines whose reservation has expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Carts released per transaction.")
+
+    def handle(self, *args, **options):
+        released = CartItem.release_expired_holds(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Released the stock of {released} cart line(s)."))
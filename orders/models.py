@@ -1,11 +1,17 @@
 from decimal import Decimal
 
-from django.db import models
-from django.db.models import Sum, F
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, F, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
+from utils.exceptions import BadRequestException
 from utils.models import BaseModel
 from authenticate.models import CustomUser
 from food.models import Food
+from .stock import release_stock, reservation_expiry, reserve_stock
+
+MAX_ITEM_QUANTITY = 32767  # Largest PositiveSmallIntegerField value
 
 
 class CartDetails(BaseModel):
@@ -36,6 +42,41 @@ class CartDetails(BaseModel):
         self.total_price = total
         self.save(update_fields=['total_price'])
 
+    @classmethod
+    def add_to_total(cls, cart_id, delta, lock=False):
+        """
+        Adds delta to a cart's total_price in a single UPDATE.
+
+        With `lock` the UPDATE runs for a zero delta too, so the cart row
+        is locked either way.
+        """
+        if delta or lock:
+            cls.objects.filter(id=cart_id).update(total_price=F('total_price') + delta)
+
+    @classmethod
+    def reconcile_totals(cls, queryset=None):
+        """
+        Recomputes total_price from the cart items for carts whose stored
+        total has drifted.
+
+        Returns:
+            int: Number of carts corrected.
+        """
+        queryset = cls.objects.all() if queryset is None else queryset
+        item_totals = (
+            CartItem.objects.filter(cart=OuterRef('pk'))
+            .values('cart')
+            .annotate(total=Sum(F('price') * F('quantity')))
+            .values('total')
+        )
+        computed_total = Coalesce(
+            Subquery(item_totals),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+        drifted = queryset.annotate(computed_total=computed_total).exclude(total_price=F('computed_total'))
+        return cls.objects.filter(id__in=drifted.values('id')).update(total_price=computed_total)
+
 
 class CartItem(BaseModel):
     """
@@ -46,14 +87,116 @@ class CartItem(BaseModel):
         - quantity: Number of units
         - food: Reference to the food item
         - cart: Foreign key to the user's cart
+        - reserved_until: End of the stock hold for this line, null once
+          the hold was given back (see orders.stock)
 
     Notes:
         - Price is preserved even if the food item's price changes later
+        - A cart has one line per food; adding the food again raises its quantity
     """
     price = models.DecimalField(max_digits=10, decimal_places=2, null=False)
     quantity = models.PositiveSmallIntegerField(null=False)
     food = models.ForeignKey(Food, on_delete=models.CASCADE, null=False)
     cart = models.ForeignKey(CartDetails, on_delete=models.CASCADE, null=False)
+    reserved_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'food'], name='cartitem_cart_food_unique'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers the loaded cart, price and quantity so a later save
+        can apply only the difference to the cart total, and the stock
+        the line holds so it can reserve or give back only the difference.
+        """
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._loaded_line = (loaded.get('cart_id'), loaded.get('price'), loaded.get('quantity'))
+        if {'food_id', 'quantity', 'reserved_until'} <= loaded.keys():
+            instance._loaded_hold = {loaded['food_id']: loaded['quantity']} if loaded['reserved_until'] else {}
+        else:
+            instance._loaded_hold = None
+        return instance
+
+    @classmethod
+    def release_expired_holds(cls, batch_size=500):
+        """
+        Gives back the stock held by lines whose hold has expired, a
+        batch of carts per transaction.
+
+        Returns:
+            int: Number of lines released.
+        """
+        released = 0
+        while True:
+            now = timezone.now()
+            with transaction.atomic():
+                cart_ids = list(
+                    CartDetails.objects.select_for_update()
+                    .filter(id__in=cls.objects.filter(reserved_until__lt=now).values('cart_id'))
+                    .order_by('id')
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not cart_ids:
+                    return released
+                lines = cls.objects.filter(cart_id__in=cart_ids, reserved_until__lt=now)
+                release_stock(held_quantities(lines))
+                released += lines.update(reserved_until=None)
+
+    @classmethod
+    def merge_duplicate_lines(cls):
+        """
+        Merges lines for the same food in a cart into the oldest one,
+        adding up their quantities, so the unique (cart, food) constraint
+        can be added to existing data.
+
+        The merged line keeps the oldest line's price and gives back its
+        stock hold (it reserves again at checkout); the carts' totals are
+        recomputed.
+
+        Returns:
+            int: Number of lines removed.
+        """
+        duplicates = (
+            cls.objects.values('cart_id', 'food_id')
+            .annotate(lines=Count('id'), keep=Min('id'), quantity=Sum('quantity'))
+            .filter(lines__gt=1)
+            .order_by('cart_id')
+        )
+        removed = 0
+        for duplicate in duplicates:
+            with transaction.atomic():
+                # The cart is locked before its lines, the order checkout uses.
+                CartDetails.objects.select_for_update().filter(id=duplicate['cart_id']).first()
+                lines = cls.objects.filter(cart_id=duplicate['cart_id'], food_id=duplicate['food_id'])
+                release_stock(held_quantities(lines))
+                removed += lines.exclude(id=duplicate['keep']).delete()[0]
+                lines.update(quantity=min(duplicate['quantity'], MAX_ITEM_QUANTITY), reserved_until=None)
+                CartDetails.reconcile_totals(CartDetails.objects.filter(id=duplicate['cart_id']))
+        return removed
+
+    def line_total(self):
+        return self.price * self.quantity
+
+    def _hold_stock(self):
+        """
+        Reserves the stock this line needs beyond what it holds, gives
+        back what it no longer needs, and renews the hold.
+        """
+        held = getattr(self, '_loaded_hold', {})
+        if held is None:
+            # Loaded with deferred fields, the hold is unknown.
+            held = held_quantities(CartItem.objects.filter(id=self.id))
+
+        changes = {food_id: -quantity for food_id, quantity in held.items()}
+        changes[self.food_id] = changes.get(self.food_id, 0) + self.quantity
+        if reserve_stock({food_id: change for food_id, change in changes.items() if change > 0}):
+            raise BadRequestException(key='OUT_OF_STOCK', message=f"Not enough stock of '{self.food}' left.")
+        release_stock({food_id: -change for food_id, change in changes.items() if change < 0})
+        self.reserved_until = reservation_expiry()
 
     def save(self, *args, **kwargs):
         """
@@ -61,10 +204,119 @@ class CartItem(BaseModel):
 
         Behavior:
             - Sets price from food if not provided
-            - Updates CartDetails.total_price after saving
+            - Adds the change in price * quantity to CartDetails.total_price
+              with an F() update, in the same transaction as the save
+            - The cart row is updated (or locked, when the line total is
+              unknown) before the item and the stock hold, whatever the
+              delta: the lock order checkout uses, so the two cannot deadlock
+            - Holds the food's stock for the quantity, raising
+              BadRequestException when too little is left
         """
         if not self.price:
             self.price = self.food.price
 
-        super().save(*args, **kwargs)
-        self.cart.update_total_price()
\ No newline at end of file
+        loaded_line = getattr(self, '_loaded_line', None)
+
+        # No savepoint inside a caller's transaction: a failed save aborts it anyway.
+        # Every branch locks the cart row before writing the line or holding stock.
+        with transaction.atomic(savepoint=False):
+            if loaded_line is None:
+                CartDetails.add_to_total(self.cart_id, self.line_total(), lock=True)
+                self._hold_stock()
+                super().save(*args, **kwargs)
+            elif None in loaded_line:
+                # Loaded with deferred fields, the old line total is unknown.
+                cart = CartDetails.objects.select_for_update().get(id=self.cart_id)
+                self._hold_stock()
+                super().save(*args, **kwargs)
+                cart.update_total_price()
+            else:
+                loaded_cart_id, loaded_price, loaded_quantity = loaded_line
+                if loaded_cart_id != self.cart_id:
+                    CartDetails.add_to_total(loaded_cart_id, -(loaded_price * loaded_quantity), lock=True)
+                    CartDetails.add_to_total(self.cart_id, self.line_total(), lock=True)
+                else:
+                    CartDetails.add_to_total(
+                        self.cart_id, self.line_total() - loaded_price * loaded_quantity, lock=True
+                    )
+                self._hold_stock()
+                super().save(*args, **kwargs)
+
+        self._loaded_line = (self.cart_id, self.price, self.quantity)
+        self._loaded_hold = {self.food_id: self.quantity}
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes the item, subtracts its loaded line total from the cart
+        and gives back the stock it holds.
+
+        Unsaved edits of price or quantity are ignored; when the loaded
+        line total is unknown the cart total is recomputed instead.
+        """
+        held = getattr(self, '_loaded_hold', {})
+        loaded_line = getattr(self, '_loaded_line', None)
+        with transaction.atomic(savepoint=False):
+            cart = None
+            if loaded_line is None or None in loaded_line:
+                # Locked now, recomputed after the delete: cart before lines and stock.
+                cart = CartDetails.objects.select_for_update().get(id=self.cart_id)
+            else:
+                loaded_cart_id, loaded_price, loaded_quantity = loaded_line
+                CartDetails.add_to_total(loaded_cart_id, -(loaded_price * loaded_quantity))
+            release_stock(held_quantities(CartItem.objects.filter(id=self.id)) if held is None else held)
+            result = super().delete(*args, **kwargs)
+            if cart is not None:
+                cart.update_total_price()
+            return result
+
+
+def held_quantities(cart_items):
+    """
+    Returns {food id: quantity} of stock held by the cart items.
+    """
+    return dict(
+        cart_items.filter(reserved_until__isnull=False)
+        .values('food_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('food_id', 'total')
+        .order_by()
+    )
+
+class Order(BaseModel):
+    """
+    An order placed by checking out a user's cart.
+
+    Fields:
+        - total_price: Sum of the order lines at checkout
+        - user: The user who placed the order
+
+    Notes:
+        - Created by orders.service.checkout_cart, which empties the cart
+          in the same transaction
+    """
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, null=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+
+
+class OrderLine(BaseModel):
+    """
+    A food in an order, copied from a cart item at checkout.
+
+    Fields:
+        - name: Food name at checkout
+        - price: Price at checkout
+        - quantity: Number of units
+        - food: Reference to the food item, cleared if the food is deleted
+        - order: Foreign key to the order
+
+    Notes:
+        - Name and price are snapshots, later food changes do not alter the order
+    """
+    name = models.CharField(max_length=100)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=False)
+    quantity = models.PositiveSmallIntegerField(null=False)
+    food = models.ForeignKey(Food, on_delete=models.SET_NULL, null=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines')
+
+    def line_total(self):
+        return self.price * self.quantity
@@ -1,15 +1,18 @@
 from rest_framework import serializers
 
-from .models import CartDetails, CartItem
+from .models import CartItem
 from utils.exceptions import BadRequestException
 
 
 class CartItemCreateSerializer(serializers.ModelSerializer):
     """
-    Serializer to create a new CartItem.
-    Includes custom validation for food status, quantity, and cart status.
+    Serializer to add an item to the user's cart.
+    Includes custom validation for food status and quantity; the cart is
+    chosen by orders.service.insert_cart_details.
     """
 
+    cart = serializers.PrimaryKeyRelatedField(read_only=True)
+
     class Meta:
         model = CartItem
         fields = ['food', 'quantity', 'cart']
@@ -18,7 +21,7 @@ class CartItemCreateSerializer(serializers.ModelSerializer):
         """
         Validates that the selected food is still active.
         """
-        if value.status != "Active":
+        if value.status != value.ACTIVE:
             raise BadRequestException(f"The food item '{value}' is no longer available.")
         return value
 
@@ -30,24 +33,6 @@ class CartItemCreateSerializer(serializers.ModelSerializer):
             raise BadRequestException("Quantity must be at least 1.")
         return value
 
-    def validate_cart(self, value):
-        """
-        Ensures the associated cart is active.
-        """
-        if value.status != "Active":
-            raise BadRequestException("The selected cart is not active.")
-        return value
-
-
-class CartDetailCreateSerializer(serializers.ModelSerializer):
-    """
-    Serializer to create CartDetails for a user.
-    """
-
-    class Meta:
-        model = CartDetails
-        fields = ['user', 'total_price']
-
 
 class CartItemUpdateSerializer(serializers.ModelSerializer):
     """
@@ -60,10 +45,13 @@ class CartItemUpdateSerializer(serializers.ModelSerializer):
 
     def validate_food(self, value):
         """
-        Validates that the selected food is still active.
+        Validates that the selected food is still active and not in
+        another line of the cart.
         """
-        if value.status != "Active":
+        if value.status != value.ACTIVE:
             raise BadRequestException(f"The food item '{value}' is no longer available.")
+        if value.id != self.instance.food_id and CartItem.objects.filter(cart_id=self.instance.cart_id, food=value).exists():
+            raise BadRequestException(message=f"The food item '{value}' is already in the cart.")
         return value
 
     def validate_quantity(self, value):
@@ -1,15 +1,34 @@
 import logging
 
-from .serializer import (
-    CartDetailCreateSerializer,
-    CartItemCreateSerializer,
-    CartItemUpdateSerializer
-)
-from .models import CartDetails, CartItem
+from django.db import transaction
+
+from .serializer import CartItemCreateSerializer, CartItemUpdateSerializer
+from .models import MAX_ITEM_QUANTITY, CartDetails, CartItem, Order, OrderLine
+from .stock import reservation_expiry, reserve_stock
+from food.models import Food
 from utils.exceptions import BadRequestException
 
 logger = logging.getLogger(__name__)
 
+MAX_BULK_CART_ITEMS = 200
+
+
+def get_cart(cart_detail_data, lock=False):
+    """
+    Returns the user's cart, creating the cart if needed.
+
+    get_or_create looks the cart up again when a concurrent request
+    created it first (one cart per user), so two first adds cannot fail
+    or create two carts. With `lock` the cart row is locked until the end
+    of the transaction.
+    """
+    user = cart_detail_data.get('user')
+    carts = CartDetails.objects.select_for_update() if lock else CartDetails.objects
+    cart, created = carts.get_or_create(user_id=user, defaults={'total_price': cart_detail_data.get('total_price', 0)})
+    if created:
+        logger.info("Cart created for user %s", user)
+    return cart
+
 
 def insert_cart_details(request, cart_detail_data):
     """
@@ -19,37 +38,163 @@ def insert_cart_details(request, cart_detail_data):
         - food (int)
         - quantity (int)
 
+    Behavior:
+        - The cart is fetched or created and locked in one get_or_create,
+          so adds for one user run one after the other
+        - A food already in the cart has its quantity increased; the cart
+          keeps one line per food (unique on cart and food)
+
     Returns:
-        dict: Created CartItem data.
+        dict: Created or updated CartItem data.
     """
-    user = cart_detail_data.get('user')
-    existing_cart = CartDetails.objects.filter(user=user).first()
+    item_serializer = CartItemCreateSerializer(data=request.data)
+    if not item_serializer.is_valid():
+        logger.error("Cart item creation failed: %s", item_serializer.errors)
+        raise BadRequestException(message=item_serializer.errors)
+    food = item_serializer.validated_data['food']
+    quantity = item_serializer.validated_data['quantity']
 
-    if not existing_cart:
-        logger.debug("No cart found for user. Creating new cart.")
-        serializer = CartDetailCreateSerializer(data=cart_detail_data)
-        if serializer.is_valid():
-            cart_instance = serializer.save()
-            cart_id = cart_instance.id
-            logger.info("Cart created for user %s", user)
+    with transaction.atomic():
+        cart = get_cart(cart_detail_data, lock=True)
+        if cart.status != cart.ACTIVE:
+            raise BadRequestException(message="The selected cart is not active.")
+
+        cart_item = CartItem.objects.filter(cart=cart, food=food).first()
+        if cart_item is None:
+            cart_item = CartItem(cart=cart, food=food, quantity=quantity)
+        elif cart_item.quantity + quantity > MAX_ITEM_QUANTITY:
+            raise BadRequestException(message="Quantity is too large.")
         else:
-            logger.error("Cart creation failed: %s", serializer.errors)
-            raise BadRequestException(serializer.errors)
-    else:
-        logger.debug("Using existing cart for user %s", user)
-        cart_id = existing_cart.id
+            cart_item.quantity += quantity
+        cart_item.save()
+
+    logger.info("Cart item for food %s added to cart %s", food.id, cart.id)
+    return CartItemCreateSerializer(cart_item).data
+
+
+def _parse_bulk_item(index, item):
+    """
+    Returns (food_id, quantity) for one bulk cart entry, or an error dict.
+    """
+    if not isinstance(item, dict):
+        return {'index': index, 'message': "Item must be an object with food and quantity."}
+    try:
+        food_id = int(item.get('food'))
+        quantity = int(item.get('quantity'))
+    except (TypeError, ValueError):
+        return {'index': index, 'food': item.get('food'), 'message': "Food and quantity must be integers."}
+    if quantity < 1:
+        return {'index': index, 'food': food_id, 'message': "Quantity must be at least 1."}
+    return food_id, quantity
+
+
+def insert_cart_items_bulk(request, cart_detail_data):
+    """
+    Adds a batch of items to the user's cart.
+
+    Request must include:
+        - items: list of {food (int), quantity (int)}
 
-    cart_item_data = request.data.copy()
-    cart_item_data['cart'] = cart_id
+    Behavior:
+        - All referenced foods are validated with one query
+        - Items for the same food are merged, and merged into an existing
+          cart line when there is one
+        - New lines are inserted with bulk_create, existing lines updated
+          with bulk_update, and the cart total is adjusted once
+        - Stock is held for all lines with one conditional decrement
+          (orders.stock); foods without enough stock are reported
+        - Invalid items are reported in `errors` and skipped
 
-    item_serializer = CartItemCreateSerializer(data=cart_item_data)
-    if item_serializer.is_valid():
-        item_serializer.save()
-        logger.info("Cart item added to cart %s", cart_id)
-        return item_serializer.data
+    Returns:
+        dict: `cart_items` added or updated, and per-item `errors`.
+    """
+    items = request.data.get('items') if hasattr(request.data, 'get') else request.data
+    if not isinstance(items, list) or not items:
+        raise BadRequestException(key='INVALID_CART_ITEMS')
+    if len(items) > MAX_BULK_CART_ITEMS:
+        raise BadRequestException(key='CART_ITEMS_LIMIT')
+
+    errors = []
+    quantities = {}
+    first_index = {}
+    for index, item in enumerate(items):
+        parsed = _parse_bulk_item(index, item)
+        if isinstance(parsed, dict):
+            errors.append(parsed)
+            continue
+        food_id, quantity = parsed
+        quantities[food_id] = quantities.get(food_id, 0) + quantity
+        first_index.setdefault(food_id, index)
+
+    foods = Food.objects.in_bulk(list(quantities))
+    for food_id in list(quantities):
+        food = foods.get(food_id)
+        if food is None or food.status != food.ACTIVE:
+            message = f"The food item '{food}' is no longer available." if food else "Food item does not exist."
+            errors.append({'index': first_index[food_id], 'food': food_id, 'message': message})
+            del quantities[food_id]
+
+    saved_lines = []
+
+    with transaction.atomic():
+        # The cart is locked before its lines, the order checkout uses.
+        cart = get_cart(cart_detail_data, lock=True)
+        if cart.status != cart.ACTIVE:
+            raise BadRequestException(message="The selected cart is not active.")
+        cart_id = cart.id
+        if quantities:
+            existing_lines = {
+                line.food_id: line
+                for line in CartItem.objects.select_for_update().filter(cart_id=cart_id, food_id__in=list(quantities))
+            }
+            new_lines = []
+            updated_lines = []
+            total_delta = 0
 
-    logger.error("Cart item creation failed: %s", item_serializer.errors)
-    raise BadRequestException(item_serializer.errors)
+            # Stock to hold: the added quantity, or the whole line if its hold was given back
+            needed = {}
+            for food_id, quantity in quantities.items():
+                line = existing_lines.get(food_id)
+                current_quantity = line.quantity if line else 0
+                if current_quantity + quantity > MAX_ITEM_QUANTITY:
+                    errors.append({'index': first_index[food_id], 'food': food_id, 'message': "Quantity is too large."})
+                    continue
+                needed[food_id] = quantity if line is None or line.reserved_until else current_quantity + quantity
+
+            short = reserve_stock(needed)
+            reserved_until = reservation_expiry()
+            for food_id in needed:
+                if food_id in short:
+                    errors.append({'index': first_index[food_id], 'food': food_id, 'message': "Not enough stock left."})
+                    continue
+
+                quantity = quantities[food_id]
+                line = existing_lines.get(food_id)
+                if line is None:
+                    line = CartItem(
+                        cart_id=cart_id, food_id=food_id, quantity=quantity, price=foods[food_id].price,
+                        reserved_until=reserved_until,
+                    )
+                    new_lines.append(line)
+                else:
+                    line.quantity += quantity
+                    line.reserved_until = reserved_until
+                    updated_lines.append(line)
+                total_delta += line.price * quantity
+
+            CartItem.objects.bulk_create(new_lines)
+            CartItem.objects.bulk_update(updated_lines, ['quantity', 'reserved_until'])
+            CartDetails.add_to_total(cart_id, total_delta)
+            saved_lines = new_lines + updated_lines
+
+    logger.info("Bulk cart add to cart %s: %d line(s) saved, %d error(s)", cart_id, len(saved_lines), len(errors))
+    return {
+        'cart_items': [
+            {'food': line.food_id, 'quantity': line.quantity, 'cart': cart_id}
+            for line in saved_lines
+        ],
+        'errors': sorted(errors, key=lambda error: error['index']),
+    }
 
 
 def update_cart_item(request):
@@ -57,25 +202,91 @@ def update_cart_item(request):
     Updates quantity of existing cart item.
 
     Request must include:
-        - id: CartItem ID
+        - id: CartItem ID, of a line in the requesting user's cart
         - quantity: New value
 
+    Behavior:
+        - The user's cart is locked before the line is read, the order
+          checkout and cart adds use, so concurrent updates of one cart
+          run one after the other and its total cannot drift
+
     Returns:
         dict: Updated CartItem data.
     """
     item_id = request.data.get('id')
     new_qty = request.data.get('quantity')
 
-    try:
-        cart_item = CartItem.objects.get(id=item_id)
-        cart_item.quantity = new_qty
+    with transaction.atomic():
+        cart = CartDetails.objects.select_for_update().filter(user_id=request.user.id).first()
+        cart_item = CartItem.objects.filter(cart=cart, id=item_id).first() if cart else None
+        if cart_item is None:
+            logger.warning("Cart item not found: %s", item_id)
+            raise BadRequestException(message={'id': 'Cart item does not exist'})
 
-        serializer = CartItemUpdateSerializer(cart_item)
+        serializer = CartItemUpdateSerializer(cart_item, data={'quantity': new_qty}, partial=True)
         if serializer.is_valid():
             serializer.save()
             logger.info("Updated cart item %s with quantity %s", item_id, new_qty)
             return serializer.data
         logger.error("Cart item update invalid: %s", serializer.errors)
-    except CartItem.DoesNotExist:
-        logger.warning("Cart item not found: %s", item_id)
-        raise BadRequestException({'id': 'Cart item does not exist'})
+        raise BadRequestException(message=serializer.errors)
+
+
+def checkout_cart(user_id):
+    """
+    Turns the user's cart into an order and empties the cart.
+
+    Behavior:
+        - The cart row is locked with select_for_update, so concurrent
+          checkouts of one cart run one after the other and only the
+          first finds items to order
+        - Lines whose stock hold was given back reserve it again, all
+          in one conditional decrement; held stock is kept as sold
+        - Lines are copied with their cart price in one bulk_create
+        - The cart is emptied in the same transaction
+        - Cart edits also lock the cart before its lines, so they cannot
+          deadlock with a checkout
+
+    Returns:
+        dict: The order with its lines.
+    """
+    with transaction.atomic():
+        cart = CartDetails.objects.select_for_update().filter(user_id=user_id).first()
+        cart_items = list(CartItem.objects.filter(cart=cart).select_related('food').order_by('id')) if cart else []
+        if not cart_items:
+            raise BadRequestException(key='CART_EMPTY')
+
+        unavailable = [item.food_id for item in cart_items if item.food.status != Food.ACTIVE]
+        if unavailable:
+            logger.warning("Checkout of cart %s refused, unavailable foods %s", cart.id, unavailable)
+            raise BadRequestException(
+                key='CART_FOOD_UNAVAILABLE',
+                message=f"Foods {unavailable} are no longer available, remove them from the cart.",
+            )
+
+        unheld = {}
+        for item in cart_items:
+            if item.reserved_until is None:
+                unheld[item.food_id] = unheld.get(item.food_id, 0) + item.quantity
+        short = sorted(reserve_stock(unheld))
+        if short:
+            logger.warning("Checkout of cart %s refused, not enough stock of foods %s", cart.id, short)
+            raise BadRequestException(key='OUT_OF_STOCK', message=f"Not enough stock of foods {short} left.")
+
+        order = Order.objects.create(user_id=user_id, total_price=sum(item.line_total() for item in cart_items))
+        lines = OrderLine.objects.bulk_create([
+            OrderLine(order=order, food_id=item.food_id, name=item.food.name, price=item.price, quantity=item.quantity)
+            for item in cart_items
+        ])
+        CartItem.objects.filter(cart=cart).delete()
+        CartDetails.objects.filter(id=cart.id).update(total_price=0)
+
+    logger.info("Order %s placed from cart %s: %d line(s), total %s", order.id, cart.id, len(lines), order.total_price)
+    return {
+        'id': order.id,
+        'total_price': str(order.total_price),
+        'lines': [
+            {'food': line.food_id, 'name': line.name, 'price': str(line.price), 'quantity': line.quantity}
+            for line in lines
+        ],
+    }
@@ -0,0 +1,97 @@
+"""
+Stock reservations for foods sold in limited quantities.
+
+Food.stock counts the units still available, and is null for foods whose
+stock is not tracked. A cart line holds the stock for its quantity from
+the time it is added or changed (CartItem.reserved_until), for
+CART_RESERVATION_TTL seconds. `manage.py release_stock_reservations`
+gives back the holds of abandoned carts. A line whose hold was given
+back reserves again at checkout.
+
+Foods whose stock is not tracked are skipped after one read, without
+locking their rows. Stock is taken with a conditional decrement
+(`stock >= quantity`), so it never goes below zero. Several foods are
+reserved together: their rows are locked in id order, then one UPDATE
+decrements them all. So concurrent checkouts neither oversell nor
+deadlock.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from food.models import Food
+from utils.exceptions import BadRequestException
+
+DEFAULT_RESERVATION_TTL = 900
+
+
+def reservation_expiry():
+    """
+    Returns the end of a hold made now.
+    """
+    return timezone.now() + timedelta(seconds=getattr(settings, 'CART_RESERVATION_TTL', DEFAULT_RESERVATION_TTL))
+
+
+def _per_food(quantities):
+    return Case(
+        *[When(id=food_id, then=Value(quantity)) for food_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _tracked(food_ids):
+    return list(Food.objects.filter(id__in=list(food_ids), stock__isnull=False).values_list('id', flat=True))
+
+
+def reserve_stock(quantities):
+    """
+    Takes {food id: quantity} from the stock of the foods that have enough.
+    Must run in a transaction.
+
+    Returns:
+        set: Ids of tracked foods without enough stock; nothing was taken from them.
+    """
+    quantities = {food_id: quantity for food_id, quantity in quantities.items() if quantity > 0}
+    tracked = _tracked(quantities) if quantities else []
+    if not tracked:
+        return set()
+
+    if len(tracked) == 1:
+        food_id = tracked[0]
+        quantity = quantities[food_id]
+        return set() if Food.objects.filter(id=food_id, stock__gte=quantity).update(stock=F('stock') - quantity) else {food_id}
+
+    available = dict(
+        Food.objects.select_for_update().filter(id__in=tracked).order_by('id').values_list('id', 'stock')
+    )
+    short = {food_id for food_id, stock in available.items() if stock is not None and stock < quantities[food_id]}
+    taken = {food_id: quantities[food_id] for food_id, stock in available.items() if stock is not None and food_id not in short}
+    if taken:
+        needed = _per_food(taken)
+        updated = Food.objects.filter(id__in=list(taken), stock__gte=needed).update(stock=F('stock') - needed)
+        if updated != len(taken):
+            # Only possible where the database ignores FOR UPDATE; the caller's transaction is rolled back.
+            raise BadRequestException(key='OUT_OF_STOCK')
+    return short
+
+
+def release_stock(quantities):
+    """
+    Gives {food id: quantity} back to the stock of the tracked foods.
+    Must run in a transaction.
+    """
+    quantities = {food_id: quantity for food_id, quantity in quantities.items() if quantity > 0}
+    tracked = _tracked(quantities) if quantities else []
+    if len(tracked) == 1:
+        food_id = tracked[0]
+        Food.objects.filter(id=food_id, stock__isnull=False).update(stock=F('stock') + quantities[food_id])
+    elif tracked:
+        # Locked in id order like reserve_stock, so the two cannot deadlock.
+        food_ids = list(
+            Food.objects.select_for_update().filter(id__in=tracked, stock__isnull=False).order_by('id')
+            .values_list('id', flat=True)
+        )
+        returned = _per_food({food_id: quantities[food_id] for food_id in food_ids})
+        Food.objects.filter(id__in=food_ids).update(stock=F('stock') + returned)
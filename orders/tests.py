@@ -1,3 +1,487 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import CartDetails, CartItem, Order, OrderLine
+from .serializer import CartItemUpdateSerializer
+from address.models import Address
+from authenticate.models import CustomUser
+from food.models import Category, Food
+from hotel.models import Hotel
+from utils.exceptions import BadRequestException
+
+
+class CartTestCase(TestCase):
+    """
+    Base test case with a hotel menu and an empty cart.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        with patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'}):
+            address = Address.objects.create(area='Adyar', street='Main Street', pincode=600020)
+        manager = CustomUser.objects.create_user(email='manager@example.com', password='secret', name='Manager')
+        hotel = Hotel.objects.create(name='Hotel', user=manager, address=address)
+        category = Category.objects.create(name='Meals')
+        cls.foods = [
+            Food.objects.create(name=f'Food {index}', price=Decimal('10.50') + index, category=category, hotel=hotel)
+            for index in range(5)
+        ]
+        cls.user = CustomUser.objects.create_user(email='customer@example.com', password='secret', name='Customer')
+
+    def setUp(self):
+        self.cart = CartDetails.objects.create(user=self.user, total_price=0)
+
+    def assertCartTotal(self, expected):
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.total_price, Decimal(expected))
+
+
+class CartTotalTest(CartTestCase):
+    """
+    Cart totals follow item changes through F() deltas.
+    """
+
+    def test_add_item_costs_constant_queries(self):
+        for food in self.foods[2:]:
+            CartItem.objects.create(food=food, quantity=10, cart=self.cart)
+
+        with self.assertNumQueries(3):
+            CartItem(food=self.foods[1], quantity=2, cart=self.cart).save()
+
+        self.assertCartTotal('428.00')
+
+    def test_update_and_delete_apply_delta(self):
+        item = CartItem.objects.create(food=self.foods[0], quantity=2, cart=self.cart)
+        CartItem.objects.create(food=self.foods[1], quantity=1, cart=self.cart)
+        self.assertCartTotal('32.50')
+
+        item = CartItem.objects.get(id=item.id)
+        item.quantity = 5
+        item.save()
+        self.assertCartTotal('64.00')
+
+        item.delete()
+        self.assertCartTotal('11.50')
+
+    def test_save_touches_the_cart_first(self):
+        CartItem.objects.create(food=self.foods[0], quantity=2, cart=self.cart)
+        for item in (
+            CartItem.objects.get(cart=self.cart),  # Unchanged, a zero delta
+            CartItem.objects.defer('quantity').get(cart=self.cart),  # Line total unknown
+        ):
+            with self.subTest(deferred=bool(item.get_deferred_fields())):
+                with CaptureQueriesContext(connection) as context:
+                    item.save()
+                self.assertIn('"orders_cartdetails"', context.captured_queries[0]['sql'])
+        self.assertCartTotal('21.00')
+
+    def test_delete_ignores_unsaved_edits(self):
+        item = CartItem.objects.create(food=self.foods[0], quantity=2, cart=self.cart)
+        CartItem.objects.create(food=self.foods[1], quantity=1, cart=self.cart)
+
+        item = CartItem.objects.get(id=item.id)
+        item.quantity = 5
+        item.delete()
+        self.assertCartTotal('11.50')
+
+        item = CartItem.objects.only('id', 'cart_id', 'food_id').get(food=self.foods[1])
+        item.quantity = 3
+        item.delete()
+        self.assertCartTotal('0.00')
+
+    def test_reconcile_fixes_drift(self):
+        CartItem.objects.create(food=self.foods[0], quantity=2, cart=self.cart)
+        CartItem.objects.filter(cart=self.cart).update(quantity=4)
+        self.assertCartTotal('21.00')
+
+        call_command('reconcile_cart_totals', stdout=StringIO())
+        self.assertCartTotal('42.00')
+        self.assertEqual(CartDetails.reconcile_totals(), 0)
+
+
+class CartItemBulkViewTest(CartTestCase):
+    """
+    The bulk endpoint merges duplicates and reports bad items without failing the batch.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_add_merges_and_reports_errors(self):
+        CartItem.objects.create(food=self.foods[0], quantity=1, cart=self.cart)
+        Food.objects.filter(id=self.foods[4].id).update(status='inactive')
+
+        response = self.client.post('/cart/bulk/', {'items': [
+            {'food': self.foods[0].id, 'quantity': 2},
+            {'food': self.foods[1].id, 'quantity': 1},
+            {'food': self.foods[1].id, 'quantity': 3},
+            {'food': self.foods[4].id, 'quantity': 1},
+            {'food': 999999, 'quantity': 1},
+            {'food': self.foods[2].id, 'quantity': 0},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([error['index'] for error in response.data['errors']], [3, 4, 5])
+        lines = dict(CartItem.objects.filter(cart=self.cart).values_list('food_id', 'quantity'))
+        self.assertEqual(lines, {self.foods[0].id: 3, self.foods[1].id: 4})
+        self.assertCartTotal('77.50')
+
+    def test_bulk_add_refuses_inactive_cart(self):
+        CartDetails.objects.filter(id=self.cart.id).update(status='inactive')
+
+        response = self.client.post('/cart/bulk/', {'items': [{'food': self.foods[0].id, 'quantity': 1}]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], "The selected cart is not active.")
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+
+    def test_bulk_add_query_count_does_not_grow_with_items(self):
+        items = [{'food': food.id, 'quantity': 1} for food in self.foods]
+        CartItem.objects.create(food=self.foods[0], quantity=1, cart=self.cart)
+
+        with self.assertNumQueries(9):
+            self.client.post('/cart/bulk/', {'items': items[:2]}, format='json')
+        with self.assertNumQueries(9):
+            self.client.post('/cart/bulk/', {'items': items}, format='json')
+
+
+class CartItemViewTest(CartTestCase):
+    """
+    Adding a food keeps one line per food in a cart that is created once.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_adding_a_food_again_raises_its_quantity(self):
+        self.client.post('/cart/', {'food': self.foods[0].id, 'quantity': 1}, format='json')
+        response = self.client.post('/cart/', {'food': self.foods[0].id, 'quantity': 2}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cart_item'], {'food': self.foods[0].id, 'quantity': 3, 'cart': self.cart.id})
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 1)
+        self.assertCartTotal('31.50')
+
+    def test_add_reports_field_errors(self):
+        response = self.client.post('/cart/', {'food': self.foods[0].id, 'quantity': 'many'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data['message']), ['quantity'])
+
+    def test_update_reports_field_errors(self):
+        item = CartItem.objects.create(food=self.foods[0], quantity=1, cart=self.cart)
+
+        response = self.client.patch('/cart/', {'id': item.id, 'quantity': 'many'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data['message']), ['quantity'])
+
+        response = self.client.patch('/cart/', {'id': item.id + 1, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], {'id': 'Cart item does not exist'})
+
+    def test_update_of_another_users_line_is_refused(self):
+        item = CartItem.objects.create(food=self.foods[0], quantity=1, cart=self.cart)
+        other = CustomUser.objects.create_user(email='other@example.com', password='secret', name='Other')
+        CartDetails.objects.create(user=other, total_price=0)
+        self.client.force_authenticate(user=other)
+
+        response = self.client.patch('/cart/', {'id': item.id, 'quantity': 9}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(CartItem.objects.get(id=item.id).quantity, 1)
+        self.assertCartTotal('10.50')
+
+    def test_first_add_creates_the_cart(self):
+        self.cart.delete()
+
+        response = self.client.post('/cart/', {'food': self.foods[1].id, 'quantity': 2}, format='json')
+
+        cart = CartDetails.objects.get(user=self.user)
+        self.assertEqual(response.data['cart_item']['cart'], cart.id)
+        self.assertEqual(cart.total_price, Decimal('23.00'))
+
+    def test_cart_has_one_line_per_food(self):
+        item = CartItem.objects.create(food=self.foods[0], quantity=1, cart=self.cart)
+        CartItem.objects.create(food=self.foods[1], quantity=1, cart=self.cart)
+
+        with self.assertRaises(BadRequestException):
+            CartItemUpdateSerializer(item, data={'food': self.foods[1].id}, partial=True).is_valid()
+
+        with self.assertRaises(IntegrityError):
+            CartItem.objects.bulk_create([CartItem(food=self.foods[0], quantity=1, price='10.50', cart=self.cart)])
+
+
+class CheckoutViewTest(CartTestCase):
+    """
+    Checkout copies the cart into an order and empties the cart.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_checkout_snapshots_lines_and_empties_cart(self):
+        CartItem.objects.create(food=self.foods[0], quantity=2, cart=self.cart)
+        CartItem.objects.create(food=self.foods[1], quantity=1, cart=self.cart)
+        Food.objects.filter(id=self.foods[0].id).update(price='99.00')
+
+        response = self.client.post('/checkout/', format='json')
+        Food.objects.filter(id=self.foods[1].id).update(name='Renamed')
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.total_price, Decimal('32.50'))
+        self.assertEqual(
+            list(order.lines.order_by('id').values_list('food_id', 'name', 'price', 'quantity')),
+            [(self.foods[0].id, 'Food 0', Decimal('10.50'), 2), (self.foods[1].id, 'Food 1', Decimal('11.50'), 1)],
+        )
+        self.assertEqual(response.data['order']['total_price'], '32.50')
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+        self.assertCartTotal('0.00')
+
+        response = self.client.post('/checkout/', format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['code'], 'ERROR_040')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_checkout_with_login_token(self):
+        # Token requests carry a ClaimsUser, not a CustomUser.
+        CartItem.objects.create(food=self.foods[0], quantity=1, cart=self.cart)
+        client = APIClient()
+        token = client.post('/login/', {'email': 'customer@example.com', 'password': 'secret'}, format='json').data['access']
+
+        response = client.post('/checkout/', format='json', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get(user=self.user).total_price, Decimal('10.50'))
+
+    def test_checkout_refuses_unavailable_foods(self):
+        CartItem.objects.create(food=self.foods[0], quantity=1, cart=self.cart)
+        Food.objects.filter(id=self.foods[0].id).update(status='inactive')
+
+        response = self.client.post('/checkout/', format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['code'], 'ERROR_041')
+        self.assertFalse(Order.objects.exists())
+        self.assertCartTotal('10.50')
+
+    def test_checkout_query_count_does_not_grow_with_lines(self):
+        CartItem.objects.bulk_create([CartItem(food=food, quantity=1, price=food.price, cart=self.cart) for food in self.foods[:2]])
+        with self.assertNumQueries(9):
+            self.client.post('/checkout/', format='json')
+
+        CartItem.objects.bulk_create([CartItem(food=food, quantity=1, price=food.price, cart=self.cart) for food in self.foods])
+        with self.assertNumQueries(9):
+            self.client.post('/checkout/', format='json')
+        self.assertEqual(OrderLine.objects.count(), 7)
+
+
+class StockReservationTest(CartTestCase):
+    """
+    Cart lines hold stock of tracked foods until checkout or until their hold expires.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Food.objects.filter(id__in=[self.foods[0].id, self.foods[1].id]).update(stock=5)
+
+    def assertStock(self, food, expected):
+        food.refresh_from_db()
+        self.assertEqual(food.stock, expected)
+
+    def test_cart_lines_hold_stock(self):
+        response = self.client.post('/cart/', {'food': self.foods[0].id, 'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertStock(self.foods[0], 2)
+
+        response = self.client.post('/cart/', {'food': self.foods[0].id, 'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['code'], 'ERROR_042')
+        self.assertStock(self.foods[0], 2)
+        self.assertCartTotal('31.50')
+
+        item = CartItem.objects.get(cart=self.cart)
+        self.client.patch('/cart/', {'id': item.id, 'quantity': 1}, format='json')
+        self.assertStock(self.foods[0], 4)
+
+        CartItem.objects.get(id=item.id).delete()
+        self.assertStock(self.foods[0], 5)
+
+        # Untracked foods are never short.
+        response = self.client.post('/cart/', {'food': self.foods[2].id, 'quantity': 50}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertStock(self.foods[2], None)
+
+    def test_bulk_add_reports_foods_out_of_stock(self):
+        response = self.client.post('/cart/bulk/', {'items': [
+            {'food': self.foods[0].id, 'quantity': 4},
+            {'food': self.foods[1].id, 'quantity': 6},
+            {'food': self.foods[2].id, 'quantity': 1},
+        ]}, format='json')
+
+        self.assertEqual([error['food'] for error in response.data['errors']], [self.foods[1].id])
+        self.assertStock(self.foods[0], 1)
+        self.assertStock(self.foods[1], 5)
+        lines = dict(CartItem.objects.filter(cart=self.cart).values_list('food_id', 'quantity'))
+        self.assertEqual(lines, {self.foods[0].id: 4, self.foods[2].id: 1})
+
+    def test_expired_holds_are_released_and_reserved_again_at_checkout(self):
+        self.client.post('/cart/bulk/', {'items': [
+            {'food': self.foods[0].id, 'quantity': 2}, {'food': self.foods[1].id, 'quantity': 2},
+        ]}, format='json')
+        self.assertStock(self.foods[0], 3)
+        CartItem.objects.filter(food=self.foods[0]).update(reserved_until=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command('release_stock_reservations', stdout=out)
+        self.assertIn('1 cart line(s)', out.getvalue())
+        self.assertStock(self.foods[0], 5)
+        self.assertStock(self.foods[1], 3)
+
+        Food.objects.filter(id=self.foods[0].id).update(stock=1)
+        response = self.client.post('/checkout/', format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['code'], 'ERROR_042')
+        self.assertStock(self.foods[1], 3)
+
+        Food.objects.filter(id=self.foods[0].id).update(stock=2)
+        response = self.client.post('/checkout/', format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertStock(self.foods[0], 0)
+        self.assertStock(self.foods[1], 3)
+
+
+class ConcurrentCheckoutTest(TransactionTestCase):
+    """
+    Parallel checkouts, several per cart, with cart edits in between,
+    place exactly one order per cart and lose no money; parallel adds
+    of a hot food never reserve more than its stock.
+    """
+
+    CARTS = 50
+    CHECKOUTS_PER_CART = 3
+
+    def setUp(self):
+        # SQLite serializes writers; its default deferred transactions fail with
+        # "database is locked" instead of waiting, so only immediate ones work.
+        if connection.vendor == 'sqlite' and (
+            connection.is_in_memory_db() or connection.settings_dict['OPTIONS'].get('transaction_mode') != 'IMMEDIATE'
+        ):
+            self.skipTest("Needs PostgreSQL, or a file-backed SQLite database with transaction_mode IMMEDIATE.")
+        with patch('address.models.resolve_pincode', return_value={'city': 'Chennai', 'state': 'Tamil Nadu'}):
+            address = Address.objects.create(area='Adyar', street='Main Street', pincode=600020)
+        manager = CustomUser.objects.create_user(email='manager@example.com', password='secret', name='Manager')
+        hotel = Hotel.objects.create(name='Hotel', user=manager, address=address)
+        category = Category.objects.create(name='Meals')
+        self.foods = [
+            Food.objects.create(name=f'Food {index}', price=Decimal('10.50') + index, category=category, hotel=hotel)
+            for index in range(3)
+        ]
+        self.users = [
+            CustomUser.objects.create_user(email=f'customer{index}@example.com', password='secret', name='Customer')
+            for index in range(self.CARTS)
+        ]
+        self.expected = {}
+        for index, user in enumerate(self.users):
+            cart = CartDetails.objects.create(user=user, total_price=0)
+            for food in self.foods[:index % 3 + 1]:
+                CartItem.objects.create(food=food, quantity=index + 1, cart=cart)
+            self.expected[user.id] = sum((food.price * (index + 1) for food in self.foods[:index % 3 + 1]), Decimal('0'))
+
+    def run_in_threads(self, calls):
+        barrier = threading.Barrier(len(calls))
+        results = []
+
+        def run(call):
+            try:
+                barrier.wait()
+                results.append(call())
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(call,)) for call in calls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def checkout(self, user):
+        return self.client_for(user).post('/checkout/', format='json').status_code
+
+    def add_to_cart(self, user):
+        items = [{'food': self.foods[0].id, 'quantity': 1}]
+        return self.client_for(user).post('/cart/bulk/', {'items': items}, format='json').status_code
+
+    def test_parallel_checkouts_order_each_cart_once(self):
+        calls = [lambda user=user: self.checkout(user) for user in self.users for _ in range(self.CHECKOUTS_PER_CART)]
+        calls += [lambda user=user: self.add_to_cart(user) for user in self.users[::2]]
+        results = self.run_in_threads(calls)
+
+        self.assertNotIn(500, results)
+        self.assertEqual(results.count(201), Order.objects.count())
+        ordered = {}
+        for order in Order.objects.prefetch_related('lines'):
+            self.assertEqual(order.total_price, sum(line.line_total() for line in order.lines.all()))
+            ordered[order.user_id] = ordered.get(order.user_id, Decimal('0')) + order.total_price
+
+        for user in self.users:
+            cart = CartDetails.objects.get(user=user)
+            left = sum((item.line_total() for item in CartItem.objects.filter(cart=cart)), Decimal('0'))
+            added = self.foods[0].price if user in self.users[::2] else 0
+            with self.subTest(user=user.id):
+                self.assertEqual(cart.total_price, left)
+                self.assertEqual(ordered.get(user.id, 0) + left, self.expected[user.id] + added)
+                # A checkout that ran after the bulk add may order it separately, never the same lines twice.
+                self.assertLessEqual(Order.objects.filter(user=user).count(), 2 if added else 1)
+
+    def test_parallel_first_adds_share_one_cart_and_line(self):
+        user = CustomUser.objects.create_user(email='new@example.com', password='secret', name='Customer')
+        adds = 20
+
+        results = self.run_in_threads([
+            lambda: self.client_for(user).post('/cart/', {'food': self.foods[2].id, 'quantity': 1}, format='json').status_code
+        ] * adds)
+
+        self.assertEqual(results, [200] * adds)
+        cart = CartDetails.objects.get(user=user)
+        self.assertEqual(list(CartItem.objects.filter(cart=cart).values_list('food_id', 'quantity')), [(self.foods[2].id, adds)])
+        self.assertEqual(cart.total_price, self.foods[2].price * adds)
+
+    def test_parallel_adds_never_oversell(self):
+        Food.objects.filter(id=self.foods[1].id).update(stock=30)
+        CartItem.objects.all().delete()
+
+        results = self.run_in_threads([
+            lambda user=user: self.client_for(user).post(
+                '/cart/', {'food': self.foods[1].id, 'quantity': 1}, format='json'
+            ).status_code
+            for user in self.users
+        ])
+
+        self.assertEqual(results.count(200), 30)
+        self.assertEqual(results.count(400), len(self.users) - 30)
+        self.assertEqual(Food.objects.get(id=self.foods[1].id).stock, 0)
+        self.assertEqual(CartItem.objects.filter(food=self.foods[1], reserved_until__isnull=False).count(), 30)
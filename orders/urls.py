@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import CartItemView
+from .views import CartItemView, CartItemBulkView, CheckoutView
 
 urlpatterns = [
-    path('cart/', CartItemView.as_view())
+    path('cart/', CartItemView.as_view()),
+    path('cart/bulk/', CartItemBulkView.as_view()),
+    path('checkout/', CheckoutView.as_view()),
 
 ]
@@ -3,10 +3,12 @@ from rest_framework.views import APIView
 from rest_framework import status
 
 from authenticate.permissions import IsManagerOrAdmin, IsAccessToAll
-from orders.service import insert_cart_details, update_cart_item
+from orders.service import checkout_cart, insert_cart_details, insert_cart_items_bulk, update_cart_item
 from utils.exceptions import AuthorizationException
+from core.query_budget import query_budget
 
 
+@query_budget(post=8, patch=7)
 class CartItemView(APIView):
     """
     Handles cart item creation and updates.
@@ -64,3 +66,61 @@ class CartItemView(APIView):
 
         updated_cart_item = update_cart_item(request)
         return Response({'cart_item': updated_cart_item}, status=status.HTTP_200_OK)
+
+
+@query_budget(post=9)
+class CartItemBulkView(APIView):
+    """
+    Adds many items to the cart in one request.
+
+    Permissions:
+        - POST: Admin/Manager only
+    """
+
+    permission_classes = [IsManagerOrAdmin]
+
+    def post(self, request):
+        """
+        Adds a batch of items to the cart.
+
+        Payload:
+            - items (list): [{food (int), quantity (int)}, ...]
+
+        Returns:
+            JSON response with saved cart lines and per-item errors.
+        """
+        if not request.user or not request.user.is_authenticated:
+            raise AuthorizationException()
+
+        cart_detail_data = {
+            'user': request.user.id,
+            'total_price': 0
+        }
+
+        result = insert_cart_items_bulk(request, cart_detail_data)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+@query_budget(post=9)
+class CheckoutView(APIView):
+    """
+    Places an order from the user's cart.
+
+    Permissions:
+        - POST: All authenticated users
+    """
+
+    permission_classes = [IsAccessToAll]
+
+    def post(self, request):
+        """
+        Orders everything in the cart and empties it.
+
+        Returns:
+            JSON response with the order and its lines.
+        """
+        if not request.user or not request.user.is_authenticated:
+            raise AuthorizationException()
+
+        order = checkout_cart(request.user.id)
+        return Response({'order': order}, status=status.HTTP_201_CREATED)
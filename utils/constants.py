@@ -118,5 +118,53 @@ error_code_dict = {
     "NO_HOTEL_FOUND":{
         "error_code": "ERROR_030",
         "error_message": "No hotel found to update"
+    },
+    "INVALID_CART_ITEMS":{
+        "error_code": "ERROR_031",
+        "error_message": "Cart items must be a non-empty list"
+    },
+    "CART_ITEMS_LIMIT":{
+        "error_code": "ERROR_032",
+        "error_message": "Too many cart items in one request"
+    },
+    "INVALID_CURSOR":{
+        "error_code": "ERROR_033",
+        "error_message": "Invalid pagination cursor"
+    },
+    "INVALID_PAGE_SIZE":{
+        "error_code": "ERROR_034",
+        "error_message": "Page size must be a positive integer"
+    },
+    "INVALID_SEARCH_QUERY":{
+        "error_code": "ERROR_035",
+        "error_message": "Search query must have 2 to 100 letters or digits"
+    },
+    "INVALID_SEARCH_LIMIT":{
+        "error_code": "ERROR_036",
+        "error_message": "Search limit must be a positive integer"
+    },
+    "INVALID_NEARBY_LOCATION":{
+        "error_code": "ERROR_037",
+        "error_message": "Give a 6-digit pincode, or a latitude and longitude"
+    },
+    "PINCODE_LOCATION_UNKNOWN":{
+        "error_code": "ERROR_038",
+        "error_message": "No location is known for this pincode"
+    },
+    "INVALID_NEARBY_RADIUS":{
+        "error_code": "ERROR_039",
+        "error_message": "Radius must be a positive number of kilometres"
+    },
+    "CART_EMPTY":{
+        "error_code": "ERROR_040",
+        "error_message": "The cart has no items to order"
+    },
+    "CART_FOOD_UNAVAILABLE":{
+        "error_code": "ERROR_041",
+        "error_message": "Some foods in the cart are no longer available"
+    },
+    "OUT_OF_STOCK":{
+        "error_code": "ERROR_042",
+        "error_message": "Not enough stock left"
     }
 }
\ No newline at end of file
@@ -1,21 +1,35 @@
 from django.db import models
 
 
+class ActiveManager(models.Manager):
+    """
+    Manager returning only rows with the active status.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(status=BaseModel.ACTIVE)
+
+
 class BaseModel(models.Model):
+    ACTIVE = 'active'
+    INACTIVE = 'inactive'
+
     STATUS_CHOICES = (
-        ('ACTIVE',),
-        ('INACTIVE',),
+        (ACTIVE, 'Active'),
+        (INACTIVE, 'Inactive'),
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     status = models.CharField(
-        choices=[('active', 'Active'), ('inactive', 'Inactive')],
+        choices=STATUS_CHOICES,
         max_length=20,
-        default="Active"
+        default=ACTIVE
     )
 
+    objects = models.Manager()
+    active = ActiveManager()  # Only rows with status 'active'
 
     class Meta:
-        abstract = True 
\ No newline at end of file
+        abstract = True
@@ -1,10 +1,36 @@
 import requests
-from utils.exceptions import BadRequestException
+from django.conf import settings
 from requests.exceptions import RequestException, Timeout, HTTPError, ConnectionError
 
+DEFAULT_POSTAL_API_BASE_URL = "https://api.postalpincode.in"
 
-def get_city_state_from_pincode(pincode):
-    url = f"https://api.postalpincode.in/pincode/{pincode}"
+
+class PostalAPIError(Exception):
+    """
+    Raised when the postal API could not be reached or returned
+    a response we could not read.
+    """
+
+
+def get_postal_api_base_url():
+    """
+    Returns the postal API base URL.
+    Set POSTAL_API_BASE_URL to point the client at a local stub server.
+    """
+    return getattr(settings, 'POSTAL_API_BASE_URL', DEFAULT_POSTAL_API_BASE_URL).rstrip('/')
+
+
+def fetch_city_state_from_pincode(pincode):
+    """
+    Looks up city and state of a pincode through the postal API.
+
+    Returns:
+        dict: {'city', 'state'}, both empty if the API reports the pincode as invalid.
+
+    Raises:
+        PostalAPIError: On network errors or an unexpected response.
+    """
+    url = f"{get_postal_api_base_url()}/pincode/{pincode}"
     try:
         response = requests.get(url, timeout=5)
         data = response.json()
@@ -12,11 +38,21 @@ def get_city_state_from_pincode(pincode):
             city = data[0]['PostOffice'][0]['District']
             state = data[0]['PostOffice'][0]['State']
             return {'city': city, 'state': state}
+        return {'city': '', 'state': ''}
     except (Timeout, ConnectionError) as e:
-        BadRequestException(f"Network-related error: {e}")
+        raise PostalAPIError(f"Network-related error: {e}")
     except ValueError as e:
-        BadRequestException(f"Invalid JSON response: {e}")
+        raise PostalAPIError(f"Invalid JSON response: {e}")
     except (KeyError, IndexError, TypeError) as e:
-        BadRequestException(f"Unexpected data structure: {e}")
+        raise PostalAPIError(f"Unexpected data structure: {e}")
+
 
-    return {'city': '', 'state': ''}
\ No newline at end of file
+def get_city_state_from_pincode(pincode):
+    """
+    Looks up city and state of a pincode through the postal API.
+    Returns empty city and state if the lookup fails for any reason.
+    """
+    try:
+        return fetch_city_state_from_pincode(pincode)
+    except PostalAPIError:
+        return {'city': '', 'state': ''}
@@ -0,0 +1,96 @@
+"""
+Local stand-in for the postal pincode API.
+
+Answers GET /pincode/<pincode> in the same JSON shape as
+api.postalpincode.in, so the app can run and be tested offline.
+Point POSTAL_API_BASE_URL at `PostalStubServer.url` to use it.
+
+Run standalone:
+    python utils/postal_stub.py --port 8765 --data pincodes.json
+where pincodes.json maps pincode to [district, state].
+"""
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class PostalStubServer:
+    """
+    Threaded HTTP server answering pincode lookups from a dict.
+
+    Args:
+        locations (dict): Mapping of pincode to (district, state).
+        port (int): Port to listen on, 0 picks a free one.
+    """
+
+    def __init__(self, locations, host='127.0.0.1', port=0):
+        self.locations = {str(pincode): tuple(value) for pincode, value in locations.items()}
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.hits += 1
+                pincode = self.path.rstrip('/').rsplit('/', 1)[-1]
+                location = stub.locations.get(pincode)
+                if location:
+                    body = [{
+                        'Status': 'Success',
+                        'PostOffice': [{'District': location[0], 'State': location[1]}],
+                    }]
+                else:
+                    body = [{'Status': 'Error', 'PostOffice': None}]
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve pincode lookups locally.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data', help="JSON file mapping pincode to [district, state].")
+    args = parser.parse_args()
+
+    locations = {}
+    if args.data:
+        with open(args.data) as data_file:
+            locations = json.load(data_file)
+
+    server = PostalStubServer(locations, port=args.port)
+    print(f"Postal stub listening on {server.url}")
+    server._server.serve_forever()